@@ -12,6 +12,47 @@ STRUCTURETIMERS_NOTIFICATIONS_ENABLED = clean_setting(
 )
 """Whether notifications for timers are scheduled at all."""
 
+STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED = clean_setting(
+    "STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED", False
+)
+"""Whether scheduled notifications are sent by a periodic dispatcher task
+instead of one Celery task per notification.
+"""
+
+STRUCTURETIMERS_DISCORD_SEND_MAX_WORKERS = clean_setting(
+    "STRUCTURETIMERS_DISCORD_SEND_MAX_WORKERS", default_value=4, min_value=1
+)
+"""Maximum number of webhooks messages are sent to in parallel."""
+
+STRUCTURETIMERS_DISTANCES_BATCH_SIZE = clean_setting(
+    "STRUCTURETIMERS_DISTANCES_BATCH_SIZE", default_value=250, min_value=1
+)
+"""Number of timers distances are calculated for in one task,
+when recalculating the distances from a staging system.
+"""
+
+STRUCTURETIMERS_DISTANCES_LAZY_ENABLED = clean_setting(
+    "STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", False
+)
+"""Whether distances from staging systems are calculated on demand
+when showing the timer list, instead of for all timers whenever a timer
+or staging system is saved.
+"""
+
+STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS = clean_setting(
+    "STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS", default_value=1000
+)
+"""Maximum time in milliseconds spend on calculating missing distances
+when showing the timer list. Remaining distances are calculated by a task.
+"""
+
+STRUCTURETIMERS_LIVE_UPDATES_ENABLED = clean_setting(
+    "STRUCTURETIMERS_LIVE_UPDATES_ENABLED", False
+)
+"""Whether changes of timers are pushed to open timer boards.
+Requires web workers which can keep many connections open, e.g. gevent.
+"""
+
 STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS = clean_setting(
     "STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS", default_value=30, min_value=1
 )
@@ -19,6 +60,28 @@ STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS = clean_setting(
 Obsolete timers will automatically be deleted.
 """
 
+STRUCTURETIMERS_HOUSEKEEPING_BATCH_SIZE = clean_setting(
+    "STRUCTURETIMERS_HOUSEKEEPING_BATCH_SIZE", default_value=500, min_value=1
+)
+"""Maximum number of obsolete timers deleted in one transaction."""
+
+STRUCTURETIMERS_HOUSEKEEPING_PAUSE_MS = clean_setting(
+    "STRUCTURETIMERS_HOUSEKEEPING_PAUSE_MS", default_value=100, min_value=0
+)
+"""Pause in milliseconds between deleting chunks of obsolete timers."""
+
+STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED = clean_setting(
+    "STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED", False
+)
+"""Whether obsolete timers are moved into the archive instead of being deleted."""
+
+STRUCTURETIMERS_BOARD_ROWS_ENABLED = clean_setting(
+    "STRUCTURETIMERS_BOARD_ROWS_ENABLED", False
+)
+"""Whether the timer board is read from denormalized board rows,
+which are updated whenever a timer is saved.
+"""
+
 STRUCTURETIMERS_DEFAULT_PAGE_LENGTH = clean_setting(
     "STRUCTURETIMERS_DEFAULT_PAGE_LENGTH", 10
 )
@@ -7,3 +7,6 @@ class StructureTimersConfig(AppConfig):
     name = "structuretimers"
     label = "structuretimers"
     verbose_name = f"Structure Timers v{__version__}"
+
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+"""Parsing of requests from DataTables in server-side processing mode."""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.http import QueryDict
+
+MAX_PAGE_LENGTH = 1000
+
+_COLUMN_PARAM = re.compile(r"^columns\[(\d+)\]\[(\w+)\](?:\[(\w+)\])?$")
+_ORDER_PARAM = re.compile(r"^order\[(\d+)\]\[(\w+)\]$")
+_REGEX_ESCAPE = re.compile(r"\\(.)")
+
+
+@dataclass
+class DataTablesRequest:
+    """A request from DataTables for one page of a table."""
+
+    draw: int
+    start: int = 0
+    length: Optional[int] = None  # None means all rows
+    search: str = ""
+    order: List[Tuple[str, bool]] = field(default_factory=list)
+    column_searches: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_query_dict(cls, params: QueryDict) -> Optional["DataTablesRequest"]:
+        """Create new request from the query parameters sent by DataTables.
+
+        Returns None if the parameters are not from a DataTables request.
+
+        Order is returned as tuples of column name and a flag,
+        which is True for descending order.
+        Column searches are returned by column name.
+        """
+        try:
+            draw = int(params["draw"])
+        except (KeyError, ValueError):
+            return None
+
+        columns: Dict[int, dict] = {}
+        orders: Dict[int, dict] = {}
+        for key, value in params.items():
+            match = _COLUMN_PARAM.match(key)
+            if match:
+                index, name, sub_name = match.groups()
+                column = columns.setdefault(int(index), {})
+                column[f"{name}_{sub_name}" if sub_name else name] = value
+                continue
+            match = _ORDER_PARAM.match(key)
+            if match:
+                index, name = match.groups()
+                orders.setdefault(int(index), {})[name] = value
+
+        order = []
+        for _, params_order in sorted(orders.items()):
+            try:
+                column_name = columns[int(params_order.get("column", ""))]["data"]
+            except (KeyError, ValueError):
+                continue
+            order.append((column_name, params_order.get("dir") == "desc"))
+
+        column_searches = {}
+        for column in columns.values():
+            value = _search_value(
+                column.get("search_value", ""), column.get("search_regex") == "true"
+            )
+            if value and column.get("data"):
+                column_searches[column["data"]] = value
+
+        return cls(
+            draw=draw,
+            start=max(0, _int_or_default(params.get("start"), 0)),
+            length=_page_length(params.get("length")),
+            search=params.get("search[value]", "").strip(),
+            order=order,
+            column_searches=column_searches,
+        )
+
+    @property
+    def end(self) -> Optional[int]:
+        """Index after the last row of the requested page or None for all rows."""
+        return self.start + self.length if self.length is not None else None
+
+
+def _search_value(value: str, is_regex: bool) -> str:
+    """Return plain search value.
+
+    Exact matches are sent as escaped regular expressions like ``^value$``.
+    """
+    if is_regex and len(value) >= 2 and value[0] == "^" and value[-1] == "$":
+        value = _REGEX_ESCAPE.sub(r"\1", value[1:-1])
+    return value.strip()
+
+
+def _page_length(value: Optional[str]) -> Optional[int]:
+    length = _int_or_default(value, -1)
+    if length < 0:
+        return None
+    return min(length, MAX_PAGE_LENGTH)
+
+
+def _int_or_default(value: Optional[str], default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,243 @@
+"""Delivery of messages to Discord webhooks."""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+import dhooks_lite
+import requests
+from dhooks_lite.serializers import JsonDateTimeEncoder
+from simple_mq import SimpleMQ
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.allianceauth import get_redis_client
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+
+if TYPE_CHECKING:
+    from .models import DiscordWebhook
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+HTTP_TOO_MANY_REQUESTS = 429
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARACTERS_PER_MESSAGE = 6000
+MAX_RATE_LIMIT_RETRIES = 5
+MAX_RETRY_AFTER = 60  # seconds, upper bound for waiting on a single rate limit
+REQUESTS_TIMEOUT = (5, 30)  # seconds for connect, read
+
+
+class RateLimiter:
+    """Paces requests to a webhook according to the rate limits reported by Discord.
+
+    This object is thread safe.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._resets_at = 0.0
+
+    def wait(self) -> float:
+        """Wait until the next request may be sent. Returns seconds waited."""
+        with self._lock:
+            if self._remaining is None or self._remaining > 0:
+                if self._remaining:
+                    self._remaining -= 1
+                return 0.0
+
+            delay = self._resets_at - monotonic()
+            self._remaining = None
+
+        if delay <= 0:
+            return 0.0
+
+        delay = min(delay, MAX_RETRY_AFTER)
+        logger.debug("Rate limit exhausted. Waiting %.2f seconds", delay)
+        sleep(delay)
+        return delay
+
+    def update(self, response: requests.Response) -> None:
+        """Update the rate limit state from a response of Discord."""
+        headers = response.headers
+        if response.status_code == HTTP_TOO_MANY_REQUESTS:
+            retry_after = _retry_after_from_response(response)
+            with self._lock:
+                self._remaining = 0
+                self._resets_at = monotonic() + retry_after
+            return
+
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_after = float(headers["X-RateLimit-Reset-After"])
+        except (KeyError, ValueError):
+            return
+
+        with self._lock:
+            self._remaining = remaining
+            self._resets_at = monotonic() + reset_after
+
+
+def _retry_after_from_response(response: requests.Response) -> float:
+    try:
+        retry_after = float(response.json()["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        try:
+            retry_after = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            retry_after = 1.0
+
+    return max(0.0, min(retry_after, MAX_RETRY_AFTER))
+
+
+class PooledWebhook(dhooks_lite.Webhook):
+    """A Discord webhook, which sends requests with a shared session
+    and respects the rate limits reported by Discord.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        session: requests.Session,
+        rate_limiter: RateLimiter,
+        **kwargs,
+    ) -> None:
+        super().__init__(url=url, **kwargs)
+        self._session = session
+        self._rate_limiter = rate_limiter
+
+    # overrides a private method of dhooks_lite,
+    # which is why the version of dhooks_lite is pinned
+    def _send_request_to_webhook(self, payload: dict, wait_for_response: bool):
+        retry_count = 0
+        while True:
+            self._rate_limiter.wait()
+            response = self._session.post(
+                url=self.url,
+                params={"wait": wait_for_response},
+                headers={
+                    "Content-Type": "application/json",
+                    "User-Agent": str(self.user_agent),
+                },
+                data=json.dumps(payload, cls=JsonDateTimeEncoder),
+                timeout=REQUESTS_TIMEOUT,
+            )
+            self._rate_limiter.update(response)
+            if (
+                response.status_code != HTTP_TOO_MANY_REQUESTS
+                or retry_count >= MAX_RATE_LIMIT_RETRIES
+            ):
+                break
+
+            retry_count += 1
+            logger.warning(
+                "Rate limited by Discord. Retry %d / %d",
+                retry_count,
+                MAX_RATE_LIMIT_RETRIES,
+            )
+
+        logger.debug("HTTP status code: %s", response.status_code)
+        return response
+
+
+def merge_messages(message: dict, other: dict) -> Optional[dict]:
+    """Merge two messages into one message with the embeds of both.
+
+    Messages can only be merged when both have embeds,
+    all other properties are identical
+    and the merged message is within Discord's size limits.
+
+    Returns the merged message or None if the messages can not be merged.
+    """
+    if not message.get("embeds") or not other.get("embeds"):
+        return None
+
+    for key in ("content", "username", "avatar_url", "tts"):
+        if message.get(key) != other.get(key):
+            return None
+
+    embeds = message["embeds"] + other["embeds"]
+    if len(embeds) > MAX_EMBEDS_PER_MESSAGE:
+        return None
+
+    if sum(_embed_size(embed) for embed in embeds) > MAX_EMBED_CHARACTERS_PER_MESSAGE:
+        return None
+
+    return {**message, "embeds": embeds}
+
+
+def _embed_size(embed: dict) -> int:
+    """Return number of characters in an embed as counted by Discord."""
+    size = len(embed.get("title") or "") + len(embed.get("description") or "")
+    for field in embed.get("fields") or []:
+        size += len(field.get("name") or "") + len(field.get("value") or "")
+    size += len((embed.get("footer") or {}).get("text") or "")
+    size += len((embed.get("author") or {}).get("name") or "")
+    return size
+
+
+_clients_lock = threading.Lock()
+_clients: Dict[str, PooledWebhook] = {}
+
+
+def webhook_client(url: str) -> PooledWebhook:
+    """Return the client for a webhook URL.
+
+    Clients are shared within a process, so connections are pooled
+    and rate limits are tracked across all messages sent to the same webhook.
+    """
+    with _clients_lock:
+        try:
+            return _clients[url]
+        except KeyError:
+            client = PooledWebhook(
+                url=url, session=requests.Session(), rate_limiter=RateLimiter()
+            )
+            _clients[url] = client
+            return client
+
+
+_queues_lock = threading.Lock()
+_queues: Dict[str, SimpleMQ] = {}
+
+
+def message_queue(name: str) -> SimpleMQ:
+    """Return the message queue with the given name.
+
+    Queues are created on first use and shared within a process.
+    """
+    with _queues_lock:
+        try:
+            return _queues[name]
+        except KeyError:
+            queue = SimpleMQ(get_redis_client(), name)
+            _queues[name] = queue
+            return queue
+
+
+def send_queued_messages_concurrently(
+    webhooks: Iterable["DiscordWebhook"], max_workers: int
+) -> Dict[int, int]:
+    """Send queued messages of several webhooks in parallel.
+
+    Messages of the same webhook are still sent in order.
+
+    Returns the number of sent messages per webhook PK.
+    """
+    webhooks = list({webhook.pk: webhook for webhook in webhooks}.values())
+    if not webhooks:
+        return {}
+
+    max_workers = max(1, min(max_workers, len(webhooks)))
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="structuretimers_discord"
+    ) as executor:
+        futures = {
+            webhook.pk: executor.submit(webhook.send_queued_messages)
+            for webhook in webhooks
+        }
+
+    return {pk: future.result() for pk, future in futures.items()}
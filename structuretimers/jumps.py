@@ -0,0 +1,237 @@
+"""Calculation of jumps and distances between solar systems."""
+
+import uuid
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.core.cache import cache
+from eveuniverse.helpers import meters_to_ly
+from eveuniverse.models import EveSolarSystem, EveStargate
+
+GRAPH_VERSION_CACHE_KEY = "structuretimers_jump_graph_version"
+DISTANCES_CACHE_TIMEOUT = 3600 * 24 * 7  # seconds
+
+
+class JumpGraph:
+    """Stargate connections between solar systems in a compact adjacency array.
+
+    Shortest jump distances from an origin are calculated by breadth-first search
+    for all solar systems at once. The resulting distance vectors are cached
+    for the most recently used origins.
+
+    A graph is complete when the stargates of all its solar systems are known.
+    Otherwise, e.g. when stargates have only been loaded for some solar systems,
+    a missing route only means that there is no known route.
+    """
+
+    UNREACHABLE = -1
+    MAX_CACHED_ORIGINS = 64
+
+    def __init__(self, connections: Iterable[Tuple[int, int]], version: str = ""):
+        self.version = version
+        neighbors: Dict[int, set] = {}
+        origin_ids = set()
+        for system_id, destination_id in connections:
+            if system_id == destination_id:
+                continue
+            origin_ids.add(system_id)
+            neighbors.setdefault(system_id, set()).add(destination_id)
+            neighbors.setdefault(destination_id, set()).add(system_id)
+
+        self.is_complete = len(origin_ids) == len(neighbors)
+
+        self._system_ids = array("l", sorted(neighbors.keys()))
+        self._indexes = {
+            system_id: index for index, system_id in enumerate(self._system_ids)
+        }
+        self._offsets = array("l", [0])
+        self._adjacency = array("l")
+        for system_id in self._system_ids:
+            self._adjacency.extend(
+                sorted(self._indexes[other_id] for other_id in neighbors[system_id])
+            )
+            self._offsets.append(len(self._adjacency))
+
+        self._distances: "OrderedDict[int, array]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._system_ids)
+
+    def __contains__(self, solar_system_id: int) -> bool:
+        return solar_system_id in self._indexes
+
+    def jumps(self, origin_id: int, destination_id: int) -> Optional[int]:
+        """Return number of jumps between two solar systems.
+
+        Returns None if there is no route.
+        Raises KeyError if one of the solar systems is not in the graph.
+        """
+        destination_index = self._indexes[destination_id]
+        distance = self._distances_from(origin_id)[destination_index]
+        return None if distance == self.UNREACHABLE else distance
+
+    def _distances_from(self, origin_id: int) -> array:
+        try:
+            distances = self._distances[origin_id]
+        except KeyError:
+            distances = self._calc_distances_from(self._indexes[origin_id])
+            self._distances[origin_id] = distances
+            if len(self._distances) > self.MAX_CACHED_ORIGINS:
+                self._distances.popitem(last=False)
+        else:
+            self._distances.move_to_end(origin_id)
+
+        return distances
+
+    def _calc_distances_from(self, origin_index: int) -> array:
+        distances = array("l", [self.UNREACHABLE]) * len(self._system_ids)
+        distances[origin_index] = 0
+        frontier = [origin_index]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for index in frontier:
+                for neighbor in self._adjacency[
+                    self._offsets[index] : self._offsets[index + 1]
+                ]:
+                    if distances[neighbor] == self.UNREACHABLE:
+                        distances[neighbor] = distance
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+
+        return distances
+
+    @classmethod
+    def from_stargates(cls, version: str = "") -> "JumpGraph":
+        """Create new graph from all stargates in the database."""
+        connections = EveStargate.objects.filter(
+            destination_eve_solar_system__isnull=False
+        ).values_list("eve_solar_system_id", "destination_eve_solar_system_id")
+        return cls(connections=connections.iterator(), version=version)
+
+
+_jump_graph: Optional[JumpGraph] = None
+
+
+def jump_graph() -> JumpGraph:
+    """Return the jump graph for all stargates.
+
+    The graph is kept in memory and rebuild when it has been invalidated
+    in any process.
+    """
+    global _jump_graph
+
+    version = _jump_graph_version()
+    if _jump_graph is not None and _jump_graph.version == version:
+        return _jump_graph
+
+    _jump_graph = JumpGraph.from_stargates(version=version)
+    return _jump_graph
+
+
+def _jump_graph_version() -> str:
+    version = cache.get(GRAPH_VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(GRAPH_VERSION_CACHE_KEY, version, timeout=None)
+    return version
+
+
+def invalidate_jump_graph() -> None:
+    """Invalidate the jump graph and all cached distances in all processes."""
+    global _jump_graph
+
+    _jump_graph = None
+    cache.set(GRAPH_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+
+
+class JumpsUnknown(Exception):
+    """Jumps can not be calculated from the local stargate graph."""
+
+
+def jumps_between(
+    origin: EveSolarSystem, destination: EveSolarSystem, local_only: bool = False
+) -> Optional[int]:
+    """Return number of jumps between two solar systems
+    or None if there is no route.
+
+    Jumps are calculated from the local stargate graph.
+    Will fall back to ESI when the graph does not contain both solar systems
+    or when the graph is not complete and has no route between them.
+
+    Raises:
+        JumpsUnknown: when ESI would be needed, but only the graph may be used
+    """
+    if origin.id == destination.id:
+        return 0
+
+    if origin.is_w_space or destination.is_w_space:
+        return None
+
+    graph = jump_graph()
+    if origin.id in graph and destination.id in graph:
+        jumps = graph.jumps(origin.id, destination.id)
+        if jumps is not None or graph.is_complete:
+            return jumps
+
+    if local_only:
+        raise JumpsUnknown(f"No route from {origin} to {destination} in graph")
+
+    return origin.jumps_to(destination)
+
+
+def system_distances(
+    origin: EveSolarSystem, destination: EveSolarSystem
+) -> Tuple[Optional[float], Optional[int]]:
+    """Return light years and jumps between two solar systems.
+
+    Distances are cached for each pair of solar systems
+    until the jump graph is invalidated.
+    """
+    return system_distances_many(origin, [destination])[destination.id]
+
+
+def system_distances_many(
+    origin: EveSolarSystem,
+    destinations: Iterable[EveSolarSystem],
+    local_only: bool = False,
+) -> Dict[int, Tuple[Optional[float], Optional[int]]]:
+    """Return light years and jumps from a solar system to several solar systems.
+
+    Distances are cached for each pair of solar systems
+    until the jump graph is invalidated.
+
+    When ``local_only`` is set, destinations which jumps can not be calculated
+    from the local graph are left out of the result.
+
+    Returns:
+        light years and jumps by solar system ID of destination
+    """
+    version = _jump_graph_version()
+    destinations = {obj.id: obj for obj in destinations}
+    cache_keys = {
+        destination_id: f"structuretimers_distances_{version}_{origin.id}_"
+        f"{destination_id}"
+        for destination_id in destinations.keys()
+    }
+    cached_distances = cache.get_many(cache_keys.values())
+    result = {}
+    new_distances = {}
+    for destination_id, destination in destinations.items():
+        cache_key = cache_keys[destination_id]
+        try:
+            light_years, jumps = cached_distances[cache_key]
+        except KeyError:
+            light_years = meters_to_ly(origin.distance_to(destination))
+            try:
+                jumps = jumps_between(origin, destination, local_only=local_only)
+            except JumpsUnknown:
+                continue
+            new_distances[cache_key] = (light_years, jumps)
+        result[destination_id] = (light_years, jumps)
+
+    if new_distances:
+        cache.set_many(new_distances, timeout=DISTANCES_CACHE_TIMEOUT)
+    return result
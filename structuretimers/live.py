@@ -0,0 +1,160 @@
+"""Live updates of the timer board over Redis pub/sub."""
+
+import json
+from time import monotonic
+from typing import Iterable, Iterator, Optional, Set
+
+from redis.exceptions import RedisError
+
+from django.contrib.auth.models import User
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.allianceauth import get_redis_client
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+from .managers import user_organization_pks
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+CHANNEL_NAME = "structuretimers_timer_events"
+STREAM_MAX_SECONDS = 300
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_RETRY_MS = 5000
+
+EVENT_CREATED = "created"
+EVENT_UPDATED = "updated"
+EVENT_DELETED = "deleted"
+
+# fields of a timer which decide who can see it
+SCOPE_FIELDS = (
+    "visibility",
+    "user_id",
+    "eve_corporation_id",
+    "eve_alliance_id",
+    "is_opsec",
+)
+
+
+def timer_scope(values) -> dict:
+    """Return scope of a timer from a timer or a dict of its field values."""
+    if isinstance(values, dict):
+        return {name: values[name] for name in SCOPE_FIELDS}
+    return {name: getattr(values, name) for name in SCOPE_FIELDS}
+
+
+def publish_timer_event(
+    event: str, timer_pk: int, scope: dict, old_scope: Optional[dict] = None
+) -> None:
+    """Publish an event about a timer to all subscribers.
+
+    Errors are logged, so that saving timers does not depend on Redis.
+    """
+    message = {"event": event, "id": timer_pk, "scope": scope}
+    if old_scope and old_scope != scope:
+        message["old_scope"] = old_scope
+    try:
+        get_redis_client().publish(CHANNEL_NAME, json.dumps(message))
+    except RedisError:
+        logger.warning("Failed to publish event for timer %s", timer_pk, exc_info=True)
+
+
+class TimerEventFilter:
+    """Filter for timer events by what a user can see."""
+
+    def __init__(
+        self,
+        user_pk: int,
+        corporation_pks: Iterable[int],
+        alliance_pks: Iterable[int],
+        has_opsec_access: bool,
+    ) -> None:
+        self.user_pk = user_pk
+        self.corporation_pks: Set[int] = set(corporation_pks)
+        self.alliance_pks: Set[int] = set(alliance_pks)
+        self.has_opsec_access = has_opsec_access
+
+    @classmethod
+    def for_user(cls, user: User) -> "TimerEventFilter":
+        corporation_pks, alliance_pks = user_organization_pks(user)
+        return cls(
+            user_pk=user.pk,
+            corporation_pks=corporation_pks,
+            alliance_pks=alliance_pks,
+            has_opsec_access=user.has_perm("structuretimers.opsec_access"),
+        )
+
+    def is_visible(self, scope: dict) -> bool:
+        """Return True if a timer with the given scope is visible to the user.
+
+        This must match the filter of ``TimerQuerySet.visible_to_user()``.
+        """
+        from .models import Timer
+
+        if scope["is_opsec"] and not self.has_opsec_access:
+            return False
+        visibility = scope["visibility"]
+        return (
+            visibility == Timer.Visibility.UNRESTRICTED
+            or scope["user_id"] == self.user_pk
+            or (
+                visibility == Timer.Visibility.CORPORATION
+                and scope["eve_corporation_id"] in self.corporation_pks
+            )
+            or (
+                visibility == Timer.Visibility.ALLIANCE
+                and scope["eve_alliance_id"] in self.alliance_pks
+            )
+        )
+
+    def apply(self, message: dict) -> Optional[dict]:
+        """Return event for the user from a published message
+        or None if the user should not get it.
+
+        A timer which is no longer visible to the user is reported as deleted
+        and a timer which became visible as created.
+        """
+        is_visible = self.is_visible(message["scope"])
+        old_scope = message.get("old_scope")
+        was_visible = self.is_visible(old_scope) if old_scope else is_visible
+        event = message["event"]
+        if event == EVENT_UPDATED and is_visible != was_visible:
+            event = EVENT_CREATED if is_visible else EVENT_DELETED
+        elif not is_visible:
+            return None
+        return {"event": event, "id": message["id"]}
+
+
+def stream_timer_events(
+    user: User,
+    max_seconds: float = STREAM_MAX_SECONDS,
+    heartbeat_seconds: float = STREAM_HEARTBEAT_SECONDS,
+) -> Iterator[str]:
+    """Stream events about timers visible to a user as Server-Sent Events.
+
+    The stream ends after a while and the client is expected to reconnect,
+    so that workers are not blocked forever and changed permissions
+    of the user are applied.
+    """
+    event_filter = TimerEventFilter.for_user(user)
+    pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(CHANNEL_NAME)
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        deadline = monotonic() + max_seconds
+        while monotonic() < deadline:
+            message = pubsub.get_message(
+                timeout=min(heartbeat_seconds, max(0, deadline - monotonic()))
+            )
+            if not message:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                event = event_filter.apply(json.loads(message["data"]))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("Ignoring invalid timer event: %s", message)
+                continue
+            if event:
+                yield f"event: timer\ndata: {json.dumps(event)}\n\n"
+    finally:
+        pubsub.close()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from ...models import TimerBoardRow
+
+
+class Command(BaseCommand):
+    help = "Recreate the rows of the timer board for all timers"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recreating rows of the timer board. Please stand by.")
+        rows_count = TimerBoardRow.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Recreated {rows_count:,} rows of the timer board.")
+        )
@@ -1,22 +1,55 @@
-from datetime import timedelta
+import math
+from datetime import datetime, timedelta
+from time import monotonic, sleep
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Q
 from django.utils.timezone import now
+from eveuniverse.helpers import meters_to_ly
+from eveuniverse.models import EveSolarSystem
 
-from .app_settings import STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS
+from allianceauth.eveonline.models import EveAllianceInfo, EveCorporationInfo
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+from .app_settings import (
+    STRUCTURETIMERS_HOUSEKEEPING_BATCH_SIZE,
+    STRUCTURETIMERS_HOUSEKEEPING_PAUSE_MS,
+    STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED,
+    STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS,
+)
+from .jumps import system_distances_many
+from .matching import WH_SPACE_MAX_ID, WH_SPACE_MIN_ID, notification_rule_index
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+USER_ORGANIZATIONS_CACHE_TIMEOUT = 3600  # seconds
+BOARD_ROWS_COMPLETE_CACHE_KEY = "structuretimers_board_rows_complete"
+BOARD_ROWS_COMPLETE_CACHE_TIMEOUT = 300  # seconds
 
 
 class NotificationRuleQuerySet(models.QuerySet):
+    def prefetch_related_for_matching(self) -> models.QuerySet:
+        return self.prefetch_related(
+            "require_corporations",
+            "exclude_corporations",
+            "require_alliances",
+            "exclude_alliances",
+            "require_regions",
+            "exclude_regions",
+        )
+
     def conforms_with_timer(self, timer: object) -> models.QuerySet:
         """Return new queryset based on current queryset,
         which only contains notification rules that conforms with the given timer.
-        """
-        matching_rule_pks = list()
-        for notification_rule in self:
-            if notification_rule.is_matching_timer(timer):
-                matching_rule_pks.append(notification_rule.pk)
 
+        Matching rules are looked up in the notification rule index.
+        """
+        matching_rule_pks = notification_rule_index().matching_rule_pks(timer)
         return self.filter(pk__in=matching_rule_pks)
 
 
@@ -39,11 +72,19 @@ class TimerQuerySet(models.QuerySet):
         )
 
     def conforms_with_notification_rule(
-        self, notification_rule: object
+        self, notification_rule: object, in_database: bool = True
     ) -> models.QuerySet:
         """Return new queryset based on current queryset,
         which only contains timers that conform with the given notification rule.
+
+        Args:
+            notification_rule: Notification rule to match with
+            in_database: When True the rule is matched by the database,
+                else every timer is matched in Python.
         """
+        if in_database:
+            return self.filter(notification_rule.matcher.timer_query())
+
         matching_timer_pks = [
             timer.pk
             for timer in self.select_related_for_matching()
@@ -53,62 +94,320 @@ class TimerQuerySet(models.QuerySet):
 
     def visible_to_user(self, user: User) -> models.QuerySet:
         """returns updated queryset of all timers visible to the given user"""
-        user_characters_qs = user.character_ownerships.select_related(
-            "character_ownerships__character"
-        ).values("character__corporation_id", "character__alliance_id")
-        user_corporation_ids = {
-            x["character__corporation_id"] for x in user_characters_qs
-        }
-        user_alliance_ids = {x["character__alliance_id"] for x in user_characters_qs}
-        timers_qs = self.select_related(
-            "structure_type", "eve_corporation", "eve_alliance"
+        return _filter_visible_to_user(
+            self.select_related("structure_type", "eve_corporation", "eve_alliance"),
+            user,
         )
-        if not user.has_perm("structuretimers.opsec_access"):
-            timers_qs = timers_qs.exclude(is_opsec=True)
-
-        timers_qs = (
-            timers_qs.filter(visibility=self.model.Visibility.UNRESTRICTED)
-            | timers_qs.filter(user=user)
-            | timers_qs.filter(
-                visibility=self.model.Visibility.CORPORATION,
-                eve_corporation__corporation_id__in=user_corporation_ids,
-            )
-            | timers_qs.filter(
-                visibility=self.model.Visibility.ALLIANCE,
-                eve_alliance__alliance_id__in=user_alliance_ids,
-            )
-        )
-        return timers_qs
 
     def filter_by_tab(self, tab_name: str, max_hours_passed: int) -> models.QuerySet:
         """Filter timers for tabs."""
-        if tab_name == "current":
-            return self.filter(date__gte=now() - timedelta(hours=max_hours_passed))
-        elif tab_name == "preliminary":
-            return self.filter(timer_type=self.model.Type.PRELIMINARY)
-        elif tab_name == "past":
-            return self.filter(date__lt=now())
-        raise ValueError(f"Invalid tab name: {tab_name}")
+        return _filter_by_tab(self, tab_name, max_hours_passed)
 
 
 class TimerManagerBase(models.Manager):
-    def delete_obsolete(self) -> int:
-        """delete all timers that are considered obsolete"""
-        if STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS:
-            deadline = now() - timedelta(
-                days=STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS
+    def delete_obsolete(
+        self, batch_size: Optional[int] = None, pause: Optional[float] = None
+    ) -> int:
+        """Delete all timers that are considered obsolete
+        and return how many timers were deleted.
+
+        Timers are deleted in chunks of primary keys, each in its own transaction
+        and with a pause in between, so tables are only locked briefly
+        and only one chunk of timers is loaded into memory.
+        Related objects are deleted in bulk before the timers of a chunk.
+        When the archive is enabled, the timers of a chunk are archived
+        in the same transaction before they are deleted.
+
+        Deleted timers are logged in bulk and the timers are deleted
+        without sending signals, so each chunk needs a constant number
+        of queries. No live events are published for obsolete timers.
+
+        Args:
+            batch_size: Maximum number of timers deleted in one chunk
+            pause: Seconds to wait between chunks
+        """
+        if not STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS:
+            return 0
+        if batch_size is None:
+            batch_size = STRUCTURETIMERS_HOUSEKEEPING_BATCH_SIZE
+        if pause is None:
+            pause = STRUCTURETIMERS_HOUSEKEEPING_PAUSE_MS / 1000
+        deadline = now() - timedelta(days=STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS)
+        archive_manager = self._archive_manager()
+        deleted_timer_model = self._deleted_timer_model()
+        obsolete_qs = self.filter(date__lt=deadline).order_by("pk")
+        timers_count = 0
+        rows_count = 0
+        started = monotonic()
+        last_pk = 0
+        while True:
+            deleted_timers = [
+                deleted_timer_model(timer_id=values.pop("pk"), **values)
+                for values in obsolete_qs.filter(pk__gt=last_pk).values(
+                    "pk", *deleted_timer_model.SCOPE_FIELDS
+                )[:batch_size]
+            ]
+            if not deleted_timers:
+                break
+            timer_pks = [obj.timer_id for obj in deleted_timers]
+            with transaction.atomic():
+                if archive_manager:
+                    archive_manager.archive_timers(
+                        self.filter(pk__in=timer_pks), batch_size=batch_size
+                    )
+                deleted_timer_model.objects.bulk_create(
+                    deleted_timers, batch_size=batch_size
+                )
+                for related_model, field_name in self._cascading_relations():
+                    count, _ = related_model.objects.filter(
+                        **{f"{field_name}__in": timer_pks}
+                    ).delete()
+                    rows_count += count
+                timers_qs = self.filter(pk__in=timer_pks)
+                count = timers_qs._raw_delete(timers_qs.db)
+            timers_count += count
+            rows_count += count
+            last_pk = timer_pks[-1]
+            if len(timer_pks) < batch_size:
+                break
+            if pause:
+                sleep(pause)
+
+        if rows_count:
+            duration = max(monotonic() - started, 0.001)
+            action = "Archived" if archive_manager else "Deleted"
+            logger.info(
+                f"{action} {timers_count:,} obsolete timers with {rows_count:,} rows "
+                f"in {duration:.1f} seconds ({rows_count / duration:,.0f} rows/s)."
             )
-            _, details = self.filter(date__lt=deadline).delete()
-            key = f"{self.model._meta.app_label}.{self.model.__name__}"
-            if key in details:
-                deleted_count = details[key]
-                return deleted_count
-        return 0
+        return timers_count
+
+    @staticmethod
+    def _archive_manager() -> Optional[models.Manager]:
+        """Return manager of the timer archive or None if it is not enabled."""
+        if not STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED:
+            return None
+        from .models import TimerArchive
+
+        return TimerArchive.objects
+
+    @staticmethod
+    def _deleted_timer_model() -> Type[models.Model]:
+        from .models import DeletedTimer
+
+        return DeletedTimer
+
+    def _cascading_relations(self) -> List[Tuple[Type[models.Model], str]]:
+        """Return models and names of their fields,
+        which relate to timers and are deleted with them.
+        """
+        return [
+            (relation.related_model, relation.field.name)
+            for relation in self.model._meta.related_objects
+            if relation.on_delete is models.CASCADE and not relation.many_to_many
+        ]
 
 
 TimerManager = TimerManagerBase.from_queryset(TimerQuerySet)
 
 
+class DeletedTimerManager(models.Manager):
+    def delete_obsolete(self) -> int:
+        """Delete log entries, which are older than the maximum age
+        and return how many were deleted.
+        """
+        deadline = now() - timedelta(days=self.model.MAX_AGE_DAYS)
+        deleted_count, _ = self.filter(deleted_at__lt=deadline).delete()
+        return deleted_count
+
+    def timer_pks_since(self, since: datetime, user: User) -> Set[int]:
+        """Return PKs of all timers deleted after the given date,
+        which were visible to the given user.
+        """
+        deleted_qs = _filter_visible_to_user(self.filter(deleted_at__gt=since), user)
+        return set(deleted_qs.values_list("timer_id", flat=True))
+
+
+class TimerArchiveQuerySet(models.QuerySet):
+    def visible_to_user(self, user: User) -> models.QuerySet:
+        """returns updated queryset of all archived timers visible to the given user"""
+        return _filter_visible_to_user(self, user)
+
+
+class TimerArchiveManagerBase(models.Manager):
+    def archive_timers(self, timers_qs: models.QuerySet, batch_size: int = 500) -> int:
+        """Copy timers into the archive and return how many were archived.
+
+        Related objects are stored by their IDs and names,
+        so archived timers do not depend on any other table.
+        """
+        objs = [
+            self.model(**values)
+            for values in _timer_values(timers_qs, self.model.TIMER_FIELD_LOOKUPS)
+        ]
+        self.bulk_create(objs, batch_size=batch_size)
+        return len(objs)
+
+
+TimerArchiveManager = TimerArchiveManagerBase.from_queryset(TimerArchiveQuerySet)
+
+
+class TimerBoardRowQuerySet(models.QuerySet):
+    def visible_to_user(self, user: User) -> models.QuerySet:
+        """returns updated queryset of all board rows visible to the given user"""
+        return _filter_visible_to_user(self, user)
+
+    def filter_by_tab(self, tab_name: str, max_hours_passed: int) -> models.QuerySet:
+        """Filter board rows for tabs."""
+        return _filter_by_tab(self, tab_name, max_hours_passed)
+
+
+class TimerBoardRowManagerBase(models.Manager):
+    def update_for_timers(
+        self, timers_qs: models.QuerySet, batch_size: int = 500
+    ) -> int:
+        """Create or replace the board rows of timers
+        and return how many rows were written.
+        """
+        objs = []
+        for values in _timer_values(timers_qs, self.model.TIMER_FIELD_LOOKUPS):
+            details_image_url = values.pop("details_image_url")
+            details_notes = values.pop("details_notes")
+            values["has_details"] = bool(details_image_url or details_notes)
+            objs.append(self.model(**values))
+        with transaction.atomic():
+            self.filter(timer_id__in=[obj.timer_id for obj in objs]).delete()
+            self.bulk_create(objs, batch_size=batch_size)
+        return len(objs)
+
+    def is_complete(self) -> bool:
+        """Return True if there is a board row for every timer.
+
+        Once complete, board rows are updated whenever a timer is saved,
+        so a positive result is cached for a while.
+        """
+        if cache.get(BOARD_ROWS_COMPLETE_CACHE_KEY):
+            return True
+        timer_model = self.model._meta.get_field("timer").related_model
+        is_complete = self.count() >= timer_model.objects.count()
+        if is_complete:
+            cache.set(
+                BOARD_ROWS_COMPLETE_CACHE_KEY,
+                True,
+                timeout=BOARD_ROWS_COMPLETE_CACHE_TIMEOUT,
+            )
+        return is_complete
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """Recreate the board rows of all timers
+        and return how many rows were written.
+        """
+        timer_model = self.model._meta.get_field("timer").related_model
+        timer_pks = list(
+            timer_model.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        rows_count = 0
+        with transaction.atomic():
+            self.all().delete()
+            for start in range(0, len(timer_pks), batch_size):
+                rows_count += self.update_for_timers(
+                    timer_model.objects.filter(
+                        pk__in=timer_pks[start : start + batch_size]
+                    ),
+                    batch_size=batch_size,
+                )
+        return rows_count
+
+
+TimerBoardRowManager = TimerBoardRowManagerBase.from_queryset(TimerBoardRowQuerySet)
+
+
+def _timer_values(
+    timers_qs: models.QuerySet, field_lookups: Dict[str, str]
+) -> Iterator[dict]:
+    """Return values of timers by field name from the given lookups."""
+    for values in timers_qs.values(*field_lookups.values()):
+        yield {name: values[lookup] for name, lookup in field_lookups.items()}
+
+
+def _filter_by_tab(
+    queryset: models.QuerySet, tab_name: str, max_hours_passed: int
+) -> models.QuerySet:
+    """Return queryset filtered to the timers shown on a tab of the timer list.
+
+    Works for all models with the date and type fields of timers.
+    """
+    if tab_name == "current":
+        return queryset.filter(date__gte=now() - timedelta(hours=max_hours_passed))
+    elif tab_name == "preliminary":
+        return queryset.filter(timer_type=queryset.model.Type.PRELIMINARY)
+    elif tab_name == "past":
+        return queryset.filter(date__lt=now())
+    raise ValueError(f"Invalid tab name: {tab_name}")
+
+
+def _filter_visible_to_user(queryset: models.QuerySet, user: User) -> models.QuerySet:
+    """Return queryset filtered to the timers visible to the given user.
+
+    Works for all models with the visibility fields of timers.
+    """
+    Visibility = queryset.model.Visibility
+    corporation_pks, alliance_pks = user_organization_pks(user)
+    visible = Q(visibility=Visibility.UNRESTRICTED) | Q(user_id=user.pk)
+    if corporation_pks:
+        visible |= Q(
+            visibility=Visibility.CORPORATION,
+            eve_corporation_id__in=corporation_pks,
+        )
+    if alliance_pks:
+        visible |= Q(
+            visibility=Visibility.ALLIANCE,
+            eve_alliance_id__in=alliance_pks,
+        )
+    queryset = queryset.filter(visible)
+    if not user.has_perm("structuretimers.opsec_access"):
+        queryset = queryset.exclude(is_opsec=True)
+    return queryset
+
+
+def user_organization_pks(user: User) -> Tuple[Set[int], Set[int]]:
+    """Return PKs of the corporations and alliances of all characters of a user.
+
+    Results are cached until the character ownerships of the user change
+    or one of their corporations or alliances is created.
+    """
+    cache_key = _user_organizations_cache_key(user.pk)
+    result = cache.get(cache_key)
+    if result is None:
+        characters = user.character_ownerships.values_list(
+            "character__corporation_id", "character__alliance_id"
+        )
+        corporation_ids = {corporation_id for corporation_id, _ in characters}
+        alliance_ids = {alliance_id for _, alliance_id in characters if alliance_id}
+        corporation_pks = set(
+            EveCorporationInfo.objects.filter(
+                corporation_id__in=corporation_ids
+            ).values_list("pk", flat=True)
+        )
+        alliance_pks = set(
+            EveAllianceInfo.objects.filter(alliance_id__in=alliance_ids).values_list(
+                "pk", flat=True
+            )
+        )
+        result = (corporation_pks, alliance_pks)
+        cache.set(cache_key, result, timeout=USER_ORGANIZATIONS_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_user_organizations(user_pk: int) -> None:
+    """Invalidate the cached corporations and alliances of a user."""
+    cache.delete(_user_organizations_cache_key(user_pk))
+
+
+def _user_organizations_cache_key(user_pk: int) -> str:
+    return f"structuretimers_user_organizations_{user_pk}"
+
+
 class DistancesFromStagingManager(models.Manager):
     def calc_timer_for_staging_system(
         self,
@@ -118,6 +417,185 @@ class DistancesFromStagingManager(models.Manager):
     ):
         """Calculate distances for a timer from a staging system."""
         obj, created = self.get_or_create(timer=timer, staging_system=staging_system)
-        if force_update or created:
+        if force_update or created or obj.jumps is None:
             obj.calculate()
             obj.save()
+
+    def calc_timers_for_staging_system(
+        self,
+        timers_qs: models.QuerySet,
+        staging_system: models.Model,
+        force_update: bool = False,
+        batch_size: int = 500,
+        local_only: bool = False,
+    ) -> int:
+        """Calculate distances for several timers from a staging system in bulk.
+
+        Light years are always calculated. Jumps are calculated only when missing,
+        unless an update is forced. Jumps are taken from the cached distances
+        for each pair of solar systems.
+
+        When ``local_only`` is set, jumps are only calculated from the local
+        stargate graph and jumps which would need ESI are left empty.
+
+        Returns number of timers distances were calculated for.
+        """
+        count = self.calc_light_years(
+            [staging_system], timers_qs=timers_qs, batch_size=batch_size
+        )
+        if not staging_system.eve_solar_system_id:
+            return count
+
+        distances_qs = self.filter(staging_system=staging_system, timer__in=timers_qs)
+        if not force_update:
+            distances_qs = distances_qs.filter(jumps__isnull=True)
+        distances = list(distances_qs.values_list("pk", "timer__eve_solar_system_id"))
+        destination_ids = {
+            solar_system_id for _, solar_system_id in distances if solar_system_id
+        }
+        solar_systems = EveSolarSystem.objects.in_bulk(
+            destination_ids | {staging_system.eve_solar_system_id}
+        )
+        system_distances = system_distances_many(
+            origin=solar_systems[staging_system.eve_solar_system_id],
+            destinations=[solar_systems[obj_id] for obj_id in destination_ids],
+            local_only=local_only,
+        )
+        objs = []
+        updated_at = now()
+        for pk, solar_system_id in distances:
+            if local_only and solar_system_id not in system_distances:
+                continue
+            _, jumps = system_distances.get(solar_system_id, (None, None))
+            objs.append(self.model(pk=pk, jumps=jumps, updated_at=updated_at))
+
+        self.bulk_update(objs, fields=["jumps", "updated_at"], batch_size=batch_size)
+        return count
+
+    def recalc_for_timer(self, timer: models.Model) -> int:
+        """Recalculate existing distances for a timer in place,
+        e.g. after its solar system has changed.
+
+        Light years are updated right away and jumps are reset,
+        so they will be recalculated by the next calculation.
+
+        Returns number of updated distances objects.
+        """
+        staging_systems = self.model._meta.get_field(
+            "staging_system"
+        ).related_model.objects.filter(distances__timer=timer)
+        return self.calc_light_years(
+            staging_systems,
+            timers_qs=timer.__class__.objects.filter(pk=timer.pk),
+            reset_jumps=True,
+        )
+
+    def calc_light_years(
+        self,
+        staging_systems: Iterable[models.Model],
+        timers_qs: Optional[models.QuerySet] = None,
+        batch_size: int = 500,
+        reset_jumps: bool = False,
+    ) -> int:
+        """Calculate light years between timers and staging systems in bulk.
+
+        Distances are calculated once for each pair of solar systems
+        from coordinates fetched in one query.
+        Missing distances objects are created and existing ones updated.
+
+        Args:
+            staging_systems: Staging systems to calculate distances from
+            timers_qs: Timers to calculate distances to. Defaults to all timers.
+            batch_size: Maximum number of objects written in one query
+            reset_jumps: Whether to also reset jumps of existing distances objects
+
+        Returns:
+            Number of created or updated distances objects
+        """
+        staging_systems = list(staging_systems)
+        if timers_qs is None:
+            timers_qs = self.model._meta.get_field("timer").related_model.objects
+        timers = list(timers_qs.values_list("pk", "eve_solar_system_id"))
+        if not staging_systems or not timers:
+            return 0
+
+        solar_system_ids = {solar_system_id for _, solar_system_id in timers} | {
+            obj.eve_solar_system_id for obj in staging_systems
+        }
+        positions = {
+            row[0]: row[1:]
+            for row in EveSolarSystem.objects.filter(
+                id__in=solar_system_ids
+            ).values_list("id", "position_x", "position_y", "position_z")
+        }
+        light_years = {}
+        for staging_system in staging_systems:
+            origin_id = staging_system.eve_solar_system_id
+            for _, destination_id in timers:
+                key = (origin_id, destination_id)
+                if key not in light_years:
+                    light_years[key] = _light_years_between(
+                        origin_id, destination_id, positions
+                    )
+
+        timer_systems = dict(timers)
+        staging_systems_by_pk = {obj.pk: obj for obj in staging_systems}
+        existing = self.filter(
+            staging_system__in=staging_systems,
+            timer_id__in=timer_systems.keys(),
+        ).only("pk", "timer_id", "staging_system_id")
+        updated_at = now()
+        objs_to_update = []
+        existing_keys = set()
+        for obj in existing:
+            existing_keys.add((obj.timer_id, obj.staging_system_id))
+            staging_system = staging_systems_by_pk[obj.staging_system_id]
+            obj.light_years = light_years[
+                (staging_system.eve_solar_system_id, timer_systems[obj.timer_id])
+            ]
+            obj.updated_at = updated_at
+            if reset_jumps:
+                obj.jumps = None
+            objs_to_update.append(obj)
+
+        objs_to_create = [
+            self.model(
+                timer_id=timer_pk,
+                staging_system=staging_system,
+                light_years=light_years[
+                    (staging_system.eve_solar_system_id, solar_system_id)
+                ],
+            )
+            for staging_system in staging_systems
+            for timer_pk, solar_system_id in timers
+            if (timer_pk, staging_system.pk) not in existing_keys
+        ]
+        fields = ["light_years", "updated_at"]
+        if reset_jumps:
+            fields.append("jumps")
+        self.bulk_update(objs_to_update, fields=fields, batch_size=batch_size)
+        self.bulk_create(objs_to_create, batch_size=batch_size, ignore_conflicts=True)
+        return len(objs_to_update) + len(objs_to_create)
+
+
+def _light_years_between(
+    origin_id: Optional[int],
+    destination_id: Optional[int],
+    positions: Dict[int, Tuple[float, float, float]],
+) -> Optional[float]:
+    """Return distance in light years between two solar systems
+    or None if it can not be calculated, e.g. for wormhole systems.
+    """
+    if not origin_id or not destination_id:
+        return None
+
+    for solar_system_id in (origin_id, destination_id):
+        if WH_SPACE_MIN_ID <= solar_system_id < WH_SPACE_MAX_ID:
+            return None
+
+    origin = positions.get(origin_id)
+    destination = positions.get(destination_id)
+    if not origin or not all(origin) or not destination or not all(destination):
+        return None
+
+    return meters_to_ly(math.dist(origin, destination))
@@ -0,0 +1,403 @@
+"""Matching of notification rules against timers."""
+
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Set
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Q
+
+WH_SPACE_MIN_ID = 31000000
+WH_SPACE_MAX_ID = 32000000  # exclusive
+
+INDEX_VERSION_CACHE_KEY = "structuretimers_notification_rule_index_version"
+
+
+def _clause_to_bool(value: str, clause: type) -> Optional[bool]:
+    if value == clause.REQUIRED:
+        return True
+    if value == clause.EXCLUDED:
+        return False
+    return None
+
+
+def _related_ids(manager: models.Manager) -> FrozenSet[int]:
+    """Return IDs of all objects of a related manager.
+
+    Will use prefetched objects if available.
+    """
+    return frozenset(obj.pk for obj in manager.all())
+
+
+@dataclass(frozen=True)
+class NotificationRuleMatcher:
+    """A notification rule compiled for matching timers in memory.
+
+    All M2M relations of a rule are resolved into sets of IDs once,
+    so that matching timers requires no database queries.
+
+    For clauses a value of True means required, False means excluded
+    and None means any.
+    """
+
+    notification_rule_pk: Optional[int]
+    is_important: Optional[bool]
+    is_opsec: Optional[bool]
+    require_timer_types: FrozenSet[str]
+    exclude_timer_types: FrozenSet[str]
+    require_objectives: FrozenSet[str]
+    exclude_objectives: FrozenSet[str]
+    require_visibility: FrozenSet[str]
+    exclude_visibility: FrozenSet[str]
+    require_space_types: FrozenSet[str]
+    exclude_space_types: FrozenSet[str]
+    require_corporation_ids: FrozenSet[int]
+    exclude_corporation_ids: FrozenSet[int]
+    require_alliance_ids: FrozenSet[int]
+    exclude_alliance_ids: FrozenSet[int]
+    require_region_ids: FrozenSet[int]
+    exclude_region_ids: FrozenSet[int]
+
+    @classmethod
+    def from_notification_rule(cls, rule: models.Model) -> "NotificationRuleMatcher":
+        """Compile a notification rule into a new matcher.
+
+        Needs one query per M2M relation, unless they have been prefetched.
+        """
+        return cls(
+            notification_rule_pk=rule.pk,
+            is_important=_clause_to_bool(rule.is_important, rule.Clause),
+            is_opsec=_clause_to_bool(rule.is_opsec, rule.Clause),
+            require_timer_types=frozenset(rule.require_timer_types),
+            exclude_timer_types=frozenset(rule.exclude_timer_types),
+            require_objectives=frozenset(rule.require_objectives),
+            exclude_objectives=frozenset(rule.exclude_objectives),
+            require_visibility=frozenset(rule.require_visibility),
+            exclude_visibility=frozenset(rule.exclude_visibility),
+            require_space_types=frozenset(rule.require_space_types),
+            exclude_space_types=frozenset(rule.exclude_space_types),
+            require_corporation_ids=_related_ids(rule.require_corporations),
+            exclude_corporation_ids=_related_ids(rule.exclude_corporations),
+            require_alliance_ids=_related_ids(rule.require_alliances),
+            exclude_alliance_ids=_related_ids(rule.exclude_alliances),
+            require_region_ids=_related_ids(rule.require_regions),
+            exclude_region_ids=_related_ids(rule.exclude_regions),
+        )
+
+    def is_matching_timer(self, timer: models.Model) -> bool:
+        """Return True if the given timer matches, else False.
+
+        Does not query the database, if the solar system of the timer
+        has been fetched together with it's constellation.
+        """
+        if timer.date is None:
+            return False
+
+        if self.is_important is not None and timer.is_important != self.is_important:
+            return False
+
+        if self.is_opsec is not None and timer.is_opsec != self.is_opsec:
+            return False
+
+        if not _is_matching_value(
+            timer.visibility, self.require_visibility, self.exclude_visibility
+        ):
+            return False
+
+        if not _is_matching_value(
+            timer.timer_type, self.require_timer_types, self.exclude_timer_types
+        ):
+            return False
+
+        if not _is_matching_value(
+            timer.objective, self.require_objectives, self.exclude_objectives
+        ):
+            return False
+
+        if not _is_matching_value(
+            timer.eve_corporation_id,
+            self.require_corporation_ids,
+            self.exclude_corporation_ids,
+        ):
+            return False
+
+        if not _is_matching_value(
+            timer.eve_alliance_id, self.require_alliance_ids, self.exclude_alliance_ids
+        ):
+            return False
+
+        if timer.eve_solar_system_id and (
+            self.require_region_ids or self.exclude_region_ids
+        ):
+            region_id = timer.eve_solar_system.eve_constellation.eve_region_id
+            if not _is_matching_value(
+                region_id, self.require_region_ids, self.exclude_region_ids
+            ):
+                return False
+
+        if self.require_space_types or self.exclude_space_types:
+            if not _is_matching_value(
+                timer.space_type, self.require_space_types, self.exclude_space_types
+            ):
+                return False
+
+        return True
+
+    def timer_query(self) -> Q:
+        """Return query for filtering timers matching this rule in the database.
+
+        The query produces the same results as :meth:`is_matching_timer`.
+        """
+        query = Q(date__isnull=False)
+        if self.is_important is not None:
+            query &= Q(is_important=self.is_important)
+
+        if self.is_opsec is not None:
+            query &= Q(is_opsec=self.is_opsec)
+
+        query &= _matching_value_query(
+            "visibility", self.require_visibility, self.exclude_visibility
+        )
+        query &= _matching_value_query(
+            "timer_type", self.require_timer_types, self.exclude_timer_types
+        )
+        query &= _matching_value_query(
+            "objective", self.require_objectives, self.exclude_objectives
+        )
+        query &= _matching_value_query(
+            "eve_corporation_id",
+            self.require_corporation_ids,
+            self.exclude_corporation_ids,
+        )
+        query &= _matching_value_query(
+            "eve_alliance_id", self.require_alliance_ids, self.exclude_alliance_ids
+        )
+        if self.require_region_ids or self.exclude_region_ids:
+            query &= Q(eve_solar_system__isnull=True) | _matching_value_query(
+                "eve_solar_system__eve_constellation__eve_region_id",
+                self.require_region_ids,
+                self.exclude_region_ids,
+            )
+
+        if self.require_space_types:
+            query &= _space_types_query(self.require_space_types)
+
+        if self.exclude_space_types:
+            query &= ~_space_types_query(self.exclude_space_types)
+
+        return query
+
+
+def _is_matching_value(value, required: frozenset, excluded: frozenset) -> bool:
+    if required and value not in required:
+        return False
+    if excluded and value in excluded:
+        return False
+    return True
+
+
+def _matching_value_query(
+    field_name: str, required: frozenset, excluded: frozenset
+) -> Q:
+    query = Q()
+    if required:
+        query &= Q(**{f"{field_name}__in": sorted(required)})
+    if excluded:
+        query &= ~Q(**{f"{field_name}__in": sorted(excluded)})
+    return query
+
+
+def _space_type_query(space_type: str) -> Q:
+    """Return query for timers in the given space type.
+
+    Mirrors how space types are derived from solar systems in Python,
+    where the rounded security status is used to determine the security class.
+    """
+    from .models import Timer
+
+    if space_type == Timer.SpaceType.UNDEFINED:
+        return Q(eve_solar_system__isnull=True)
+    if space_type == Timer.SpaceType.HIGH_SEC:
+        return Q(eve_solar_system__security_status__gte=0.45)
+    if space_type == Timer.SpaceType.LOW_SEC:
+        return Q(
+            eve_solar_system__security_status__gte=0.05,
+            eve_solar_system__security_status__lt=0.45,
+        )
+    is_w_space = Q(
+        eve_solar_system_id__gte=WH_SPACE_MIN_ID,
+        eve_solar_system_id__lt=WH_SPACE_MAX_ID,
+    )
+    if space_type == Timer.SpaceType.NULL_SEC:
+        return Q(eve_solar_system__security_status__lt=0.05) & ~is_w_space
+    if space_type == Timer.SpaceType.WH_SPACE:
+        return Q(eve_solar_system__security_status__lt=0.05) & is_w_space
+    raise ValueError(f"Unknown space type: {space_type}")
+
+
+def _space_types_query(space_types: frozenset) -> Q:
+    query = Q()
+    for space_type in sorted(space_types):
+        query |= _space_type_query(space_type)
+    return query
+
+
+def _bool_to_set(value: Optional[bool]) -> frozenset:
+    return frozenset() if value is None else frozenset({value})
+
+
+def _timer_region_id(timer: models.Model) -> Optional[int]:
+    if not timer.eve_solar_system_id:
+        return None
+    return timer.eve_solar_system.eve_constellation.eve_region_id
+
+
+class _IndexDimension:
+    """Index of rules for one property of a timer."""
+
+    def __init__(
+        self,
+        timer_value: Callable[[models.Model], Any],
+        skip_none: bool = False,
+    ) -> None:
+        self.timer_value = timer_value
+        self.skip_none = skip_none
+        self.unconstrained: Set[int] = set()
+        self.required: Dict[Any, Set[int]] = defaultdict(set)
+        self.excluded: Dict[Any, Set[int]] = defaultdict(set)
+
+    def add(self, rule_pk: int, required: frozenset, excluded: frozenset) -> None:
+        if required:
+            for value in required:
+                self.required[value].add(rule_pk)
+        else:
+            self.unconstrained.add(rule_pk)
+        for value in excluded:
+            self.excluded[value].add(rule_pk)
+
+    def filter(self, rule_pks: Set[int], timer: models.Model) -> Set[int]:
+        """Return subset of given rules, which match the given timer."""
+        if not self.required and not self.excluded:
+            return rule_pks
+        value = self.timer_value(timer)
+        if value is None and self.skip_none:
+            return rule_pks
+        accepted = rule_pks & self.unconstrained
+        if value in self.required:
+            accepted |= rule_pks & self.required[value]
+        if value in self.excluded:
+            accepted -= self.excluded[value]
+        return accepted
+
+
+class NotificationRuleIndex:
+    """Inverted index of notification rules for finding matching rules fast.
+
+    Rules are indexed for each property of a timer they can match on.
+    Matching rules for a timer are then found by intersecting the sets of rules
+    accepting each property of that timer.
+    """
+
+    def __init__(
+        self, matchers: Iterable[NotificationRuleMatcher], version: str = ""
+    ) -> None:
+        self.version = version
+        self._rule_pks: Set[int] = set()
+        self._dimensions = {
+            "is_important": _IndexDimension(lambda timer: timer.is_important),
+            "is_opsec": _IndexDimension(lambda timer: timer.is_opsec),
+            "visibility": _IndexDimension(lambda timer: timer.visibility),
+            "timer_type": _IndexDimension(lambda timer: timer.timer_type),
+            "objective": _IndexDimension(lambda timer: timer.objective),
+            "corporation": _IndexDimension(lambda timer: timer.eve_corporation_id),
+            "alliance": _IndexDimension(lambda timer: timer.eve_alliance_id),
+            "region": _IndexDimension(_timer_region_id, skip_none=True),
+            "space_type": _IndexDimension(lambda timer: timer.space_type),
+        }
+        for matcher in matchers:
+            self._add(matcher)
+
+    def __len__(self) -> int:
+        return len(self._rule_pks)
+
+    def _add(self, matcher: NotificationRuleMatcher) -> None:
+        rule_pk = matcher.notification_rule_pk
+        self._rule_pks.add(rule_pk)
+        dimensions = self._dimensions
+        dimensions["is_important"].add(
+            rule_pk, _bool_to_set(matcher.is_important), frozenset()
+        )
+        dimensions["is_opsec"].add(rule_pk, _bool_to_set(matcher.is_opsec), frozenset())
+        dimensions["visibility"].add(
+            rule_pk, matcher.require_visibility, matcher.exclude_visibility
+        )
+        dimensions["timer_type"].add(
+            rule_pk, matcher.require_timer_types, matcher.exclude_timer_types
+        )
+        dimensions["objective"].add(
+            rule_pk, matcher.require_objectives, matcher.exclude_objectives
+        )
+        dimensions["corporation"].add(
+            rule_pk, matcher.require_corporation_ids, matcher.exclude_corporation_ids
+        )
+        dimensions["alliance"].add(
+            rule_pk, matcher.require_alliance_ids, matcher.exclude_alliance_ids
+        )
+        dimensions["region"].add(
+            rule_pk, matcher.require_region_ids, matcher.exclude_region_ids
+        )
+        dimensions["space_type"].add(
+            rule_pk, matcher.require_space_types, matcher.exclude_space_types
+        )
+
+    def matching_rule_pks(self, timer: models.Model) -> Set[int]:
+        """Return PKs of all indexed rules matching the given timer."""
+        if timer.date is None:
+            return set()
+        rule_pks = set(self._rule_pks)
+        for dimension in self._dimensions.values():
+            if not rule_pks:
+                break
+            rule_pks = dimension.filter(rule_pks, timer)
+        return rule_pks
+
+
+_notification_rule_index: Optional[NotificationRuleIndex] = None
+
+
+def notification_rule_index() -> NotificationRuleIndex:
+    """Return the index for all notification rules.
+
+    The index is kept in memory and rebuild when rules have been changed
+    in any process.
+    """
+    from .models import NotificationRule
+
+    global _notification_rule_index
+
+    version = cache.get(INDEX_VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(INDEX_VERSION_CACHE_KEY, version, timeout=None)
+
+    if (
+        _notification_rule_index is not None
+        and _notification_rule_index.version == version
+    ):
+        return _notification_rule_index
+
+    rules_qs = NotificationRule.objects.prefetch_related_for_matching()
+    _notification_rule_index = NotificationRuleIndex(
+        matchers=(rule.matcher for rule in rules_qs), version=version
+    )
+    return _notification_rule_index
+
+
+def invalidate_notification_rule_index() -> None:
+    """Invalidate the notification rule index in all processes."""
+    global _notification_rule_index
+
+    _notification_rule_index = None
+    cache.set(INDEX_VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
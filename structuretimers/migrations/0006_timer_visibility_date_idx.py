@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0005_alter_notificationrule_exclude_space_types_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["visibility", "date"], name="timer_visibility_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.10 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0006_timer_visibility_date_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeletedTimer",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("timer_id", models.PositiveIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.0.10 on 2026-10-17 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0007_deleted_timer"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="distancesfromstaging",
+            index=models.Index(
+                fields=["staging_system", "timer"], name="distances_staging_timer_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="schedulednotification",
+            index=models.Index(
+                fields=["notification_rule", "timer_date"],
+                name="schednotif_rule_timer_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["timer_type", "date"], name="timer_timer_type_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["eve_corporation", "visibility", "date"],
+                name="timer_corp_visibility_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["eve_alliance", "visibility", "date"],
+                name="timer_alli_visibility_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timer",
+            index=models.Index(
+                fields=["last_updated_at"], name="timer_last_updated_at_idx"
+            ),
+        ),
+    ]
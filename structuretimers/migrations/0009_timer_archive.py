@@ -0,0 +1,118 @@
+# Generated by Django 4.0.10 on 2026-10-17 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0008_timer_board_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimerArchive",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "timer_id",
+                    models.PositiveIntegerField(help_text="ID of the archived timer"),
+                ),
+                ("date", models.DateTimeField(db_index=True, null=True)),
+                ("details_image_url", models.CharField(max_length=1024, null=True)),
+                ("details_notes", models.TextField(default="")),
+                (
+                    "eve_alliance_id",
+                    models.PositiveIntegerField(
+                        help_text="ID of the alliance of the user who created this timer",
+                        null=True,
+                    ),
+                ),
+                ("eve_alliance_name", models.CharField(max_length=254, null=True)),
+                ("eve_character_name", models.CharField(max_length=254, null=True)),
+                (
+                    "eve_corporation_id",
+                    models.PositiveIntegerField(
+                        help_text="ID of the corporation of the user who created this timer",
+                        null=True,
+                    ),
+                ),
+                ("eve_corporation_name", models.CharField(max_length=254, null=True)),
+                ("eve_region_name", models.CharField(max_length=100, null=True)),
+                ("eve_solar_system_id", models.PositiveIntegerField(null=True)),
+                (
+                    "eve_solar_system_name",
+                    models.CharField(max_length=100, null=True),
+                ),
+                ("is_important", models.BooleanField(default=False)),
+                ("is_opsec", models.BooleanField(default=False)),
+                (
+                    "last_updated_at",
+                    models.DateTimeField(
+                        help_text="Date when the timer was last updated", null=True
+                    ),
+                ),
+                ("location_details", models.CharField(default="", max_length=254)),
+                (
+                    "objective",
+                    models.CharField(
+                        choices=[
+                            ("UN", "undefined"),
+                            ("HO", "hostile"),
+                            ("FR", "friendly"),
+                            ("NE", "neutral"),
+                        ],
+                        default="UN",
+                        max_length=2,
+                    ),
+                ),
+                ("owner_name", models.CharField(max_length=254, null=True)),
+                ("structure_name", models.CharField(default="", max_length=254)),
+                ("structure_type_id", models.PositiveIntegerField(null=True)),
+                ("structure_type_name", models.CharField(max_length=100, null=True)),
+                (
+                    "timer_type",
+                    models.CharField(
+                        choices=[
+                            ("NO", "Unspecified"),
+                            ("AR", "Armor"),
+                            ("HL", "Hull"),
+                            ("FI", "Final"),
+                            ("AN", "Anchoring"),
+                            ("UA", "Unanchoring"),
+                            ("MM", "Moon Mining"),
+                            ("PL", "Preliminary"),
+                        ],
+                        default="NO",
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "user_id",
+                    models.PositiveIntegerField(
+                        help_text="ID of the user who created this timer", null=True
+                    ),
+                ),
+                (
+                    "visibility",
+                    models.CharField(
+                        choices=[
+                            ("UN", "unrestricted"),
+                            ("AL", "Alliance only"),
+                            ("CO", "Corporation only"),
+                        ],
+                        default="UN",
+                        max_length=2,
+                    ),
+                ),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
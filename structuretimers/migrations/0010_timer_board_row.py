@@ -0,0 +1,124 @@
+# Generated by Django 4.0.10 on 2026-10-17 01:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0009_timer_archive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimerBoardRow",
+            fields=[
+                (
+                    "timer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="board_row",
+                        serialize=False,
+                        to="structuretimers.timer",
+                    ),
+                ),
+                ("date", models.DateTimeField(db_index=True, null=True)),
+                ("eve_alliance_id", models.PositiveIntegerField(null=True)),
+                ("eve_alliance_name", models.CharField(max_length=254, null=True)),
+                ("eve_corporation_id", models.PositiveIntegerField(null=True)),
+                ("eve_corporation_name", models.CharField(max_length=254, null=True)),
+                ("eve_region_id", models.PositiveIntegerField(null=True)),
+                ("eve_region_name", models.CharField(max_length=100, null=True)),
+                ("eve_solar_system_id", models.PositiveIntegerField(null=True)),
+                (
+                    "eve_solar_system_name",
+                    models.CharField(max_length=100, null=True),
+                ),
+                ("has_details", models.BooleanField(default=False)),
+                ("is_important", models.BooleanField(default=False)),
+                ("is_opsec", models.BooleanField(default=False)),
+                ("last_updated_at", models.DateTimeField()),
+                ("location_details", models.CharField(default="", max_length=254)),
+                (
+                    "objective",
+                    models.CharField(
+                        choices=[
+                            ("UN", "undefined"),
+                            ("HO", "hostile"),
+                            ("FR", "friendly"),
+                            ("NE", "neutral"),
+                        ],
+                        default="UN",
+                        max_length=2,
+                    ),
+                ),
+                ("owner_name", models.CharField(max_length=254, null=True)),
+                ("structure_name", models.CharField(default="", max_length=254)),
+                ("structure_type_id", models.PositiveIntegerField(null=True)),
+                ("structure_type_name", models.CharField(max_length=100, null=True)),
+                (
+                    "timer_type",
+                    models.CharField(
+                        choices=[
+                            ("NO", "Unspecified"),
+                            ("AR", "Armor"),
+                            ("HL", "Hull"),
+                            ("FI", "Final"),
+                            ("AN", "Anchoring"),
+                            ("UA", "Unanchoring"),
+                            ("MM", "Moon Mining"),
+                            ("PL", "Preliminary"),
+                        ],
+                        default="NO",
+                        max_length=2,
+                    ),
+                ),
+                ("user_id", models.PositiveIntegerField(null=True)),
+                (
+                    "visibility",
+                    models.CharField(
+                        choices=[
+                            ("UN", "unrestricted"),
+                            ("AL", "Alliance only"),
+                            ("CO", "Corporation only"),
+                        ],
+                        default="UN",
+                        max_length=2,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="timerboardrow",
+            index=models.Index(
+                fields=["visibility", "date"], name="boardrow_visibility_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timerboardrow",
+            index=models.Index(
+                fields=["timer_type", "date"], name="boardrow_timer_type_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timerboardrow",
+            index=models.Index(
+                fields=["eve_corporation_id", "visibility", "date"],
+                name="boardrow_corp_visib_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timerboardrow",
+            index=models.Index(
+                fields=["eve_alliance_id", "visibility", "date"],
+                name="boardrow_alli_visib_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="timerboardrow",
+            index=models.Index(
+                fields=["last_updated_at"], name="boardrow_last_updated_at_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-17 01:42
+
+from django.db import migrations, models
+
+
+def delete_entries_without_scope(apps, schema_editor):
+    # existing entries do not know who could see their timers
+    DeletedTimer = apps.get_model("structuretimers", "DeletedTimer")
+    DeletedTimer.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("structuretimers", "0010_timer_board_row"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_entries_without_scope, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="deletedtimer",
+            name="eve_alliance_id",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="deletedtimer",
+            name="eve_corporation_id",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="deletedtimer",
+            name="is_opsec",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="deletedtimer",
+            name="user_id",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="deletedtimer",
+            name="visibility",
+            field=models.CharField(
+                choices=[
+                    ("UN", "unrestricted"),
+                    ("AL", "Alliance only"),
+                    ("CO", "Corporation only"),
+                ],
+                default="UN",
+                max_length=2,
+            ),
+        ),
+    ]
@@ -1,17 +1,16 @@
 import json
-from time import sleep
-from typing import Any, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import dhooks_lite
 from multiselectfield import MultiSelectField
 from simple_mq import SimpleMQ
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.urls import reverse
-from django.utils.functional import classproperty
+from django.utils.functional import cached_property, classproperty
 from django.utils.translation import gettext_lazy as _
-from eveuniverse.helpers import meters_to_ly
 from eveuniverse.models import EveRegion, EveSolarSystem, EveType
 
 from allianceauth.eveonline.evelinks import dotlan
@@ -21,7 +20,6 @@ from allianceauth.eveonline.models import (
     EveCorporationInfo,
 )
 from allianceauth.services.hooks import get_extension_logger
-from app_utils.allianceauth import get_redis_client
 from app_utils.datetime import DATETIME_FORMAT
 from app_utils.json import JSONDateTimeDecoder, JSONDateTimeEncoder
 from app_utils.logging import LoggerAddTag
@@ -30,9 +28,28 @@ from app_utils.urls import reverse_absolute, static_file_absolute_url
 from . import __title__
 from .app_settings import (
     STRUCTURETIMER_NOTIFICATION_SET_AVATAR,
+    STRUCTURETIMERS_DISTANCES_LAZY_ENABLED,
+    STRUCTURETIMERS_LIVE_UPDATES_ENABLED,
     STRUCTURETIMERS_NOTIFICATIONS_ENABLED,
 )
-from .managers import DistancesFromStagingManager, NotificationRuleManager, TimerManager
+from .discord import merge_messages, message_queue, webhook_client
+from .jumps import system_distances
+from .live import (
+    EVENT_CREATED,
+    EVENT_UPDATED,
+    SCOPE_FIELDS,
+    publish_timer_event,
+    timer_scope,
+)
+from .managers import (
+    DeletedTimerManager,
+    DistancesFromStagingManager,
+    NotificationRuleManager,
+    TimerArchiveManager,
+    TimerBoardRowManager,
+    TimerManager,
+)
+from .matching import NotificationRuleMatcher
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
@@ -80,10 +97,6 @@ class DiscordWebhook(models.Model):
     ZKB_KILLMAIL_BASEURL = "https://zkillboard.com/kill/"
     ICON_SIZE = 128
 
-    # delay in seconds between every message sent to Discord
-    # this needs to be >= 1 to prevent 429 Too Many Request errors
-    SEND_DELAY = 2
-
     name = models.CharField(
         max_length=64, unique=True, help_text="short name to identify this webhook"
     )
@@ -107,30 +120,32 @@ class DiscordWebhook(models.Model):
         help_text="whether notifications are currently sent to this webhook",
     )
 
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
-        redis_client = get_redis_client()
-        self._main_queue = SimpleMQ(redis_client, f"{__title__}_webhook_{self.pk}_main")
-        self._error_queue = SimpleMQ(
-            redis_client, f"{__title__}_webhook_{self.pk}_errors"
-        )
-
     def __str__(self) -> str:
         return self.name
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(id={self.id}, name='{self.name}')"
 
+    @property
+    def _main_queue(self) -> SimpleMQ:
+        return message_queue(f"{__title__}_webhook_{self.pk}_main")
+
+    @property
+    def _error_queue(self) -> SimpleMQ:
+        return message_queue(f"{__title__}_webhook_{self.pk}_errors")
+
     def send_message(
         self,
         content: Optional[str] = None,
-        embeds: Optional[List[dhooks_lite.Embed]] = None,
+        embeds: Optional[List[Union[dhooks_lite.Embed, dict]]] = None,
         tts: Optional[bool] = None,
         username: Optional[str] = None,
         avatar_url: Optional[str] = None,
     ) -> int:
         """Adds Discord message to queue for later sending
 
+        Embeds can be given as objects or already serialized as dict.
+
         Returns updated size of queue
         Raises ValueError if message is incomplete
         """
@@ -138,7 +153,10 @@ class DiscordWebhook(models.Model):
             raise ValueError("Message must have content or embeds to be valid")
 
         if embeds:
-            embeds_list = [obj.asdict() for obj in embeds]
+            embeds_list = [
+                obj.asdict() if isinstance(obj, dhooks_lite.Embed) else obj
+                for obj in embeds
+            ]
         else:
             embeds_list = None
 
@@ -161,23 +179,38 @@ class DiscordWebhook(models.Model):
 
         Return number of successful sent messages
 
-        Messages that could not be sent are put back into the queue for later retry
+        Consecutive messages with compatible content are combined
+        into one message with multiple embeds.
+        Messages that could not be sent are put back into the queue for later retry.
+        Sending is paced by the rate limits reported by Discord.
         """
         message_count = 0
+        pending_message = None
+        pending_message_jsons = []
         while True:
             message_json = self._main_queue.dequeue()
-            if message_json:
-                message = json.loads(message_json, cls=JSONDateTimeDecoder)
-                logger.debug("Sending message to webhook %s", self)
-                if self.send_message_to_webhook(message):
-                    message_count += 1
-                else:
-                    self._error_queue.enqueue(message_json)
+            if not message_json:
+                break
 
-                sleep(self.SEND_DELAY)
+            message = json.loads(message_json, cls=JSONDateTimeDecoder)
+            if pending_message:
+                merged_message = merge_messages(pending_message, message)
+                if merged_message:
+                    pending_message = merged_message
+                    pending_message_jsons.append(message_json)
+                    continue
 
-            else:
-                break
+                message_count += self._send_combined_message(
+                    pending_message, pending_message_jsons
+                )
+
+            pending_message = message
+            pending_message_jsons = [message_json]
+
+        if pending_message:
+            message_count += self._send_combined_message(
+                pending_message, pending_message_jsons
+            )
 
         while True:
             message_json = self._error_queue.dequeue()
@@ -188,6 +221,23 @@ class DiscordWebhook(models.Model):
 
         return message_count
 
+    def _send_combined_message(self, message: dict, message_jsons: List[str]) -> int:
+        """Send a message combined from queued messages.
+
+        Returns number of queued messages sent.
+        """
+        logger.debug(
+            "Sending message combined from %d queued messages to webhook %s",
+            len(message_jsons),
+            self,
+        )
+        if self.send_message_to_webhook(message):
+            return len(message_jsons)
+
+        for message_json in message_jsons:
+            self._error_queue.enqueue(message_json)
+        return 0
+
     def queue_size(self) -> int:
         """returns current size of the queue"""
         return self._main_queue.size()
@@ -209,7 +259,7 @@ class DiscordWebhook(models.Model):
 
         returns True if successful, else False
         """
-        hook = dhooks_lite.Webhook(url=self.url)
+        hook = webhook_client(self.url)
         if message.get("embeds"):
             embeds = [
                 dhooks_lite.Embed.from_dict(embed_dict)
@@ -272,6 +322,18 @@ class DiscordWebhook(models.Model):
 class Timer(models.Model):
     """A structure timer"""
 
+    EMBED_CACHE_TIMEOUT = 3600 * 4  # seconds
+    TRACKED_FIELDS = (
+        "eve_solar_system_id",
+        "date",
+        "timer_type",
+        "visibility",
+        "user_id",
+        "eve_corporation_id",
+        "eve_alliance_id",
+        "is_opsec",
+    )
+
     # TODO: Old constants needed to maintain compatibility with other apps
     # during transition only. REMOVE as soon as possible.
 
@@ -459,6 +521,25 @@ class Timer(models.Model):
 
     objects = TimerManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["visibility", "date"], name="timer_visibility_date_idx"
+            ),
+            models.Index(
+                fields=["timer_type", "date"], name="timer_timer_type_date_idx"
+            ),
+            models.Index(
+                fields=["eve_corporation", "visibility", "date"],
+                name="timer_corp_visibility_date_idx",
+            ),
+            models.Index(
+                fields=["eve_alliance", "visibility", "date"],
+                name="timer_alli_visibility_date_idx",
+            ),
+            models.Index(fields=["last_updated_at"], name="timer_last_updated_at_idx"),
+        ]
+
     def __str__(self):
         return "{} timer for {}{}".format(
             self.get_timer_type_display(),
@@ -466,6 +547,36 @@ class Timer(models.Model):
             f" @ {self.date.strftime(DATETIME_FORMAT)}" if self.date else "",
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS
+        }
+        return instance
+
+    def _tracked_values(self) -> dict:
+        return {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def _tracked_values_from_db(self) -> Optional[dict]:
+        """Return values of tracked fields as stored in the database
+        or None if this timer has not been stored yet.
+
+        Values captured when loading this timer are used when available,
+        so usually no query is needed.
+        """
+        if self.pk is None:
+            return None
+        loaded_values = getattr(self, "_loaded_values", {})
+        if all(name in loaded_values for name in self.TRACKED_FIELDS):
+            return loaded_values
+        try:
+            return Timer.objects.values(*self.TRACKED_FIELDS).get(pk=self.pk)
+        except (Timer.DoesNotExist, ValueError):
+            return None
+
     def get_absolute_url(self) -> str:
         url = reverse("structuretimers:timer_list")
         return (
@@ -489,26 +600,37 @@ class Timer(models.Model):
             and not disable_notifications
             and self.timer_type != self.Type.PRELIMINARY
         )
-        try:
-            old_instance = Timer.objects.get(pk=self.pk)
-        except (Timer.DoesNotExist, ValueError):
-            needs_recalc = True
+        old_values = self._tracked_values_from_db()
+        if old_values is None:
+            solar_system_changed = False
             date_changed = False
-            old_instance = None
         else:
-            needs_recalc = self.eve_solar_system != old_instance.eve_solar_system
-            date_changed = self.date != old_instance.date
+            solar_system_changed = (
+                self.eve_solar_system_id != old_values["eve_solar_system_id"]
+            )
+            date_changed = self.date != old_values["date"]
         is_new = self.pk is None
         super().save(*args, **kwargs)
-        if needs_recalc:
-            self.distances.all().delete()
+        self._loaded_values = self._tracked_values()
+        if old_values and timer_scope(old_values) != timer_scope(self):
+            # users who can no longer see this timer need to remove it
+            DeletedTimer.objects.create(timer_id=self.pk, **timer_scope(old_values))
+        if STRUCTURETIMERS_LIVE_UPDATES_ENABLED:
+            self.publish_live_event(
+                EVENT_CREATED if old_values is None else EVENT_UPDATED, old_values
+            )
+        if solar_system_changed:
+            DistancesFromStaging.objects.recalc_for_timer(self)
+        if solar_system_changed or (
+            old_values is None and not STRUCTURETIMERS_DISTANCES_LAZY_ENABLED
+        ):
             _task_calc_timer_distances_for_all_staging_systems().apply_async(
                 args=[self.pk], priority=4
             )
         if (
             self.timer_type == self.Type.PRELIMINARY
-            and old_instance
-            and old_instance.timer_type != self.Type.PRELIMINARY
+            and old_values
+            and old_values["timer_type"] != self.Type.PRELIMINARY
         ):
             self.scheduled_notifications.all().delete()
         if schedule_notifications and (is_new or date_changed):
@@ -516,6 +638,17 @@ class Timer(models.Model):
                 kwargs={"timer_pk": self.pk, "is_new": is_new}, priority=3
             )
 
+    def publish_live_event(self, event: str, old_values: Optional[dict] = None):
+        """Publish an event about this timer to live timer boards,
+        once the current transaction is committed.
+        """
+        timer_pk = self.pk
+        scope = timer_scope(self)
+        old_scope = timer_scope(old_values) if old_values else None
+        transaction.on_commit(
+            lambda: publish_timer_event(event, timer_pk, scope, old_scope)
+        )
+
     @property
     def structure_display_name(self):
         return "{}{} in {}{}".format(
@@ -575,39 +708,74 @@ class Timer(models.Model):
 
     def label_type_for_timer_type(self) -> str:
         """returns the Boostrap label type for a timer_type"""
-        label_types_map = {
-            self.Type.NONE: "default",
-            self.Type.ARMOR: "danger",
-            self.Type.HULL: "danger",
-            self.Type.FINAL: "danger",
-            self.Type.ANCHORING: "warning",
-            self.Type.UNANCHORING: "warning",
-            self.Type.MOONMINING: "success",
-        }
-        if self.timer_type in label_types_map:
-            label_type = label_types_map[self.timer_type]
-        else:
-            label_type = "default"
-        return label_type
+        return self.label_types_for_timer_types().get(self.timer_type, "default")
 
     def label_type_for_objective(self) -> str:
         """returns the Boostrap label type for objective"""
-        label_types_map = {
-            self.Objective.FRIENDLY: "primary",
-            self.Objective.HOSTILE: "danger",
-            self.Objective.NEUTRAL: "info",
-            self.Objective.UNDEFINED: "default",
+        return self.label_types_for_objectives().get(self.objective, "default")
+
+    @classmethod
+    def label_types_for_timer_types(cls) -> Dict[str, str]:
+        """returns the Boostrap label types for all timer types"""
+        return {
+            cls.Type.NONE: "default",
+            cls.Type.ARMOR: "danger",
+            cls.Type.HULL: "danger",
+            cls.Type.FINAL: "danger",
+            cls.Type.ANCHORING: "warning",
+            cls.Type.UNANCHORING: "warning",
+            cls.Type.MOONMINING: "success",
+        }
+
+    @classmethod
+    def label_types_for_objectives(cls) -> Dict[str, str]:
+        """returns the Boostrap label types for all objectives"""
+        return {
+            cls.Objective.FRIENDLY: "primary",
+            cls.Objective.HOSTILE: "danger",
+            cls.Objective.NEUTRAL: "info",
+            cls.Objective.UNDEFINED: "default",
         }
-        if self.objective in label_types_map:
-            label_type = label_types_map[self.objective]
-        else:
-            label_type = "default"
-        return label_type
 
     def send_notification(
         self, webhook: DiscordWebhook, content: Optional[str] = None
     ) -> None:
         """Sends notification related to this timer to given webhook."""
+        if STRUCTURETIMER_NOTIFICATION_SET_AVATAR:
+            username = __title__
+            avatar_url = default_avatar_url()
+        else:
+            username = None
+            avatar_url = None
+        webhook.send_message(
+            content=content,
+            embeds=[self.notification_embed()],
+            username=username,
+            avatar_url=avatar_url,
+        )
+
+    def notification_embed(self) -> dict:
+        """Returns the embed for notifications about this timer as dict.
+
+        Rendered embeds are cached for each version of a saved timer.
+        """
+        if not self.pk or not self.last_updated_at:
+            return self._render_notification_embed()
+
+        cache_key = self._notification_embed_cache_key()
+        embed = cache.get(cache_key)
+        if embed is None:
+            embed = self._render_notification_embed()
+            cache.set(cache_key, embed, timeout=self.EMBED_CACHE_TIMEOUT)
+        return embed
+
+    def _notification_embed_cache_key(self) -> str:
+        return (
+            f"structuretimers_timer_embed_{self.pk}_"
+            f"{self.last_updated_at.timestamp()}"
+        )
+
+    def _render_notification_embed(self) -> dict:
         structure_type_name = self.structure_type.name
         solar_system_name = self.eve_solar_system.name if self.eve_solar_system else ""
         title = f"{structure_type_name} in {solar_system_name}"
@@ -622,7 +790,7 @@ class Timer(models.Model):
             if self.eve_solar_system
             else ""
         )
-        solar_system_link = webhook.create_discord_link(
+        solar_system_link = DiscordWebhook.create_discord_link(
             name=solar_system_name, url=dotlan.solar_system_url(solar_system_name)
         )
         solar_system_text = f"{solar_system_link} ({region_name})"
@@ -635,7 +803,7 @@ class Timer(models.Model):
             f"will elapse at **{elapse_at}**. "
             f"Our stance is: **{self.get_objective_display()}**."
         )
-        structure_icon_url = self.structure_type.icon_url(size=128)
+        structure_icon_url = self.structure_type.icon_url(size=DiscordWebhook.ICON_SIZE)
         if self.objective == self.Objective.FRIENDLY:
             color = int("0x375a7f", 16)
         elif self.objective == self.Objective.HOSTILE:
@@ -650,18 +818,7 @@ class Timer(models.Model):
             thumbnail=dhooks_lite.Thumbnail(structure_icon_url),
             color=color,
         )
-        if STRUCTURETIMER_NOTIFICATION_SET_AVATAR:
-            username = __title__
-            avatar_url = default_avatar_url()
-        else:
-            username = None
-            avatar_url = None
-        webhook.send_message(
-            content=content,
-            embeds=[embed],
-            username=username,
-            avatar_url=avatar_url,
-        )
+        return embed.asdict()
 
 
 class NotificationRule(models.Model):
@@ -857,6 +1014,7 @@ class NotificationRule(models.Model):
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
+        self.reset_matcher()
         if (
             STRUCTURETIMERS_NOTIFICATIONS_ENABLED
             and self.is_enabled
@@ -883,71 +1041,21 @@ class NotificationRule(models.Model):
         """prepends ping text to given text and returns it as new text string"""
         return f"{self.ping_type_text} {text}" if self.ping_type_text else text
 
-    def is_matching_timer(self, timer: "Timer") -> bool:
-        """returns True if notification rule is matching the given timer, else False"""
-        if timer.date is None:
-            return False
-        is_matching = True
-        if is_matching and self.is_important == self.Clause.REQUIRED:
-            is_matching = timer.is_important
-
-        if is_matching and self.is_important == self.Clause.EXCLUDED:
-            is_matching = not timer.is_important
-
-        if is_matching and self.is_opsec == self.Clause.REQUIRED:
-            is_matching = timer.is_opsec
-
-        if is_matching and self.is_opsec == self.Clause.EXCLUDED:
-            is_matching = not timer.is_opsec
-
-        if is_matching and self.require_visibility:
-            is_matching = timer.visibility in self.require_visibility
-
-        if is_matching and self.exclude_visibility:
-            is_matching = timer.visibility not in self.exclude_visibility
-
-        if is_matching and self.require_timer_types:
-            is_matching = timer.timer_type in self.require_timer_types
-
-        if is_matching and self.exclude_timer_types:
-            is_matching = timer.timer_type not in self.exclude_timer_types
-
-        if is_matching and self.require_objectives:
-            is_matching = timer.objective in self.require_objectives
-
-        if is_matching and self.exclude_objectives:
-            is_matching = timer.objective not in self.exclude_objectives
-
-        if is_matching and self.require_corporations.exists():
-            is_matching = timer.eve_corporation in self.require_corporations.all()
-
-        if is_matching and self.exclude_corporations.exists():
-            is_matching = timer.eve_corporation not in self.exclude_corporations.all()
-
-        if is_matching and self.require_alliances.exists():
-            is_matching = timer.eve_alliance in self.require_alliances.all()
-
-        if is_matching and self.exclude_alliances.exists():
-            is_matching = timer.eve_alliance not in self.exclude_alliances.all()
-
-        if is_matching and timer.eve_solar_system and self.require_regions.exists():
-            is_matching = (
-                timer.eve_solar_system.eve_constellation.eve_region
-                in self.require_regions.all()
-            )
+    @cached_property
+    def matcher(self) -> NotificationRuleMatcher:
+        """Compiled version of this rule for matching timers.
 
-        if is_matching and timer.eve_solar_system and self.exclude_regions.exists():
-            is_matching = (
-                timer.eve_solar_system.eve_constellation.eve_region
-                not in self.exclude_regions.all()
-            )
-        if is_matching and self.require_space_types:
-            is_matching = timer.space_type in self.require_space_types
+        Will be reset when this rule or any of it's relations is changed.
+        """
+        return NotificationRuleMatcher.from_notification_rule(self)
 
-        if is_matching and self.exclude_space_types:
-            is_matching = timer.space_type not in self.exclude_space_types
+    def reset_matcher(self) -> None:
+        """Reset the compiled version of this rule."""
+        self.__dict__.pop("matcher", None)
 
-        return is_matching
+    def is_matching_timer(self, timer: "Timer") -> bool:
+        """returns True if notification rule is matching the given timer, else False"""
+        return self.matcher.is_matching_timer(timer)
 
     @staticmethod
     def get_multiselect_display(value: Any, choices: List[Tuple[Any, str]]) -> str:
@@ -981,6 +1089,12 @@ class ScheduledNotification(models.Model):
                 name="unique_notification_schedule",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["notification_rule", "timer_date"],
+                name="schednotif_rule_timer_date_idx",
+            )
+        ]
 
     def __repr__(self) -> str:
         return (
@@ -1020,7 +1134,8 @@ class StagingSystem(models.Model):
         super().save(*args, **kwargs)
         if needs_recalc:
             self.distances.all().delete()
-            _task_calc_staging_system().delay(self.pk)
+            if not STRUCTURETIMERS_DISTANCES_LAZY_ENABLED:
+                _task_calc_staging_system().delay(self.pk)
 
 
 class DistancesFromStaging(models.Model):
@@ -1041,6 +1156,11 @@ class DistancesFromStaging(models.Model):
                 fields=["timer", "staging_system"], name="fpk_distances_from_staging"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["staging_system", "timer"], name="distances_staging_timer_idx"
+            )
+        ]
 
     def __str__(self) -> str:
         return f"{self.timer}-{self.staging_system}"
@@ -1048,11 +1168,226 @@ class DistancesFromStaging(models.Model):
     def calculate(self):
         """Calculate all distances."""
         if self.staging_system.eve_solar_system:
-            self.light_years = meters_to_ly(
-                self.staging_system.eve_solar_system.distance_to(
-                    self.timer.eve_solar_system
-                )
-            )
-            self.jumps = self.staging_system.eve_solar_system.jumps_to(
-                self.timer.eve_solar_system
+            self.light_years, self.jumps = system_distances(
+                self.staging_system.eve_solar_system, self.timer.eve_solar_system
             )
+
+
+class DeletedTimer(models.Model):
+    """Log entry for a deleted timer.
+
+    Allows clients to remove deleted timers from their timer lists
+    when only asking for changes.
+    Timers which changed who can see them are logged as well.
+    Entries keep who could see the timer, so they are only reported
+    to those users.
+    """
+
+    MAX_AGE_DAYS = 7
+    SCOPE_FIELDS = SCOPE_FIELDS
+
+    Visibility = Timer.Visibility
+
+    timer_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    eve_alliance_id = models.PositiveIntegerField(null=True)
+    eve_corporation_id = models.PositiveIntegerField(null=True)
+    is_opsec = models.BooleanField(default=False)
+    user_id = models.PositiveIntegerField(null=True)
+    visibility = models.CharField(
+        max_length=2,
+        choices=Timer.Visibility.choices,
+        default=Timer.Visibility.UNRESTRICTED,
+    )
+
+    objects = DeletedTimerManager()
+
+    def __str__(self) -> str:
+        return f"{self.timer_id}"
+
+
+class TimerArchive(models.Model):
+    """An archived obsolete timer.
+
+    Archived timers are never changed. Related objects are stored
+    by their IDs and names, so the archive is not affected by other tables.
+    """
+
+    # fields of archived timers with the lookups for their values from timers
+    TIMER_FIELD_LOOKUPS = {
+        "timer_id": "pk",
+        "date": "date",
+        "details_image_url": "details_image_url",
+        "details_notes": "details_notes",
+        "eve_alliance_id": "eve_alliance_id",
+        "eve_alliance_name": "eve_alliance__alliance_name",
+        "eve_character_name": "eve_character__character_name",
+        "eve_corporation_id": "eve_corporation_id",
+        "eve_corporation_name": "eve_corporation__corporation_name",
+        "eve_region_name": "eve_solar_system__eve_constellation__eve_region__name",
+        "eve_solar_system_id": "eve_solar_system_id",
+        "eve_solar_system_name": "eve_solar_system__name",
+        "is_important": "is_important",
+        "is_opsec": "is_opsec",
+        "last_updated_at": "last_updated_at",
+        "location_details": "location_details",
+        "objective": "objective",
+        "owner_name": "owner_name",
+        "structure_name": "structure_name",
+        "structure_type_id": "structure_type_id",
+        "structure_type_name": "structure_type__name",
+        "timer_type": "timer_type",
+        "user_id": "user_id",
+        "visibility": "visibility",
+    }
+
+    Visibility = Timer.Visibility
+
+    timer_id = models.PositiveIntegerField(help_text="ID of the archived timer")
+    date = models.DateTimeField(db_index=True, null=True)
+    details_image_url = models.CharField(max_length=1024, null=True)
+    details_notes = models.TextField(default="")
+    eve_alliance_id = models.PositiveIntegerField(
+        null=True, help_text="ID of the alliance of the user who created this timer"
+    )
+    eve_alliance_name = models.CharField(max_length=254, null=True)
+    eve_character_name = models.CharField(max_length=254, null=True)
+    eve_corporation_id = models.PositiveIntegerField(
+        null=True,
+        help_text="ID of the corporation of the user who created this timer",
+    )
+    eve_corporation_name = models.CharField(max_length=254, null=True)
+    eve_region_name = models.CharField(max_length=100, null=True)
+    eve_solar_system_id = models.PositiveIntegerField(null=True)
+    eve_solar_system_name = models.CharField(max_length=100, null=True)
+    is_important = models.BooleanField(default=False)
+    is_opsec = models.BooleanField(default=False)
+    last_updated_at = models.DateTimeField(
+        null=True, help_text="Date when the timer was last updated"
+    )
+    location_details = models.CharField(max_length=254, default="")
+    objective = models.CharField(
+        max_length=2, choices=Timer.Objective.choices, default=Timer.Objective.UNDEFINED
+    )
+    owner_name = models.CharField(max_length=254, null=True)
+    structure_name = models.CharField(max_length=254, default="")
+    structure_type_id = models.PositiveIntegerField(null=True)
+    structure_type_name = models.CharField(max_length=100, null=True)
+    timer_type = models.CharField(
+        max_length=2, choices=Timer.Type.choices, default=Timer.Type.NONE
+    )
+    user_id = models.PositiveIntegerField(
+        null=True, help_text="ID of the user who created this timer"
+    )
+    visibility = models.CharField(
+        max_length=2,
+        choices=Timer.Visibility.choices,
+        default=Timer.Visibility.UNRESTRICTED,
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TimerArchiveManager()
+
+    def __str__(self) -> str:
+        return f"{self.timer_id}"
+
+
+class TimerBoardRow(models.Model):
+    """Denormalized row of a timer on the timer board.
+
+    Contains all fields shown on the timer board including the names
+    of related objects, so the board can be read without any joins.
+    Rows are updated whenever their timer is saved
+    and deleted together with their timer.
+    """
+
+    # fields of board rows with the lookups for their values from timers
+    TIMER_FIELD_LOOKUPS = {
+        "timer_id": "pk",
+        "date": "date",
+        "details_image_url": "details_image_url",
+        "details_notes": "details_notes",
+        "eve_alliance_id": "eve_alliance_id",
+        "eve_alliance_name": "eve_alliance__alliance_name",
+        "eve_corporation_id": "eve_corporation_id",
+        "eve_corporation_name": "eve_corporation__corporation_name",
+        "eve_region_id": "eve_solar_system__eve_constellation__eve_region_id",
+        "eve_region_name": "eve_solar_system__eve_constellation__eve_region__name",
+        "eve_solar_system_id": "eve_solar_system_id",
+        "eve_solar_system_name": "eve_solar_system__name",
+        "is_important": "is_important",
+        "is_opsec": "is_opsec",
+        "last_updated_at": "last_updated_at",
+        "location_details": "location_details",
+        "objective": "objective",
+        "owner_name": "owner_name",
+        "structure_name": "structure_name",
+        "structure_type_id": "structure_type_id",
+        "structure_type_name": "structure_type__name",
+        "timer_type": "timer_type",
+        "user_id": "user_id",
+        "visibility": "visibility",
+    }
+
+    Type = Timer.Type
+    Visibility = Timer.Visibility
+
+    timer = models.OneToOneField(
+        Timer, on_delete=models.CASCADE, primary_key=True, related_name="board_row"
+    )
+    date = models.DateTimeField(db_index=True, null=True)
+    eve_alliance_id = models.PositiveIntegerField(null=True)
+    eve_alliance_name = models.CharField(max_length=254, null=True)
+    eve_corporation_id = models.PositiveIntegerField(null=True)
+    eve_corporation_name = models.CharField(max_length=254, null=True)
+    eve_region_id = models.PositiveIntegerField(null=True)
+    eve_region_name = models.CharField(max_length=100, null=True)
+    eve_solar_system_id = models.PositiveIntegerField(null=True)
+    eve_solar_system_name = models.CharField(max_length=100, null=True)
+    has_details = models.BooleanField(default=False)
+    is_important = models.BooleanField(default=False)
+    is_opsec = models.BooleanField(default=False)
+    last_updated_at = models.DateTimeField()
+    location_details = models.CharField(max_length=254, default="")
+    objective = models.CharField(
+        max_length=2, choices=Timer.Objective.choices, default=Timer.Objective.UNDEFINED
+    )
+    owner_name = models.CharField(max_length=254, null=True)
+    structure_name = models.CharField(max_length=254, default="")
+    structure_type_id = models.PositiveIntegerField(null=True)
+    structure_type_name = models.CharField(max_length=100, null=True)
+    timer_type = models.CharField(
+        max_length=2, choices=Timer.Type.choices, default=Timer.Type.NONE
+    )
+    user_id = models.PositiveIntegerField(null=True)
+    visibility = models.CharField(
+        max_length=2,
+        choices=Timer.Visibility.choices,
+        default=Timer.Visibility.UNRESTRICTED,
+    )
+
+    objects = TimerBoardRowManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["visibility", "date"], name="boardrow_visibility_date_idx"
+            ),
+            models.Index(
+                fields=["timer_type", "date"], name="boardrow_timer_type_date_idx"
+            ),
+            models.Index(
+                fields=["eve_corporation_id", "visibility", "date"],
+                name="boardrow_corp_visib_date_idx",
+            ),
+            models.Index(
+                fields=["eve_alliance_id", "visibility", "date"],
+                name="boardrow_alli_visib_date_idx",
+            ),
+            models.Index(
+                fields=["last_updated_at"], name="boardrow_last_updated_at_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.timer_id}"
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from eveuniverse.models import EveRegion, EveSolarSystem, EveStargate, EveType
+
+from allianceauth.authentication.models import CharacterOwnership
+from allianceauth.eveonline.models import (
+    EveAllianceInfo,
+    EveCharacter,
+    EveCorporationInfo,
+)
+
+from .app_settings import (
+    STRUCTURETIMERS_BOARD_ROWS_ENABLED,
+    STRUCTURETIMERS_LIVE_UPDATES_ENABLED,
+)
+from .jumps import invalidate_jump_graph
+from .live import EVENT_DELETED, timer_scope
+from .managers import invalidate_user_organizations
+from .matching import invalidate_notification_rule_index
+from .models import DeletedTimer, NotificationRule, Timer, TimerBoardRow
+
+
+@receiver(m2m_changed, sender=NotificationRule.require_corporations.through)
+@receiver(m2m_changed, sender=NotificationRule.exclude_corporations.through)
+@receiver(m2m_changed, sender=NotificationRule.require_alliances.through)
+@receiver(m2m_changed, sender=NotificationRule.exclude_alliances.through)
+@receiver(m2m_changed, sender=NotificationRule.require_regions.through)
+@receiver(m2m_changed, sender=NotificationRule.exclude_regions.through)
+def notification_rule_relations_changed(sender, instance, action, reverse, **kwargs):
+    """Reset compiled rule and rule index when relations of a rule have changed."""
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        instance.reset_matcher()
+    transaction.on_commit(invalidate_notification_rule_index)
+
+
+@receiver(post_save, sender=NotificationRule)
+@receiver(post_delete, sender=NotificationRule)
+def notification_rule_changed(sender, instance, **kwargs):
+    """Reset rule index when a rule has changed."""
+    transaction.on_commit(invalidate_notification_rule_index)
+
+
+@receiver(post_save, sender=EveStargate)
+@receiver(post_delete, sender=EveStargate)
+def stargate_changed(sender, instance, **kwargs):
+    """Reset jump graph when a stargate has changed."""
+    invalidate_jump_graph()
+
+
+@receiver(post_save, sender=CharacterOwnership)
+@receiver(post_delete, sender=CharacterOwnership)
+def character_ownership_changed(sender, instance, **kwargs):
+    """Reset cached organizations of a user when a character ownership changed."""
+    invalidate_user_organizations(instance.user_id)
+
+
+@receiver(post_save, sender=EveCharacter)
+def character_changed(sender, instance, created, **kwargs):
+    """Reset cached organizations of the owner when a character has changed,
+    e.g. after it joined another corporation.
+    """
+    if created:
+        return
+    for user_pk in CharacterOwnership.objects.filter(character=instance).values_list(
+        "user_id", flat=True
+    ):
+        invalidate_user_organizations(user_pk)
+
+
+@receiver(post_delete, sender=Timer)
+def timer_deleted(sender, instance, **kwargs):
+    """Log a deleted timer and inform live timer boards about it."""
+    DeletedTimer.objects.create(timer_id=instance.pk, **timer_scope(instance))
+    if STRUCTURETIMERS_LIVE_UPDATES_ENABLED:
+        instance.publish_live_event(EVENT_DELETED)
+
+
+@receiver(post_save, sender=Timer)
+def timer_saved(sender, instance, **kwargs):
+    """Update the board row of a saved timer."""
+    if STRUCTURETIMERS_BOARD_ROWS_ENABLED:
+        TimerBoardRow.objects.update_for_timers(Timer.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=EveCorporationInfo)
+def corporation_changed(sender, instance, created, **kwargs):
+    """Reset cached organizations of its members when a corporation was created
+    or update the name of a corporation on board rows.
+    """
+    if created:
+        _invalidate_user_organizations_of_characters(
+            corporation_id=instance.corporation_id
+        )
+    elif STRUCTURETIMERS_BOARD_ROWS_ENABLED:
+        TimerBoardRow.objects.filter(eve_corporation_id=instance.pk).update(
+            eve_corporation_name=instance.corporation_name
+        )
+
+
+@receiver(post_save, sender=EveAllianceInfo)
+def alliance_changed(sender, instance, created, **kwargs):
+    """Reset cached organizations of its members when an alliance was created
+    or update the name of an alliance on board rows.
+    """
+    if created:
+        _invalidate_user_organizations_of_characters(alliance_id=instance.alliance_id)
+    elif STRUCTURETIMERS_BOARD_ROWS_ENABLED:
+        TimerBoardRow.objects.filter(eve_alliance_id=instance.pk).update(
+            eve_alliance_name=instance.alliance_name
+        )
+
+
+@receiver(post_save, sender=EveSolarSystem)
+def solar_system_changed(sender, instance, created, **kwargs):
+    """Update the name of a solar system on board rows."""
+    if STRUCTURETIMERS_BOARD_ROWS_ENABLED and not created:
+        TimerBoardRow.objects.filter(eve_solar_system_id=instance.id).update(
+            eve_solar_system_name=instance.name
+        )
+
+
+@receiver(post_save, sender=EveRegion)
+def region_changed(sender, instance, created, **kwargs):
+    """Update the name of a region on board rows."""
+    if STRUCTURETIMERS_BOARD_ROWS_ENABLED and not created:
+        TimerBoardRow.objects.filter(eve_region_id=instance.id).update(
+            eve_region_name=instance.name
+        )
+
+
+@receiver(post_save, sender=EveType)
+def type_changed(sender, instance, created, **kwargs):
+    """Update the name of a structure type on board rows."""
+    if STRUCTURETIMERS_BOARD_ROWS_ENABLED and not created:
+        TimerBoardRow.objects.filter(structure_type_id=instance.id).update(
+            structure_type_name=instance.name
+        )
+
+
+def _invalidate_user_organizations_of_characters(**character_lookups) -> None:
+    user_pks = (
+        CharacterOwnership.objects.filter(
+            **{f"character__{key}": value for key, value in character_lookups.items()}
+        )
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    for user_pk in user_pks:
+        invalidate_user_organizations(user_pk)
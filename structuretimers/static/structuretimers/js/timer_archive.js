@@ -0,0 +1,30 @@
+$(document).ready(function () {
+    /* retrieve generated data from HTML page */
+    const elem = document.getElementById("dataExport");
+    const archiveDataUrl = elem.getAttribute("data-archiveDataUrl");
+    const dataTablesPageLength = Number(elem.getAttribute("data-dataTablesPageLength"));
+
+    /* build dataTable */
+    $("#tbl_timer_archive").DataTable({
+        serverSide: true,
+        processing: true,
+        ajax: archiveDataUrl,
+        columns: [
+            { data: "date" },
+            { data: "location" },
+            { data: "structure_details" },
+            { data: "timer_type_name" },
+            { data: "objective_name" },
+            { data: "name_owner" },
+            { data: "visibility" },
+            { data: "archived_at" },
+        ],
+        order: [[0, "desc"]],
+        lengthMenu: [
+            [10, 25, 50, 100],
+            [10, 25, 50, 100],
+        ],
+        pageLength: dataTablesPageLength,
+        searchDelay: 500,
+    });
+});
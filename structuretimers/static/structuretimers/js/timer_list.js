@@ -47,6 +47,268 @@ function localTimeOutputHtml(date) {
     return moment(date).format("ddd @ LT") + "<br>" + dateToCountdownStr(date);
 }
 
+const VISIBILITY_UNRESTRICTED = "UN";
+const VISIBILITY_ALLIANCE = "AL";
+const VISIBILITY_CORPORATION = "CO";
+const TIMER_LIST_REFRESH_INTERVAL_MS = 60000;
+const LIVE_UPDATES_DELAY_MS = 1000;
+
+/* return text escaped for use in HTML */
+function escapeHtml(text) {
+    if (text === null || text === undefined) {
+        return "";
+    }
+    return String(text)
+        .replace(/&/g, "&amp;")
+        .replace(/</g, "&lt;")
+        .replace(/>/g, "&gt;")
+        .replace(/"/g, "&quot;")
+        .replace(/'/g, "&#39;");
+}
+
+/* return Bootstrap label as HTML */
+function labelHtml(text, labelType) {
+    return (
+        '<span class="label label-' + labelType + '">' + escapeHtml(text) + "</span>"
+    );
+}
+
+/* return fontawesome link button as HTML */
+function linkButtonHtml(url, faCode, buttonType, tooltip) {
+    return (
+        '<a href="' +
+        url +
+        '" class="btn btn-' +
+        buttonType +
+        '" title="' +
+        tooltip +
+        '"><i class="' +
+        faCode +
+        '"></i></a>'
+    );
+}
+
+/* return URL for a timer from an URL for the dummy timer 0 */
+function timerUrl(url, timerPk) {
+    return url.replace(/0$/, timerPk);
+}
+
+/* return actions for a timer as HTML */
+function timerActionsHtml(timer, lookups, permissions) {
+    let actions = "";
+    if (timer.has_details) {
+        actions +=
+            '<a type="button" id="timerboardBtnDetails" ' +
+            'class="btn btn-primary" title="Show details of this timer"' +
+            'data-toggle="modal" data-target="#modalTimerDetails" ' +
+            'data-timerpk="' +
+            timer.id +
+            '"><i class="fas fa-search-plus"></i></a>';
+    } else {
+        actions +=
+            '<a type="button" id="timerboardBtnDetails" ' +
+            'class="btn btn-default" title="No details available"' +
+            'data-timerpk="' +
+            timer.id +
+            '" disabled="disabled"><i class="fas fa-search-plus"></i></a>';
+    }
+    actions += "&nbsp;";
+    const canEdit =
+        permissions.can_manage ||
+        (timer.user_id === permissions.user_id && permissions.can_create);
+    if (canEdit) {
+        actions +=
+            linkButtonHtml(
+                timerUrl(lookups.urls.delete, timer.id),
+                "far fa-trash-alt",
+                "danger",
+                "Delete this timer"
+            ) +
+            "&nbsp;" +
+            linkButtonHtml(
+                timerUrl(lookups.urls.edit, timer.id),
+                "far fa-edit",
+                "warning",
+                "Edit this timer"
+            );
+    }
+    if (permissions.can_create) {
+        actions +=
+            "&nbsp;" +
+            linkButtonHtml(
+                timerUrl(lookups.urls.copy, timer.id),
+                "far fa-copy",
+                "success",
+                "Copy this timer"
+            );
+    }
+    return '<span class="text-nowrap;">' + actions + "</span>";
+}
+
+/* return timer in the compact format as row with rendered cells */
+function expandCompactTimer(timer, lookups, permissions) {
+    const solarSystem = lookups.solar_systems[timer.solar_system_id];
+    const regionName = lookups.regions[solarSystem.region_id];
+    const structureType = lookups.structure_types[timer.structure_type_id];
+    const timerType = lookups.timer_types[timer.timer_type];
+    const objective = lookups.objectives[timer.objective];
+
+    /* location */
+    let location =
+        '<a href="' +
+        solarSystem.dotlan_url +
+        '" target="_blank">' +
+        escapeHtml(solarSystem.name) +
+        "</a>";
+    if (timer.location_details) {
+        location += "<br><em>" + escapeHtml(timer.location_details) + "</em>";
+    }
+    location += "<br>" + escapeHtml(regionName);
+
+    /* distance */
+    let distanceText = "?";
+    if (timer.has_distances) {
+        const lightYearsText =
+            timer.light_years !== null
+                ? Math.ceil(timer.light_years * 10) / 10 + " ly"
+                : "N/A";
+        const jumpsText = timer.jumps !== null ? timer.jumps + " jumps" : "N/A";
+        distanceText = lightYearsText + "<br>" + jumpsText;
+    }
+
+    /* structure & timer type & fitting image */
+    const structureTypeName = structureType ? structureType.name : "(unknown)";
+    const structure =
+        '<div class="flex-container">' +
+        '  <div style="padding-top: 4px;"><img src="' +
+        (structureType ? structureType.icon_url : "") +
+        '" width="40"></div>' +
+        '  <div style="text-align: left;">' +
+        labelHtml(structureTypeName, "info") +
+        "&nbsp;<br>" +
+        labelHtml(timerType.name, timerType.label_type) +
+        "  </div>" +
+        "</div>";
+
+    /* objective & tags */
+    const tags = [];
+    let isRestricted = false;
+    if (timer.is_opsec) {
+        tags.push(labelHtml("OPSEC", "danger"));
+        isRestricted = true;
+    }
+    if (timer.visibility != VISIBILITY_UNRESTRICTED) {
+        tags.push(labelHtml(lookups.visibilities[timer.visibility], "info"));
+        isRestricted = true;
+    }
+    if (timer.is_important) {
+        tags.push(labelHtml("Important", "warning"));
+    }
+    const objectiveHtml =
+        labelHtml(objective.name, objective.label_type) + "<br>" + tags.join(" ");
+
+    /* name & owner */
+    const name =
+        escapeHtml(timer.structure_name ? timer.structure_name : "-") +
+        "<br>" +
+        escapeHtml(timer.owner_name ? timer.owner_name : "-");
+
+    /* visibility */
+    let visibility = "";
+    if (timer.visibility == VISIBILITY_ALLIANCE && timer.alliance_id !== null) {
+        visibility = lookups.alliances[timer.alliance_id];
+    } else if (timer.visibility == VISIBILITY_CORPORATION) {
+        visibility =
+            timer.corporation_id !== null
+                ? lookups.corporations[timer.corporation_id]
+                : "-";
+    }
+
+    return {
+        id: timer.id,
+        local_time: timer.date,
+        date: timer.date,
+        location: location,
+        structure_details: structure,
+        name_objective: name,
+        owner: objectiveHtml,
+        distance: {
+            display: distanceText,
+            sort: timer.light_years,
+        },
+        distance_light_years: timer.light_years,
+        distance_jumps: timer.jumps,
+        actions: timerActionsHtml(timer, lookups, permissions),
+        timer_type_name: timerType.name,
+        objective_name: objective.name,
+        system_name: solarSystem.name,
+        region_name: regionName,
+        structure_type_name: structureTypeName,
+        owner_name: timer.owner_name,
+        visibility: visibility,
+        opsec_str: timer.is_opsec ? lookups.yes_no.yes : lookups.yes_no.no,
+        is_opsec: timer.is_opsec,
+        is_passed: timer.date ? moment(timer.date) < moment() : null,
+        is_important: timer.is_important,
+        is_restricted: isRestricted,
+        last_updated_at: timer.last_updated_at,
+    };
+}
+
+/* return rows for DataTables from a response in the compact format */
+function expandCompactTimers(json) {
+    return json.data.map(function (timer) {
+        return expandCompactTimer(timer, json.lookups, json.permissions);
+    });
+}
+
+/* return URL for requesting the timer list in the compact format */
+function compactUrl(url) {
+    return url + (url.indexOf("?") === -1 ? "?" : "&") + "format=compact";
+}
+
+/* return ajax function for DataTables, which requests the timers conditionally
+   and reuses the last response when the server reports no changes */
+function conditionalAjax(url) {
+    let last = null;
+    return function (data, callback, settings) {
+        const params = $.extend({}, data);
+        delete params.draw;
+        const key = $.param(params);
+        const cached = last && last.key === key ? last : null;
+        $.ajax({
+            url: url,
+            data: data,
+            dataType: "json",
+            headers: cached ? { "If-None-Match": cached.etag } : {},
+            success: function (json, textStatus, jqXHR) {
+                if (jqXHR.status === 304 && cached) {
+                    json = cached.json;
+                } else {
+                    const etag = jqXHR.getResponseHeader("ETag");
+                    last = etag ? { key: key, etag: etag, json: json } : null;
+                }
+                callback(
+                    $.extend({}, json, {
+                        draw: data.draw,
+                        data: expandCompactTimers(json),
+                    })
+                );
+            },
+            error: function (jqXHR, textStatus) {
+                console.log(jqXHR);
+                callback({
+                    draw: data.draw,
+                    recordsTotal: 0,
+                    recordsFiltered: 0,
+                    data: [],
+                    error: "Failed to load timers: " + jqXHR.status,
+                });
+            },
+        });
+    };
+}
+
 function createVisibleColumDef(idxStart) {
     return {
         visible: false,
@@ -65,6 +327,7 @@ function createVisibleColumDef(idxStart) {
 
 function createFilterDropDown(
     idxStart,
+    ajaxUrl,
     hasPermOPSEC,
     titleSolarSystem,
     titleRegion,
@@ -106,6 +369,7 @@ function createFilterDropDown(
                 maxWidth: "12em",
             },
         ],
+        ajax: ajaxUrl,
         bootstrap: true,
         autoSize: false,
     };
@@ -124,7 +388,15 @@ $(document).ready(function () {
     const listDataCurrentUrl = elem.getAttribute("data-listDataCurrentUrl");
     const listDataPastUrl = elem.getAttribute("data-listDataPastUrl");
     const listDataTargetUrl = elem.getAttribute("data-listDataTargetUrl");
+    const listFilterOptionsCurrentUrl = elem.getAttribute(
+        "data-listFilterOptionsCurrentUrl"
+    );
+    const listFilterOptionsPastUrl = elem.getAttribute("data-listFilterOptionsPastUrl");
+    const listFilterOptionsTargetUrl = elem.getAttribute(
+        "data-listFilterOptionsTargetUrl"
+    );
     const getTimerDataUrl = elem.getAttribute("data-getTimerDataUrl");
+    const timerEventsUrl = elem.getAttribute("data-timerEventsUrl");
     const titleSolarSystem = elem.getAttribute("data-titleSolarSystem");
     const titleRegion = elem.getAttribute("data-titleRegion");
     const titleStructureType = elem.getAttribute("data-titleStructureType");
@@ -214,12 +486,10 @@ $(document).ready(function () {
         createVisibleColumDef(idxStart),
     ];
 
-    $("#tbl_timers_past").DataTable({
-        ajax: {
-            url: listDataPastUrl,
-            dataSrc: "",
-            cache: false,
-        },
+    const table_past = $("#tbl_timers_past").DataTable({
+        serverSide: true,
+        processing: true,
+        ajax: conditionalAjax(compactUrl(listDataPastUrl)),
         columns: columns,
         order: [[0, "desc"]],
         lengthMenu: lengthMenu,
@@ -227,6 +497,7 @@ $(document).ready(function () {
         pageLength: dataTablesPageLength,
         filterDropDown: createFilterDropDown(
             idxStart,
+            listFilterOptionsPastUrl,
             hasPermOPSEC,
             titleSolarSystem,
             titleRegion,
@@ -238,12 +509,10 @@ $(document).ready(function () {
         ),
         columnDefs: columnDefs,
     });
-    $("#tbl_preliminary").DataTable({
-        ajax: {
-            url: listDataTargetUrl,
-            dataSrc: "",
-            cache: false,
-        },
+    const table_preliminary = $("#tbl_preliminary").DataTable({
+        serverSide: true,
+        processing: true,
+        ajax: conditionalAjax(compactUrl(listDataTargetUrl)),
         columns: [
             { data: "location" },
             {
@@ -280,6 +549,7 @@ $(document).ready(function () {
         columnDefs: [createVisibleColumDef(7)],
         filterDropDown: createFilterDropDown(
             7,
+            listFilterOptionsTargetUrl,
             hasPermOPSEC,
             titleSolarSystem,
             titleRegion,
@@ -291,11 +561,9 @@ $(document).ready(function () {
         ),
     });
     const table_current = $("#tbl_timers_current").DataTable({
-        ajax: {
-            url: listDataCurrentUrl,
-            dataSrc: "",
-            cache: false,
-        },
+        serverSide: true,
+        processing: true,
+        ajax: conditionalAjax(compactUrl(listDataCurrentUrl)),
         columns: columns,
         order: [[0, "asc"]],
         lengthMenu: lengthMenu,
@@ -303,6 +571,7 @@ $(document).ready(function () {
         pageLength: dataTablesPageLength,
         filterDropDown: createFilterDropDown(
             idxStart,
+            listFilterOptionsCurrentUrl,
             hasPermOPSEC,
             titleSolarSystem,
             titleRegion,
@@ -314,14 +583,18 @@ $(document).ready(function () {
         ),
         columnDefs: columnDefs,
         createdRow: function (row, data, dataIndex) {
-            if (data["is_passed"]) {
-                $(row).addClass("active");
-            } else if (data["is_important"]) {
-                $(row).addClass("warning");
-            }
+            updateCurrentRowClasses(row, data);
         },
     });
 
+    function updateCurrentRowClasses(row, data) {
+        $(row).toggleClass("active", Boolean(data["is_passed"]));
+        $(row).toggleClass(
+            "warning",
+            !data["is_passed"] && Boolean(data["is_important"])
+        );
+    }
+
     function updateTimers() {
         table_current.rows().every(function () {
             var d = this.data();
@@ -337,6 +610,92 @@ $(document).ready(function () {
         updateTimers();
     }
 
+    /* reload timers without resetting paging, which is cheap for the server
+       when nothing has changed */
+    function refreshTables() {
+        [table_current, table_past, table_preliminary].forEach(function (table) {
+            table.ajax.reload(null, false);
+        });
+    }
+
+    /* live updates */
+    const liveTables = [
+        { table: table_current, url: compactUrl(listDataCurrentUrl) },
+        { table: table_past, url: compactUrl(listDataPastUrl) },
+        { table: table_preliminary, url: compactUrl(listDataTargetUrl) },
+    ];
+    let pendingEvents = [];
+
+    /* patch rows of updated timers in place
+       and reload tables when timers were created or deleted */
+    function applyTimerEvents() {
+        const events = pendingEvents;
+        pendingEvents = [];
+        const hasNewOrDeleted = events.some(function (event) {
+            return event.event != "updated";
+        });
+        const updatedIds = new Set(
+            events.map(function (event) {
+                return event.id;
+            })
+        );
+        liveTables.forEach(function (liveTable) {
+            const table = liveTable.table;
+            if (hasNewOrDeleted) {
+                table.ajax.reload(null, false);
+                return;
+            }
+            const rows = table.rows(function (idx, data) {
+                return updatedIds.has(data.id);
+            });
+            if (rows.count() == 0) {
+                return;
+            }
+            const ids = rows.data().toArray().map(function (data) {
+                return data.id;
+            });
+            $.getJSON(liveTable.url + "&ids=" + ids.join(","), function (json) {
+                const timers = {};
+                expandCompactTimers(json).forEach(function (data) {
+                    timers[data.id] = data;
+                });
+                if (Object.keys(timers).length < ids.length) {
+                    table.ajax.reload(null, false); // timers have left the table
+                    return;
+                }
+                rows.every(function () {
+                    const data = timers[this.data().id];
+                    this.data(data);
+                    if (table === table_current) {
+                        updateCurrentRowClasses(this.node(), data);
+                    }
+                });
+            });
+        });
+    }
+
+    function startLiveUpdates() {
+        const source = new EventSource(timerEventsUrl);
+        let isReconnect = false;
+        source.addEventListener("open", function () {
+            if (isReconnect) {
+                refreshTables(); // events might have been missed
+            }
+            isReconnect = true;
+        });
+        source.addEventListener("timer", function (message) {
+            if (pendingEvents.length == 0) {
+                setTimeout(applyTimerEvents, LIVE_UPDATES_DELAY_MS);
+            }
+            pendingEvents.push(JSON.parse(message.data));
+        });
+    }
+
     // Start timed updates
     setInterval(timedUpdate, 1000);
+    if (timerEventsUrl && typeof EventSource !== "undefined") {
+        startLiveUpdates();
+    } else {
+        setInterval(refreshTables, TIMER_LIST_REFRESH_INTERVAL_MS);
+    }
 });
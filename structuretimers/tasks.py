@@ -1,10 +1,15 @@
+import heapq
 from datetime import timedelta
-from typing import Optional
+from time import perf_counter, sleep
+from typing import List, Optional
 
 from celery import shared_task
+from celery.utils import uuid
+from celery_once import AlreadyQueued
 
 from django.contrib.auth.models import User
 from django.db import DatabaseError, transaction
+from django.db.models import Q
 from django.utils.timezone import now
 
 from allianceauth.notifications import notify
@@ -14,7 +19,15 @@ from app_utils.esi import retry_task_if_esi_is_down
 from app_utils.logging import LoggerAddTag
 
 from . import __title__
+from .app_settings import (
+    STRUCTURETIMERS_DISCORD_SEND_MAX_WORKERS,
+    STRUCTURETIMERS_DISTANCES_BATCH_SIZE,
+    STRUCTURETIMERS_DISTANCES_LAZY_ENABLED,
+    STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED,
+)
+from .discord import send_queued_messages_concurrently
 from .models import (
+    DeletedTimer,
     DiscordWebhook,
     DistancesFromStaging,
     NotificationRule,
@@ -25,6 +38,10 @@ from .models import (
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 TASK_PRIORITY_HIGH = 4
+DISPATCHER_INTERVAL = 60  # seconds, must match the interval of the periodic task
+DISPATCHER_POLL_INTERVAL = 5  # seconds
+# ends safely before the next run is started, which would be skipped otherwise
+DISPATCHER_DURATION = DISPATCHER_INTERVAL - 2 * DISPATCHER_POLL_INTERVAL
 
 
 @shared_task(base=QueueOnce, acks_late=True)
@@ -39,9 +56,76 @@ def send_messages_for_webhook(webhook_pk: int) -> None:
     logger.info("Completed sending messages to webhook %s", webhook)
 
 
+@shared_task(acks_late=True)
+def send_messages_for_webhooks(webhook_pks: List[int]) -> None:
+    """Send all currently queued messages for given webhooks to Discord.
+
+    Messages for different webhooks are sent in parallel.
+    Webhooks which are already being sent by another task are skipped.
+    """
+    webhooks = DiscordWebhook.objects.filter(pk__in=webhook_pks, is_enabled=True)
+    lock_keys = {}
+    for webhook in webhooks:
+        lock_key = _lock_webhook(webhook.pk)
+        if lock_key:
+            lock_keys[lock_key] = webhook
+        else:
+            logger.info("Webhook %s: Already sending messages - skipping", webhook)
+    try:
+        sent_counts = send_queued_messages_concurrently(
+            lock_keys.values(), max_workers=STRUCTURETIMERS_DISCORD_SEND_MAX_WORKERS
+        )
+    finally:
+        for lock_key in lock_keys:
+            send_messages_for_webhook.once_backend.clear_lock(lock_key)
+    logger.info(
+        "Sent %d messages to %d webhooks",
+        sum(sent_counts.values()),
+        len(sent_counts),
+    )
+
+
+def _lock_webhook(webhook_pk: int) -> Optional[str]:
+    """Acquire the lock of the send task for a webhook.
+
+    Returns the key of the acquired lock or None if the webhook is already locked.
+    """
+    task = send_messages_for_webhook
+    lock_key = task.get_key(kwargs={"webhook_pk": webhook_pk})
+    try:
+        task.once_backend.raise_or_lock(lock_key, timeout=task.default_timeout)
+    except AlreadyQueued:
+        return None
+    return lock_key
+
+
 @shared_task(base=QueueOnce, bind=True, acks_late=True)
 def send_scheduled_notification(self, scheduled_notification_pk: int) -> None:
     """Send a scheduled notification for a timer based on a notification rule."""
+    _send_scheduled_notification(
+        scheduled_notification_pk=scheduled_notification_pk,
+        celery_task_id=self.request.id,
+    )
+
+
+def _send_scheduled_notification(
+    scheduled_notification_pk: int,
+    celery_task_id: Optional[str] = None,
+    send_messages: bool = True,
+) -> Optional[int]:
+    """Send a scheduled notification and remove it.
+
+    Args:
+        scheduled_notification_pk: PK of the scheduled notification
+        celery_task_id: When provided, notification is only sent
+            when it was scheduled with this task ID
+        send_messages: When False, the notification is only queued
+            and sending the queued messages is left to the caller
+
+    Returns:
+        PK of the webhook the notification was queued for
+        or None when the notification was discarded
+    """
     with transaction.atomic():
         try:
             scheduled_notification = (
@@ -60,20 +144,23 @@ def send_scheduled_notification(self, scheduled_notification_pk: int) -> None:
                 scheduled_notification_pk,
                 exc_info=True,
             )
-            return
+            return None
 
         logger.debug(
             "Delete scheduled_notification in task_id = %s: %r",
-            self.request.id,
+            celery_task_id,
             scheduled_notification,
         )
         scheduled_notification.delete()
 
-    if scheduled_notification.celery_task_id != self.request.id:
+    if (
+        celery_task_id is not None
+        and scheduled_notification.celery_task_id != celery_task_id
+    ):
         logger.info(
             "Discarded outdated scheduled notification: %r", scheduled_notification
         )
-        return
+        return None
 
     notification_rule = scheduled_notification.notification_rule
     if not notification_rule.is_enabled:
@@ -81,14 +168,14 @@ def send_scheduled_notification(self, scheduled_notification_pk: int) -> None:
             "Discarded scheduled notification based on disabled rule: %r",
             scheduled_notification,
         )
-        return
+        return None
 
     webhook = notification_rule.webhook
     if not webhook.is_enabled:
         logger.warning(
             "Webhook not enabled for %r. Discarding.", scheduled_notification
         )
-        return
+        return None
 
     timer = scheduled_notification.timer
     if (
@@ -100,7 +187,7 @@ def send_scheduled_notification(self, scheduled_notification_pk: int) -> None:
             "Discarding scheduled notification %r for outdated timer.",
             scheduled_notification,
         )
-        return
+        return None
 
     logger.info(
         "Sending notifications for timer '%s' and rule '%s'",
@@ -117,9 +204,88 @@ def send_scheduled_notification(self, scheduled_notification_pk: int) -> None:
         webhook=webhook,
         content=notification_rule.prepend_ping_text(content),
     )
-    send_messages_for_webhook.apply_async(
-        args=[webhook.pk], priority=TASK_PRIORITY_HIGH
+    if send_messages:
+        send_messages_for_webhook.apply_async(
+            args=[webhook.pk], priority=TASK_PRIORITY_HIGH
+        )
+    return webhook.pk
+
+
+@shared_task(base=QueueOnce, once={"graceful": True})
+def dispatch_scheduled_notifications() -> None:
+    """Send all scheduled notifications, which are due until shortly
+    before the next run.
+
+    Replaces sending each notification with it's own Celery task,
+    when the notifications dispatcher is enabled. Should run every minute.
+    Notifications becoming due after this run has ended are overdue
+    when the next run starts and are sent right away.
+    """
+    if not STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED:
+        logger.info("Notifications dispatcher is disabled. Aborting.")
+        return
+
+    sent_count = _dispatch_scheduled_notifications(
+        duration=DISPATCHER_DURATION, poll_interval=DISPATCHER_POLL_INTERVAL
     )
+    logger.info("Dispatcher sent %d scheduled notifications", sent_count)
+
+
+def _dispatch_scheduled_notifications(duration: int, poll_interval: int) -> int:
+    """Send scheduled notifications when they become due for the given duration.
+
+    Only notifications becoming due within the duration are kept in memory
+    in a min-heap ordered by their notification date.
+    The database is polled regularly for notifications added in the meantime.
+
+    Args:
+        duration: Time in seconds to wait for notifications to become due
+        poll_interval: Time in seconds between polls
+
+    Returns:
+        Number of sent notifications
+    """
+    ends_at = now() + timedelta(seconds=duration)
+    due_queue = []
+    known_pks = set()
+    next_poll_at = now()
+    sent_count = 0
+    while True:
+        current_time = now()
+        if current_time >= next_poll_at:
+            new_notifications = ScheduledNotification.objects.filter(
+                notification_date__lt=ends_at
+            ).values_list("notification_date", "pk")
+            for notification_date, pk in new_notifications:
+                if pk not in known_pks:
+                    known_pks.add(pk)
+                    heapq.heappush(due_queue, (notification_date, pk))
+            next_poll_at = current_time + timedelta(seconds=poll_interval)
+
+        webhook_pks = set()
+        while due_queue and due_queue[0][0] <= current_time:
+            _, pk = heapq.heappop(due_queue)
+            webhook_pk = _send_scheduled_notification(
+                scheduled_notification_pk=pk, send_messages=False
+            )
+            if webhook_pk:
+                webhook_pks.add(webhook_pk)
+                sent_count += 1
+
+        if webhook_pks:
+            send_messages_for_webhooks.apply_async(
+                args=[sorted(webhook_pks)], priority=TASK_PRIORITY_HIGH
+            )
+
+        if current_time >= ends_at and not due_queue:
+            break
+
+        wake_up_at = min(next_poll_at, ends_at)
+        if due_queue:
+            wake_up_at = min(wake_up_at, due_queue[0][0])
+        sleep(max((wake_up_at - now()).total_seconds(), 0))
+
+    return sent_count
 
 
 @shared_task
@@ -204,17 +370,104 @@ def schedule_notifications_for_rule(notification_rule_pk: int) -> None:
 
     logger.debug("Checking scheduled notifications for: %s", notification_rule)
     with transaction.atomic():
-        for obj in notification_rule.scheduled_notifications.filter(
-            timer_date__gt=now()
-        ):
-            _revoke_notification_for_timer(scheduled_notification=obj)
+        _schedule_notifications_for_rule_in_bulk(notification_rule)
 
-        for timer in Timer.objects.filter(
-            date__gt=now()
-        ).conforms_with_notification_rule(notification_rule):
-            _schedule_notification_for_timer(
-                timer=timer, notification_rule=notification_rule
+
+def _schedule_notifications_for_rule_in_bulk(
+    notification_rule: NotificationRule,
+) -> int:
+    """Schedule notifications for all future timers conforming with a rule.
+
+    Replaces all pending notifications of that rule.
+    All database changes are done in bulk
+    and all Celery tasks are published with the same connection,
+    unless notifications are sent by the dispatcher.
+
+    Returns number of scheduled notifications.
+    """
+    if not notification_rule.scheduled_time:
+        raise ValueError(
+            f"Notification rule has no scheduled date: {notification_rule}"
+        )
+    timings = {}
+    started = perf_counter()
+    timers_qs = Timer.objects.filter(date__gt=now()).conforms_with_notification_rule(
+        notification_rule
+    )
+    timers = list(timers_qs.values_list("pk", "date"))
+    timings["select"] = perf_counter() - started
+
+    started = perf_counter()
+    revoked_count, _ = notification_rule.scheduled_notifications.filter(
+        Q(timer_date__gt=now()) | Q(timer__in=timers_qs.values("pk"))
+    ).delete()
+    timings["revoke"] = perf_counter() - started
+
+    started = perf_counter()
+    scheduled_time = timedelta(minutes=notification_rule.scheduled_time)
+    scheduled_notifications = [
+        ScheduledNotification(
+            timer_id=timer_pk,
+            notification_rule=notification_rule,
+            timer_date=timer_date,
+            notification_date=timer_date - scheduled_time,
+            celery_task_id=(
+                "" if STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED else uuid()
+            ),
+        )
+        for timer_pk, timer_date in timers
+    ]
+    ScheduledNotification.objects.bulk_create(scheduled_notifications, batch_size=500)
+    if STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED:
+        timings["create"] = perf_counter() - started
+        _log_scheduled_notifications_for_rule(
+            notification_rule, revoked_count, len(scheduled_notifications), timings
+        )
+        return len(scheduled_notifications)  # will be sent by the dispatcher
+
+    if any(obj.pk is None for obj in scheduled_notifications):
+        # not all databases return PKs for bulk created objects
+        pks_by_task_id = dict(
+            notification_rule.scheduled_notifications.values_list(
+                "celery_task_id", "pk"
+            )
+        )
+        for obj in scheduled_notifications:
+            obj.pk = pks_by_task_id[obj.celery_task_id]
+    timings["create"] = perf_counter() - started
+
+    started = perf_counter()
+    with send_scheduled_notification.app.producer_or_acquire() as producer:
+        for obj in scheduled_notifications:
+            send_scheduled_notification.apply_async(
+                kwargs={"scheduled_notification_pk": obj.pk},
+                eta=obj.notification_date,
+                priority=TASK_PRIORITY_HIGH,
+                task_id=obj.celery_task_id,
+                producer=producer,
             )
+    timings["publish"] = perf_counter() - started
+
+    _log_scheduled_notifications_for_rule(
+        notification_rule, revoked_count, len(scheduled_notifications), timings
+    )
+    return len(scheduled_notifications)
+
+
+def _log_scheduled_notifications_for_rule(
+    notification_rule: NotificationRule,
+    revoked_count: int,
+    scheduled_count: int,
+    timings: dict,
+) -> None:
+    logger.info(
+        "%s: Revoked %d and scheduled %d notifications in %.3f secs. Timings: %s",
+        notification_rule,
+        revoked_count,
+        scheduled_count,
+        sum(timings.values()),
+        ", ".join(f"{name}: {secs:.3f}" for name, secs in timings.items()),
+    )
 
 
 def _schedule_notification_for_timer(
@@ -235,11 +488,15 @@ def _schedule_notification_for_timer(
         notification_rule.pk,
     )
     notification_date = timer.date - timedelta(minutes=notification_rule.scheduled_time)
+    defaults = {"timer_date": timer.date, "notification_date": notification_date}
+    if STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED:
+        defaults["celery_task_id"] = ""
     scheduled_notification, _ = ScheduledNotification.objects.update_or_create(
-        timer=timer,
-        notification_rule=notification_rule,
-        defaults={"timer_date": timer.date, "notification_date": notification_date},
+        timer=timer, notification_rule=notification_rule, defaults=defaults
     )
+    if STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED:
+        return scheduled_notification  # will be sent by the dispatcher
+
     result = send_scheduled_notification.apply_async(
         kwargs={"scheduled_notification_pk": scheduled_notification.pk},
         eta=timer.date - timedelta(minutes=notification_rule.scheduled_time),
@@ -301,24 +558,88 @@ def housekeeping() -> None:
     logger.info("Performing housekeeping")
     deleted_count = Timer.objects.delete_obsolete()
     logger.info(f"Deleted {deleted_count:,} obsolete timers.")
+    deleted_count = DeletedTimer.objects.delete_obsolete()
+    logger.info(f"Deleted {deleted_count:,} obsolete log entries of deleted timers.")
 
 
 @shared_task
 def calc_staging_system(staging_system_pk: int, force_update: bool = False) -> None:
-    """Recalc distances from a staging system for all timers."""
-    for timer_pk in Timer.objects.values_list("pk", flat=True):
-        calc_timer_distances_for_staging_system.delay(
-            timer_pk, staging_system_pk, force_update
+    """Recalc distances from a staging system for all timers.
+
+    Timers are processed in chunks by separate tasks, newest timers first.
+    """
+    timer_pks = list(Timer.objects.order_by("-date").values_list("pk", flat=True))
+    batch_size = STRUCTURETIMERS_DISTANCES_BATCH_SIZE
+    chunks = [
+        timer_pks[start : start + batch_size]
+        for start in range(0, len(timer_pks), batch_size)
+    ]
+    for chunk_number, chunk in enumerate(chunks, start=1):
+        calc_timers_distances_for_staging_system.delay(
+            timer_pks=chunk,
+            staging_system_pk=staging_system_pk,
+            force_update=force_update,
+            chunk_number=chunk_number,
+            chunks_total=len(chunks),
         )
+    logger.info(
+        "Started %d tasks for calculating distances from staging system #%d "
+        "for %d timers",
+        len(chunks),
+        staging_system_pk,
+        len(timer_pks),
+    )
+
+
+@shared_task(
+    bind=True,
+    max_retries=3,
+    autoretry_for=(OSError,),
+    retry_kwargs={"max_retries": 3},
+    retry_backoff=30,
+)
+def calc_timers_distances_for_staging_system(
+    self,
+    timer_pks: List[int],
+    staging_system_pk: int,
+    force_update: bool = False,
+    chunk_number: int = 1,
+    chunks_total: int = 1,
+) -> None:
+    """Calc distances for a chunk of timers from a staging system."""
+    retry_task_if_esi_is_down(self)
+    staging_system = StagingSystem.objects.select_related("eve_solar_system").get(
+        pk=staging_system_pk
+    )
+    started = perf_counter()
+    count = DistancesFromStaging.objects.calc_timers_for_staging_system(
+        timers_qs=Timer.objects.filter(pk__in=timer_pks),
+        staging_system=staging_system,
+        force_update=force_update,
+    )
+    logger.info(
+        "%s: Calculated distances for %d timers in chunk %d / %d in %.3f seconds",
+        staging_system,
+        count,
+        chunk_number,
+        chunks_total,
+        perf_counter() - started,
+    )
 
 
 @shared_task
 def calc_timer_distances_for_all_staging_systems(
     timer_pk: int, force_update: bool = False
 ) -> None:
-    """Recalc distances for a timer from a staging system."""
+    """Recalc distances for a timer from all staging systems.
+
+    In lazy mode only existing distances are recalculated.
+    """
     timer = Timer.objects.get(pk=timer_pk)
-    for staging_system_pk in StagingSystem.objects.values_list("pk", flat=True):
+    staging_systems_qs = StagingSystem.objects.all()
+    if STRUCTURETIMERS_DISTANCES_LAZY_ENABLED:
+        staging_systems_qs = staging_systems_qs.filter(distances__timer=timer)
+    for staging_system_pk in staging_systems_qs.values_list("pk", flat=True):
         calc_timer_distances_for_staging_system.apply_async(
             kwargs={
                 "timer_pk": timer.pk,
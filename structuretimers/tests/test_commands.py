@@ -10,9 +10,9 @@ from allianceauth.timerboard.models import Timer as AuthTimer
 from app_utils.django import app_labels
 from app_utils.testing import NoSocketsTestCase
 
-from structuretimers.models import Timer
+from structuretimers.models import Timer, TimerBoardRow
 
-from .testdata.factory import create_user
+from .testdata.factory import create_timer, create_user
 from .testdata.fixtures import LoadTestDataMixin
 
 PACKAGE_PATH = "structuretimers.management.commands"
@@ -129,3 +129,19 @@ if "timerboard" in app_labels():
             call_command("structuretimers_migrate_timers", stdout=self.out)
 
             self.assertEqual(Timer.objects.all().count(), 1)
+
+
+@patch(MODELS_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestRebuildBoardRows(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_rebuild_rows_of_all_timers(self):
+        # given
+        timers = [create_timer() for _ in range(2)]
+        out = StringIO()
+        # when
+        call_command("structuretimers_rebuild_board_rows", stdout=out)
+        # then
+        self.assertSetEqual(
+            set(TimerBoardRow.objects.values_list("timer_id", flat=True)),
+            {obj.pk for obj in timers},
+        )
+        self.assertIn("Recreated 2 rows", out.getvalue())
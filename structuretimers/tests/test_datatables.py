@@ -0,0 +1,78 @@
+from django.http import QueryDict
+from django.test import TestCase
+
+from structuretimers.datatables import MAX_PAGE_LENGTH, DataTablesRequest
+
+
+def make_params(**kwargs) -> QueryDict:
+    params = QueryDict(mutable=True)
+    params.update(
+        {
+            "draw": "3",
+            "columns[0][data]": "date",
+            "columns[0][searchable]": "true",
+            "columns[0][search][value]": "",
+            "columns[0][search][regex]": "false",
+            "columns[1][data]": "system_name",
+            "columns[1][searchable]": "true",
+            "columns[1][search][value]": "^Abune$",
+            "columns[1][search][regex]": "true",
+            "columns[2][data]": "owner_name",
+            "columns[2][searchable]": "true",
+            "columns[2][search][value]": r"^Big\ Boss\.$",
+            "columns[2][search][regex]": "true",
+            "order[0][column]": "1",
+            "order[0][dir]": "desc",
+            "order[1][column]": "0",
+            "order[1][dir]": "asc",
+            "start": "20",
+            "length": "10",
+            "search[value]": " alpha ",
+            "search[regex]": "false",
+        }
+    )
+    params.update(kwargs)
+    return params
+
+
+class TestDataTablesRequest(TestCase):
+    def test_should_parse_request(self):
+        # when
+        request = DataTablesRequest.from_query_dict(make_params())
+        # then
+        self.assertEqual(request.draw, 3)
+        self.assertEqual(request.start, 20)
+        self.assertEqual(request.length, 10)
+        self.assertEqual(request.end, 30)
+        self.assertEqual(request.search, "alpha")
+        self.assertEqual(request.order, [("system_name", True), ("date", False)])
+        self.assertEqual(
+            request.column_searches,
+            {"system_name": "Abune", "owner_name": "Big Boss."},
+        )
+
+    def test_should_return_none_when_not_a_datatables_request(self):
+        self.assertIsNone(DataTablesRequest.from_query_dict(QueryDict("staging=1")))
+        self.assertIsNone(DataTablesRequest.from_query_dict(QueryDict("draw=x")))
+
+    def test_should_return_all_rows_when_length_is_negative(self):
+        # when
+        request = DataTablesRequest.from_query_dict(make_params(length="-1"))
+        # then
+        self.assertIsNone(request.length)
+        self.assertIsNone(request.end)
+
+    def test_should_limit_page_length(self):
+        # when
+        request = DataTablesRequest.from_query_dict(make_params(length="999999"))
+        # then
+        self.assertEqual(request.length, MAX_PAGE_LENGTH)
+
+    def test_should_ignore_invalid_values(self):
+        # when
+        request = DataTablesRequest.from_query_dict(
+            make_params(**{"start": "-5", "order[0][column]": "99"})
+        )
+        # then
+        self.assertEqual(request.start, 0)
+        self.assertEqual(request.order, [("date", False)])
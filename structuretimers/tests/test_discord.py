@@ -0,0 +1,322 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import dhooks_lite
+import requests
+
+from django.test import TestCase
+
+from app_utils.allianceauth import get_redis_client
+
+from structuretimers.discord import (
+    PooledWebhook,
+    RateLimiter,
+    merge_messages,
+    message_queue,
+    send_queued_messages_concurrently,
+    webhook_client,
+)
+
+from .testdata.factory import create_discord_webhook
+
+MODULE_PATH = "structuretimers.discord"
+
+
+class StubDiscordServer:
+    """A local HTTP server, which behaves like a Discord webhook.
+
+    Responses can be scripted per request. Without a script it responds with 200.
+    """
+
+    def __init__(self) -> None:
+        self.requests = []
+        self.responses = []
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                payload = json.loads(self.rfile.read(length))
+                with stub._lock:
+                    stub.requests.append((self.path, payload))
+                    if stub.responses:
+                        status, headers, body = stub.responses.pop(0)
+                    else:
+                        status, headers, body = 200, {}, {"id": "1"}
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def url(self, path: str = "/webhook") -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StubServerTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.server = StubDiscordServer()
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.server.requests.clear()
+        self.server.responses.clear()
+
+
+@patch(MODULE_PATH + ".sleep")
+class TestPooledWebhook(StubServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.hook = PooledWebhook(
+            url=self.server.url(),
+            session=requests.Session(),
+            rate_limiter=RateLimiter(),
+        )
+
+    def test_should_send_message(self, mock_sleep):
+        # when
+        response = self.hook.execute(
+            content="content",
+            embeds=[dhooks_lite.Embed(description="description")],
+            username="username",
+            wait_for_response=True,
+        )
+        # then
+        self.assertTrue(response.status_ok)
+        self.assertEqual(response.content, {"id": "1"})
+        path, payload = self.server.requests[0]
+        self.assertEqual(path, "/webhook?wait=True")
+        self.assertEqual(payload["content"], "content")
+        self.assertEqual(payload["embeds"][0]["description"], "description")
+        self.assertEqual(payload["username"], "username")
+        self.assertFalse(mock_sleep.called)
+
+    def test_should_retry_after_being_rate_limited(self, mock_sleep):
+        # given
+        self.server.responses.append(
+            (429, {}, {"message": "You are being rate limited.", "retry_after": 1.5})
+        )
+        # when
+        response = self.hook.execute(content="content", wait_for_response=True)
+        # then
+        self.assertTrue(response.status_ok)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        (delay,), _ = mock_sleep.call_args
+        self.assertAlmostEqual(delay, 1.5, delta=0.5)
+
+    def test_should_give_up_when_rate_limited_too_often(self, mock_sleep):
+        # given
+        self.server.responses.extend(
+            [(429, {}, {"retry_after": 0.1})] * 10,
+        )
+        # when
+        response = self.hook.execute(content="content", wait_for_response=True)
+        # then
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(self.server.requests), 6)
+
+    def test_should_wait_when_rate_limit_is_exhausted(self, mock_sleep):
+        # given
+        self.server.responses.append(
+            (
+                200,
+                {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "2.0"},
+                {"id": "1"},
+            )
+        )
+        # when
+        self.hook.execute(content="first", wait_for_response=True)
+        self.hook.execute(content="second", wait_for_response=True)
+        # then
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+        (delay,), _ = mock_sleep.call_args
+        self.assertAlmostEqual(delay, 2.0, delta=0.5)
+
+    def test_should_not_wait_when_requests_remaining(self, mock_sleep):
+        # given
+        self.server.responses.append(
+            (
+                200,
+                {"X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "2.0"},
+                {"id": "1"},
+            )
+        )
+        # when
+        self.hook.execute(content="first", wait_for_response=True)
+        self.hook.execute(content="second", wait_for_response=True)
+        # then
+        self.assertFalse(mock_sleep.called)
+
+
+class TestMergeMessages(TestCase):
+    def test_should_merge_messages_with_same_properties(self):
+        # given
+        message_1 = {"content": "content", "embeds": [{"description": "first"}]}
+        message_2 = {"content": "content", "embeds": [{"description": "second"}]}
+        # when
+        result = merge_messages(message_1, message_2)
+        # then
+        self.assertEqual(
+            result,
+            {
+                "content": "content",
+                "embeds": [{"description": "first"}, {"description": "second"}],
+            },
+        )
+
+    def test_should_not_merge_messages_without_embeds(self):
+        # given
+        message_1 = {"content": "content"}
+        message_2 = {"content": "content", "embeds": [{"description": "second"}]}
+        # when/then
+        self.assertIsNone(merge_messages(message_1, message_2))
+        self.assertIsNone(merge_messages(message_2, message_1))
+
+    def test_should_not_merge_messages_with_different_properties(self):
+        for key, value in [
+            ("content", "other"),
+            ("username", "other"),
+            ("avatar_url", "other"),
+            ("tts", True),
+        ]:
+            with self.subTest(key=key):
+                # given
+                message_1 = {"content": "content", "embeds": [{"title": "first"}]}
+                message_2 = {
+                    **message_1,
+                    key: value,
+                    "embeds": [{"title": "second"}],
+                }
+                # when/then
+                self.assertIsNone(merge_messages(message_1, message_2))
+
+    def test_should_not_merge_when_exceeding_embed_limit(self):
+        # given
+        message_1 = {"embeds": [{"description": "first"}] * 9}
+        message_2 = {"embeds": [{"description": "second"}] * 2}
+        # when/then
+        self.assertIsNone(merge_messages(message_1, message_2))
+
+    def test_should_not_merge_when_exceeding_character_limit(self):
+        # given
+        message_1 = {
+            "embeds": [
+                {
+                    "title": "x" * 200,
+                    "description": "x" * 4000,
+                    "footer": {"text": "x" * 100},
+                }
+            ]
+        }
+        message_2 = {
+            "embeds": [
+                {
+                    "author": {"name": "x" * 100},
+                    "fields": [{"name": "x" * 100, "value": "x" * 1000}],
+                    "description": "x" * 501,
+                }
+            ]
+        }
+        # when/then
+        self.assertIsNone(merge_messages(message_1, message_2))
+        message_2["embeds"][0]["description"] = "x" * 500
+        self.assertIsNotNone(merge_messages(message_1, message_2))
+
+
+class TestMessageQueue(TestCase):
+    @patch(MODULE_PATH + "._queues", {})
+    @patch(MODULE_PATH + ".get_redis_client", wraps=get_redis_client)
+    def test_should_create_queue_once(self, mock_get_redis_client):
+        # when
+        queue_1 = message_queue("alpha")
+        queue_2 = message_queue("alpha")
+        queue_3 = message_queue("bravo")
+        # then
+        self.assertIs(queue_1, queue_2)
+        self.assertIsNot(queue_1, queue_3)
+        self.assertEqual(queue_1.name, "alpha")
+        self.assertEqual(mock_get_redis_client.call_count, 2)
+
+
+class TestWebhookClient(TestCase):
+    def test_should_return_same_client_for_same_url(self):
+        # when
+        client_1 = webhook_client("https://www.example.com/1")
+        client_2 = webhook_client("https://www.example.com/1")
+        client_3 = webhook_client("https://www.example.com/2")
+        # then
+        self.assertIs(client_1, client_2)
+        self.assertIsNot(client_1, client_3)
+
+
+@patch(MODULE_PATH + ".sleep")
+class TestSendQueuedMessages(StubServerTestCase):
+    def test_should_send_all_messages_with_rate_limits(self, mock_sleep):
+        # given
+        webhook = create_discord_webhook(url=self.server.url("/webhook-1"))
+        webhook.clear_queue()
+        for num in range(3):
+            webhook.send_message(f"message-{num}")
+        self.server.responses.append((429, {}, {"retry_after": 0.5}))
+        # when
+        result = webhook.send_queued_messages()
+        # then
+        self.assertEqual(result, 3)
+        self.assertEqual(webhook.queue_size(), 0)
+        contents = [payload["content"] for _, payload in self.server.requests]
+        self.assertEqual(contents, ["message-0", "message-0", "message-1", "message-2"])
+
+    def test_should_send_messages_for_several_webhooks_concurrently(self, mock_sleep):
+        # given
+        webhooks = [
+            create_discord_webhook(url=self.server.url(f"/webhook-{num}"))
+            for num in range(3)
+        ]
+        for webhook in webhooks:
+            webhook.clear_queue()
+            webhook.send_message("first")
+            webhook.send_message("second")
+        # when
+        result = send_queued_messages_concurrently(webhooks, max_workers=3)
+        # then
+        self.assertEqual(result, {webhook.pk: 2 for webhook in webhooks})
+        self.assertEqual(len(self.server.requests), 6)
+        for num in range(3):
+            contents = [
+                payload["content"]
+                for path, payload in self.server.requests
+                if path.startswith(f"/webhook-{num}?")
+            ]
+            self.assertEqual(contents, ["first", "second"])
+
+    def test_should_return_empty_result_when_no_webhooks(self, mock_sleep):
+        self.assertEqual(send_queued_messages_concurrently([], max_workers=3), {})
@@ -368,7 +368,6 @@ class TestSendNotifications(LoadTestDataMixin, TestCase):
 
 
 @override_settings(CELERY_ALWAYS_EAGER=True)
-@patch(MODELS_PATH + ".sleep", new=lambda x: x)
 @patch(TASKS_PATH + ".notify", spec=True)
 @patch(MODELS_PATH + ".dhooks_lite.Webhook.execute", spec=True)
 class TestTestMessageToWebhook(LoadTestDataMixin, TestCase):
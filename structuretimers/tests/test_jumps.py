@@ -0,0 +1,274 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from eveuniverse.models import EveSolarSystem, EveStargate
+
+from app_utils.testing import NoSocketsTestCase
+
+from structuretimers.jumps import (
+    JumpGraph,
+    JumpsUnknown,
+    invalidate_jump_graph,
+    jump_graph,
+    jumps_between,
+    system_distances,
+    system_distances_many,
+)
+
+from .testdata.factory import (
+    create_distances_from_staging,
+    create_staging_system,
+    create_stargates,
+    create_timer,
+)
+from .testdata.fixtures import LoadTestDataMixin
+
+MODULE_PATH = "structuretimers.jumps"
+
+
+class TestJumpGraph(TestCase):
+    def setUp(self) -> None:
+        self.graph = JumpGraph([(1, 2), (2, 3), (3, 4), (2, 1), (1, 3), (5, 6)])
+
+    def test_should_contain_connected_systems(self):
+        self.assertEqual(len(self.graph), 6)
+        self.assertIn(1, self.graph)
+        self.assertNotIn(7, self.graph)
+
+    def test_should_return_jumps(self):
+        self.assertEqual(self.graph.jumps(1, 1), 0)
+        self.assertEqual(self.graph.jumps(1, 2), 1)
+        self.assertEqual(self.graph.jumps(1, 4), 2)
+        self.assertEqual(self.graph.jumps(4, 1), 2)
+        self.assertEqual(self.graph.jumps(5, 6), 1)
+
+    def test_should_return_none_when_no_route(self):
+        self.assertIsNone(self.graph.jumps(1, 6))
+
+    def test_should_raise_error_when_system_not_in_graph(self):
+        with self.assertRaises(KeyError):
+            self.graph.jumps(1, 7)
+        with self.assertRaises(KeyError):
+            self.graph.jumps(7, 1)
+
+    def test_should_calculate_distances_once_per_origin(self):
+        with patch.object(
+            self.graph,
+            "_calc_distances_from",
+            wraps=self.graph._calc_distances_from,
+        ) as spy:
+            self.graph.jumps(1, 2)
+            self.graph.jumps(1, 3)
+            self.graph.jumps(1, 4)
+            self.assertEqual(spy.call_count, 1)
+
+    def test_should_drop_distances_of_least_recently_used_origin(self):
+        with patch.object(JumpGraph, "MAX_CACHED_ORIGINS", 2), patch.object(
+            self.graph,
+            "_calc_distances_from",
+            wraps=self.graph._calc_distances_from,
+        ) as spy:
+            self.graph.jumps(1, 4)
+            self.graph.jumps(2, 4)
+            self.graph.jumps(1, 4)
+            self.graph.jumps(3, 4)  # drops 2
+            self.graph.jumps(1, 4)
+            self.assertEqual(spy.call_count, 3)
+            self.graph.jumps(2, 4)
+            self.assertEqual(spy.call_count, 4)
+
+    def test_should_be_complete_when_stargates_of_all_systems_known(self):
+        graph = JumpGraph([(1, 2), (2, 1), (2, 3), (3, 2)])
+        self.assertTrue(graph.is_complete)
+
+    def test_should_not_be_complete_when_stargates_of_a_system_missing(self):
+        graph = JumpGraph([(1, 2), (2, 1), (2, 3)])
+        self.assertFalse(graph.is_complete)
+
+    def test_should_handle_empty_graph(self):
+        graph = JumpGraph([])
+        self.assertEqual(len(graph), 0)
+        self.assertNotIn(1, graph)
+
+
+class JumpsTestCase(LoadTestDataMixin, NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.system_jita = EveSolarSystem.objects.get(id=30000142)
+        cls.system_hed_gp = EveSolarSystem.objects.get(id=30001161)
+        cls.system_j151645 = EveSolarSystem.objects.get(id=31001303)
+
+
+class TestJumpGraphFromDatabase(JumpsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_should_create_graph_from_stargates(self):
+        # given
+        create_stargates(self.system_jita, self.system_enaluri, self.system_abune)
+        # when
+        graph = JumpGraph.from_stargates()
+        # then
+        self.assertEqual(len(graph), 3)
+        self.assertEqual(graph.jumps(self.system_jita.id, self.system_abune.id), 2)
+
+    def test_should_reuse_graph(self):
+        # given
+        graph = jump_graph()
+        # when/then
+        with self.assertNumQueries(0):
+            self.assertIs(jump_graph(), graph)
+
+    def test_should_rebuild_graph_after_invalidation(self):
+        # given
+        graph = jump_graph()
+        # when
+        invalidate_jump_graph()
+        # then
+        self.assertIsNot(jump_graph(), graph)
+
+    def test_should_rebuild_graph_when_stargates_changed(self):
+        # given
+        graph = jump_graph()
+        self.assertEqual(len(graph), 0)
+        # when
+        create_stargates(self.system_jita, self.system_enaluri)
+        # then
+        self.assertEqual(len(jump_graph()), 2)
+
+
+@patch(MODULE_PATH + ".EveSolarSystem.jumps_to", spec=True)
+class TestJumpsBetween(JumpsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_should_return_jumps_from_graph(self, mock_jumps_to):
+        # given
+        create_stargates(
+            self.system_jita, self.system_enaluri, self.system_abune, self.system_hed_gp
+        )
+        # when
+        result = jumps_between(self.system_jita, self.system_hed_gp)
+        # then
+        self.assertEqual(result, 3)
+        self.assertFalse(mock_jumps_to.called)
+
+    def test_should_return_none_when_no_route_in_graph(self, mock_jumps_to):
+        # given
+        create_stargates(self.system_jita, self.system_enaluri)
+        create_stargates(self.system_abune, self.system_hed_gp)
+        # when
+        result = jumps_between(self.system_jita, self.system_hed_gp)
+        # then
+        self.assertIsNone(result)
+        self.assertFalse(mock_jumps_to.called)
+
+    def test_should_fall_back_to_esi_when_no_route_in_incomplete_graph(
+        self, mock_jumps_to
+    ):
+        # given
+        create_stargates(self.system_jita, self.system_enaluri)
+        create_stargates(self.system_abune, self.system_hed_gp)
+        EveStargate.objects.filter(eve_solar_system=self.system_enaluri).delete()
+        mock_jumps_to.return_value = 7
+        # when
+        result = jumps_between(self.system_jita, self.system_hed_gp)
+        # then
+        self.assertEqual(result, 7)
+        self.assertTrue(mock_jumps_to.called)
+
+    def test_should_fall_back_to_esi_when_system_not_in_graph(self, mock_jumps_to):
+        # given
+        create_stargates(self.system_jita, self.system_enaluri)
+        mock_jumps_to.return_value = 7
+        # when
+        result = jumps_between(self.system_jita, self.system_hed_gp)
+        # then
+        self.assertEqual(result, 7)
+        self.assertTrue(mock_jumps_to.called)
+
+    def test_should_not_fall_back_to_esi_when_local_only(self, mock_jumps_to):
+        # given
+        create_stargates(self.system_jita, self.system_enaluri)
+        # when/then
+        with self.assertRaises(JumpsUnknown):
+            jumps_between(self.system_jita, self.system_hed_gp, local_only=True)
+        self.assertFalse(mock_jumps_to.called)
+
+    def test_should_return_none_for_wormhole_systems(self, mock_jumps_to):
+        # when/then
+        self.assertIsNone(jumps_between(self.system_jita, self.system_j151645))
+        self.assertIsNone(jumps_between(self.system_j151645, self.system_jita))
+        self.assertFalse(mock_jumps_to.called)
+
+    def test_should_return_zero_for_same_system(self, mock_jumps_to):
+        # when/then
+        self.assertEqual(jumps_between(self.system_jita, self.system_jita), 0)
+        self.assertFalse(mock_jumps_to.called)
+
+
+@patch(MODULE_PATH + ".jumps_between", wraps=jumps_between)
+class TestSystemDistances(JumpsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        create_stargates(self.system_enaluri, self.system_jita, self.system_abune)
+
+    def test_should_return_distances(self, spy_jumps_between):
+        # when
+        light_years, jumps = system_distances(self.system_enaluri, self.system_abune)
+        # then
+        self.assertEqual(jumps, 2)
+        self.assertAlmostEqual(light_years, 6.8, delta=0.1)
+
+    def test_should_reuse_cached_distances(self, spy_jumps_between):
+        # given
+        system_distances(self.system_enaluri, self.system_abune)
+        # when
+        result = system_distances(self.system_enaluri, self.system_abune)
+        # then
+        self.assertEqual(result[1], 2)
+        self.assertEqual(spy_jumps_between.call_count, 1)
+
+    def test_should_calc_distances_again_after_invalidation(self, spy_jumps_between):
+        # given
+        system_distances(self.system_enaluri, self.system_abune)
+        # when
+        invalidate_jump_graph()
+        system_distances(self.system_enaluri, self.system_abune)
+        # then
+        self.assertEqual(spy_jumps_between.call_count, 2)
+
+    def test_should_return_distances_for_many_systems(self, spy_jumps_between):
+        # given
+        system_distances(self.system_enaluri, self.system_abune)
+        # when
+        result = system_distances_many(
+            self.system_enaluri,
+            [self.system_abune, self.system_jita, self.system_j151645],
+        )
+        # then
+        self.assertEqual(result[self.system_abune.id][1], 2)
+        self.assertEqual(result[self.system_jita.id][1], 1)
+        self.assertEqual(result[self.system_j151645.id], (None, None))
+        self.assertEqual(spy_jumps_between.call_count, 3)
+
+
+class TestDistancesFromStagingWithJumpGraph(JumpsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_should_calculate_jumps_without_esi(self):
+        # given
+        create_stargates(self.system_enaluri, self.system_jita, self.system_abune)
+        timer = create_timer(eve_solar_system=self.system_abune)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        distances = create_distances_from_staging(
+            timer, staging_system, light_years=None, jumps=None
+        )
+        # when
+        distances.calculate()
+        # then
+        self.assertEqual(distances.jumps, 2)
+        self.assertGreater(distances.light_years, 0)
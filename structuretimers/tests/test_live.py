@@ -0,0 +1,244 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from redis.exceptions import RedisError
+
+from django.test import TestCase
+
+from app_utils.testing import NoSocketsTestCase
+
+from structuretimers.live import (
+    CHANNEL_NAME,
+    EVENT_CREATED,
+    EVENT_DELETED,
+    EVENT_UPDATED,
+    TimerEventFilter,
+    publish_timer_event,
+    stream_timer_events,
+    timer_scope,
+)
+from structuretimers.models import Timer
+
+from .testdata.factory import create_timer, create_user
+from .testdata.fixtures import LoadTestDataMixin
+from .utils import add_permission_to_user_by_name
+
+MODULE_PATH = "structuretimers.live"
+
+
+def make_scope(**kwargs) -> dict:
+    scope = {
+        "visibility": Timer.Visibility.UNRESTRICTED,
+        "user_id": None,
+        "eve_corporation_id": None,
+        "eve_alliance_id": None,
+        "is_opsec": False,
+    }
+    scope.update(kwargs)
+    return scope
+
+
+class TestTimerEventFilter(TestCase):
+    def setUp(self) -> None:
+        self.event_filter = TimerEventFilter(
+            user_pk=1, corporation_pks=[11], alliance_pks=[21], has_opsec_access=False
+        )
+
+    def test_should_show_unrestricted_timers(self):
+        self.assertTrue(self.event_filter.is_visible(make_scope()))
+
+    def test_should_show_own_timers(self):
+        self.assertTrue(
+            self.event_filter.is_visible(
+                make_scope(visibility=Timer.Visibility.CORPORATION, user_id=1)
+            )
+        )
+
+    def test_should_show_timers_of_own_organizations(self):
+        self.assertTrue(
+            self.event_filter.is_visible(
+                make_scope(
+                    visibility=Timer.Visibility.CORPORATION, eve_corporation_id=11
+                )
+            )
+        )
+        self.assertTrue(
+            self.event_filter.is_visible(
+                make_scope(visibility=Timer.Visibility.ALLIANCE, eve_alliance_id=21)
+            )
+        )
+
+    def test_should_hide_timers_of_other_organizations(self):
+        self.assertFalse(
+            self.event_filter.is_visible(
+                make_scope(
+                    visibility=Timer.Visibility.CORPORATION, eve_corporation_id=12
+                )
+            )
+        )
+        self.assertFalse(
+            self.event_filter.is_visible(
+                make_scope(visibility=Timer.Visibility.ALLIANCE, eve_alliance_id=22)
+            )
+        )
+
+    def test_should_hide_opsec_timers_without_permission(self):
+        self.assertFalse(self.event_filter.is_visible(make_scope(is_opsec=True)))
+
+    def test_should_pass_events_for_visible_timers(self):
+        # when
+        result = self.event_filter.apply(
+            {"event": EVENT_UPDATED, "id": 5, "scope": make_scope()}
+        )
+        # then
+        self.assertEqual(result, {"event": EVENT_UPDATED, "id": 5})
+
+    def test_should_drop_events_for_hidden_timers(self):
+        # when
+        result = self.event_filter.apply(
+            {"event": EVENT_CREATED, "id": 5, "scope": make_scope(is_opsec=True)}
+        )
+        # then
+        self.assertIsNone(result)
+
+    def test_should_report_timer_as_deleted_when_hidden_by_update(self):
+        # when
+        result = self.event_filter.apply(
+            {
+                "event": EVENT_UPDATED,
+                "id": 5,
+                "scope": make_scope(is_opsec=True),
+                "old_scope": make_scope(),
+            }
+        )
+        # then
+        self.assertEqual(result, {"event": EVENT_DELETED, "id": 5})
+
+    def test_should_report_timer_as_created_when_shown_by_update(self):
+        # when
+        result = self.event_filter.apply(
+            {
+                "event": EVENT_UPDATED,
+                "id": 5,
+                "scope": make_scope(),
+                "old_scope": make_scope(is_opsec=True),
+            }
+        )
+        # then
+        self.assertEqual(result, {"event": EVENT_CREATED, "id": 5})
+
+
+class TestTimerEventFilterForUser(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_create_filter_for_user(self):
+        # given
+        user = create_user(self.character_1)
+        user = add_permission_to_user_by_name("structuretimers.opsec_access", user)
+        # when
+        event_filter = TimerEventFilter.for_user(user)
+        # then
+        self.assertEqual(event_filter.user_pk, user.pk)
+        self.assertSetEqual(event_filter.corporation_pks, {self.corporation_1.pk})
+        self.assertSetEqual(event_filter.alliance_pks, {self.alliance_1.pk})
+        self.assertTrue(event_filter.has_opsec_access)
+
+    @patch("structuretimers.models.STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+    def test_should_return_scope_of_timer(self):
+        # given
+        timer = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_1,
+            is_opsec=True,
+        )
+        # when
+        scope = timer_scope(timer)
+        # then
+        self.assertEqual(
+            scope,
+            make_scope(
+                visibility=Timer.Visibility.CORPORATION,
+                eve_corporation_id=self.corporation_1.pk,
+                is_opsec=True,
+            ),
+        )
+
+
+@patch(MODULE_PATH + ".get_redis_client")
+class TestPublishTimerEvent(TestCase):
+    def test_should_publish_event(self, mock_get_redis_client):
+        # when
+        publish_timer_event(EVENT_UPDATED, 5, make_scope(), make_scope(is_opsec=True))
+        # then
+        channel, data = mock_get_redis_client.return_value.publish.call_args[0]
+        self.assertEqual(channel, CHANNEL_NAME)
+        self.assertEqual(
+            json.loads(data),
+            {
+                "event": EVENT_UPDATED,
+                "id": 5,
+                "scope": make_scope(),
+                "old_scope": make_scope(is_opsec=True),
+            },
+        )
+
+    def test_should_omit_unchanged_scope(self, mock_get_redis_client):
+        # when
+        publish_timer_event(EVENT_UPDATED, 5, make_scope(), make_scope())
+        # then
+        _, data = mock_get_redis_client.return_value.publish.call_args[0]
+        self.assertNotIn("old_scope", json.loads(data))
+
+    def test_should_not_raise_when_redis_fails(self, mock_get_redis_client):
+        # given
+        mock_get_redis_client.return_value.publish.side_effect = RedisError
+        # when
+        publish_timer_event(EVENT_DELETED, 5, make_scope())
+
+
+@patch(MODULE_PATH + ".TimerEventFilter.for_user")
+@patch(MODULE_PATH + ".get_redis_client")
+class TestStreamTimerEvents(TestCase):
+    def setUp(self) -> None:
+        self.pubsub = MagicMock()
+
+    def _stream(self, mock_get_redis_client, mock_for_user, messages, count):
+        mock_get_redis_client.return_value.pubsub.return_value = self.pubsub
+        mock_for_user.return_value = TimerEventFilter(
+            user_pk=1, corporation_pks=[], alliance_pks=[], has_opsec_access=False
+        )
+        self.pubsub.get_message.side_effect = messages
+        stream = stream_timer_events(MagicMock(), max_seconds=60)
+        return [next(stream) for _ in range(count)], stream
+
+    def test_should_stream_visible_events(self, mock_get_redis_client, mock_for_user):
+        # given
+        messages = [
+            {"data": json.dumps({"event": EVENT_CREATED, "id": 1, "scope": scope})}
+            for scope in (make_scope(), make_scope(is_opsec=True), make_scope())
+        ]
+        messages.append(None)
+        # when
+        chunks, _ = self._stream(mock_get_redis_client, mock_for_user, messages, 4)
+        # then
+        self.assertTrue(chunks[0].startswith("retry:"))
+        self.assertEqual(
+            chunks[1], 'event: timer\ndata: {"event": "created", "id": 1}\n\n'
+        )
+        self.assertEqual(chunks[2], chunks[1])
+        self.assertTrue(chunks[3].startswith(":"))
+        self.pubsub.subscribe.assert_called_once_with(CHANNEL_NAME)
+
+    def test_should_ignore_invalid_messages(self, mock_get_redis_client, mock_for_user):
+        # given
+        messages = [{"data": "invalid"}, {"data": json.dumps({"id": 1})}, None]
+        # when
+        chunks, _ = self._stream(mock_get_redis_client, mock_for_user, messages, 2)
+        # then
+        self.assertTrue(chunks[1].startswith(":"))
+
+    def test_should_unsubscribe_when_closed(self, mock_get_redis_client, mock_for_user):
+        # given
+        _, stream = self._stream(mock_get_redis_client, mock_for_user, [None], 2)
+        # when
+        stream.close()
+        # then
+        self.assertTrue(self.pubsub.close.called)
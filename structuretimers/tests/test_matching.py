@@ -0,0 +1,376 @@
+import datetime as dt
+from unittest.mock import Mock, patch
+
+from django.test import TestCase
+from django.utils.timezone import now
+from eveuniverse.models import EveRegion, EveSolarSystem
+
+from structuretimers.matching import (
+    NotificationRuleIndex,
+    NotificationRuleMatcher,
+    invalidate_notification_rule_index,
+    notification_rule_index,
+)
+from structuretimers.models import NotificationRule, Timer
+
+from .testdata.factory import create_notification_rule, create_timer
+from .testdata.fixtures import LoadTestDataMixin
+
+MODELS_PATH = "structuretimers.models"
+
+
+@patch(MODELS_PATH + "._task_calc_timer_distances_for_all_staging_systems", Mock())
+@patch(MODELS_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestNotificationRuleMatcher(LoadTestDataMixin, TestCase):
+    def test_should_compile_rule(self):
+        # given
+        rule = create_notification_rule(
+            require_timer_types=[Timer.Type.ARMOR],
+            is_opsec=NotificationRule.Clause.EXCLUDED,
+        )
+        rule.require_corporations.add(self.corporation_1)
+        rule.exclude_alliances.add(self.alliance_3)
+        # when
+        matcher = NotificationRuleMatcher.from_notification_rule(rule)
+        # then
+        self.assertEqual(matcher.notification_rule_pk, rule.pk)
+        self.assertEqual(matcher.require_timer_types, frozenset({Timer.Type.ARMOR}))
+        self.assertIsNone(matcher.is_important)
+        self.assertFalse(matcher.is_opsec)
+        self.assertEqual(
+            matcher.require_corporation_ids, frozenset({self.corporation_1.pk})
+        )
+        self.assertEqual(matcher.exclude_alliance_ids, frozenset({self.alliance_3.pk}))
+        self.assertEqual(matcher.require_region_ids, frozenset())
+
+    def test_should_match_timer_without_queries(self):
+        # given
+        rule = create_notification_rule(require_objectives=[Timer.Objective.HOSTILE])
+        rule.require_corporations.add(self.corporation_1)
+        rule.exclude_regions.add(EveRegion.objects.get(name="Black Rise"))
+        create_timer(
+            eve_corporation=self.corporation_1, objective=Timer.Objective.HOSTILE
+        )
+        timer = Timer.objects.select_related_for_matching().first()
+        rule.matcher
+        # when/then
+        with self.assertNumQueries(0):
+            self.assertTrue(rule.is_matching_timer(timer))
+
+    def test_should_reset_matcher_when_relations_change(self):
+        # given
+        rule = create_notification_rule()
+        timer = create_timer(eve_corporation=self.corporation_1)
+        self.assertTrue(rule.is_matching_timer(timer))
+        # when
+        rule.exclude_corporations.add(self.corporation_1)
+        # then
+        self.assertFalse(rule.is_matching_timer(timer))
+
+    def test_should_reset_matcher_when_saved(self):
+        # given
+        rule = create_notification_rule()
+        timer = create_timer(timer_type=Timer.Type.HULL)
+        self.assertTrue(rule.is_matching_timer(timer))
+        # when
+        rule.require_timer_types = [Timer.Type.ARMOR]
+        rule.save()
+        # then
+        self.assertFalse(rule.is_matching_timer(timer))
+
+    def test_should_use_constant_number_of_queries_for_many_timers(self):
+        # given
+        rule = create_notification_rule()
+        rule.require_corporations.add(self.corporation_1)
+        rule.require_regions.add(EveRegion.objects.get(name="Essence"))
+        for hours in range(10):
+            create_timer(
+                date=now() + dt.timedelta(hours=hours + 1),
+                eve_corporation=self.corporation_1,
+            )
+        rule = NotificationRule.objects.get(pk=rule.pk)
+        # when
+        with self.assertNumQueries(8):
+            timers = list(
+                Timer.objects.conforms_with_notification_rule(rule, in_database=False)
+            )
+        # then
+        self.assertEqual(len(timers), 10)
+
+
+@patch(MODELS_PATH + "._task_calc_timer_distances_for_all_staging_systems", Mock())
+@patch(MODELS_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestNotificationRuleMatcherTimerQuery(LoadTestDataMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.region_essence = EveRegion.objects.get(name="Essence")
+        cls.region_forge = EveRegion.objects.get(name="The Forge")
+
+    def setUp(self) -> None:
+        solar_systems = [None] + list(EveSolarSystem.objects.all())
+        organizations = [
+            (None, None),
+            (self.corporation_1, self.alliance_1),
+            (self.corporation_3, None),
+        ]
+        for num, solar_system in enumerate(solar_systems):
+            for corporation, alliance in organizations:
+                create_timer(
+                    eve_solar_system=solar_system,
+                    eve_corporation=corporation,
+                    eve_alliance=alliance,
+                    timer_type=Timer.Type.ARMOR if num % 2 else Timer.Type.HULL,
+                    objective=Timer.Objective.HOSTILE,
+                    visibility=Timer.Visibility.CORPORATION
+                    if num % 3
+                    else Timer.Visibility.UNRESTRICTED,
+                    is_important=bool(num % 2),
+                    is_opsec=bool(num % 3),
+                )
+        create_timer(timer_type=Timer.Type.PRELIMINARY)
+
+    def assert_same_timers_as_in_python(self, rule: NotificationRule):
+        rule = NotificationRule.objects.get(pk=rule.pk)
+        expected = {
+            timer.pk
+            for timer in Timer.objects.select_related_for_matching()
+            if rule.is_matching_timer(timer)
+        }
+        result = set(
+            Timer.objects.conforms_with_notification_rule(rule).values_list(
+                "pk", flat=True
+            )
+        )
+        self.assertSetEqual(result, expected)
+        return result
+
+    def test_should_match_all_timers_with_date_when_no_clauses(self):
+        rule = create_notification_rule()
+        result = self.assert_same_timers_as_in_python(rule)
+        self.assertEqual(len(result), Timer.objects.filter(date__isnull=False).count())
+
+    def test_should_match_same_timers_for_field_clauses(self):
+        params = [
+            {"require_timer_types": [Timer.Type.ARMOR]},
+            {"exclude_timer_types": [Timer.Type.ARMOR, Timer.Type.NONE]},
+            {"require_objectives": [Timer.Objective.FRIENDLY]},
+            {"exclude_objectives": [Timer.Objective.FRIENDLY]},
+            {"require_visibility": [Timer.Visibility.CORPORATION]},
+            {"exclude_visibility": [Timer.Visibility.CORPORATION]},
+            {"is_important": NotificationRule.Clause.REQUIRED},
+            {"is_important": NotificationRule.Clause.EXCLUDED},
+            {"is_opsec": NotificationRule.Clause.REQUIRED},
+            {"is_opsec": NotificationRule.Clause.EXCLUDED},
+        ]
+        for kwargs in params:
+            with self.subTest(**kwargs):
+                self.assert_same_timers_as_in_python(create_notification_rule(**kwargs))
+
+    def test_should_match_same_timers_for_space_types(self):
+        for space_type in Timer.SpaceType.values:
+            with self.subTest(require_space_type=space_type):
+                result = self.assert_same_timers_as_in_python(
+                    create_notification_rule(require_space_types=[space_type])
+                )
+                self.assertTrue(result)
+            with self.subTest(exclude_space_type=space_type):
+                self.assert_same_timers_as_in_python(
+                    create_notification_rule(exclude_space_types=[space_type])
+                )
+        with self.subTest(require_space_type="multiple"):
+            self.assert_same_timers_as_in_python(
+                create_notification_rule(
+                    require_space_types=[
+                        Timer.SpaceType.HIGH_SEC,
+                        Timer.SpaceType.WH_SPACE,
+                    ]
+                )
+            )
+
+    def test_should_match_same_timers_for_organizations(self):
+        params = [
+            ("require_corporations", self.corporation_1),
+            ("exclude_corporations", self.corporation_1),
+            ("require_alliances", self.alliance_1),
+            ("exclude_alliances", self.alliance_1),
+        ]
+        for field_name, obj in params:
+            with self.subTest(field_name=field_name):
+                rule = create_notification_rule()
+                getattr(rule, field_name).add(obj)
+                self.assert_same_timers_as_in_python(rule)
+
+    def test_should_match_same_timers_for_regions(self):
+        for field_name in ["require_regions", "exclude_regions"]:
+            with self.subTest(field_name=field_name):
+                rule = create_notification_rule()
+                getattr(rule, field_name).add(self.region_essence, self.region_forge)
+                self.assert_same_timers_as_in_python(rule)
+
+    def test_should_match_same_timers_for_combined_clauses(self):
+        rule = create_notification_rule(
+            require_timer_types=[Timer.Type.ARMOR],
+            exclude_space_types=[Timer.SpaceType.NULL_SEC],
+            is_opsec=NotificationRule.Clause.EXCLUDED,
+        )
+        rule.exclude_corporations.add(self.corporation_3)
+        rule.require_regions.add(self.region_essence)
+        result = self.assert_same_timers_as_in_python(rule)
+        self.assertTrue(result)
+
+    def test_should_match_with_single_query(self):
+        rule = create_notification_rule(require_objectives=[Timer.Objective.HOSTILE])
+        rule.require_regions.add(self.region_essence)
+        rule.matcher
+        with self.assertNumQueries(1):
+            list(Timer.objects.conforms_with_notification_rule(rule))
+
+
+@patch(MODELS_PATH + "._task_calc_timer_distances_for_all_staging_systems", Mock())
+@patch(MODELS_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestNotificationRuleIndex(LoadTestDataMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.region_essence = EveRegion.objects.get(name="Essence")
+
+    def setUp(self) -> None:
+        invalidate_notification_rule_index()
+
+    def test_should_find_same_rules_as_matcher(self):
+        # given
+        rules = [
+            create_notification_rule(),
+            create_notification_rule(require_timer_types=[Timer.Type.ARMOR]),
+            create_notification_rule(exclude_timer_types=[Timer.Type.ARMOR]),
+            create_notification_rule(require_objectives=[Timer.Objective.HOSTILE]),
+            create_notification_rule(is_opsec=NotificationRule.Clause.REQUIRED),
+            create_notification_rule(is_important=NotificationRule.Clause.EXCLUDED),
+            create_notification_rule(
+                require_space_types=[Timer.SpaceType.LOW_SEC],
+                exclude_visibility=[Timer.Visibility.ALLIANCE],
+            ),
+            create_notification_rule(exclude_space_types=[Timer.SpaceType.LOW_SEC]),
+        ]
+        rule = create_notification_rule()
+        rule.require_corporations.add(self.corporation_1)
+        rules.append(rule)
+        rule = create_notification_rule()
+        rule.exclude_alliances.add(self.alliance_1)
+        rules.append(rule)
+        rule = create_notification_rule()
+        rule.require_regions.add(self.region_essence)
+        rules.append(rule)
+        timers = [
+            create_timer(),
+            create_timer(timer_type=Timer.Type.ARMOR, is_opsec=True),
+            create_timer(objective=Timer.Objective.HOSTILE, is_important=True),
+            create_timer(
+                eve_corporation=self.corporation_1,
+                eve_alliance=self.alliance_1,
+                visibility=Timer.Visibility.ALLIANCE,
+            ),
+            create_timer(eve_solar_system=None),
+            create_timer(eve_solar_system=EveSolarSystem.objects.get(name="Jita")),
+            create_timer(timer_type=Timer.Type.PRELIMINARY),
+        ]
+        index = notification_rule_index()
+        # when/then
+        for timer in Timer.objects.select_related_for_matching().filter(
+            pk__in=[obj.pk for obj in timers]
+        ):
+            with self.subTest(timer=str(timer)):
+                expected = {
+                    rule.pk
+                    for rule in NotificationRule.objects.all()
+                    if rule.is_matching_timer(timer)
+                }
+                self.assertSetEqual(index.matching_rule_pks(timer), expected)
+
+    def test_should_reuse_index_without_queries(self):
+        # given
+        create_notification_rule()
+        timer = create_timer()
+        notification_rule_index()
+        # when
+        with self.assertNumQueries(0):
+            index = notification_rule_index()
+            result = index.matching_rule_pks(timer)
+        # then
+        self.assertEqual(len(result), 1)
+
+    def test_should_reuse_empty_index_without_queries(self):
+        # given
+        NotificationRule.objects.all().delete()
+        notification_rule_index()
+        # when
+        with self.assertNumQueries(0):
+            index = notification_rule_index()
+        # then
+        self.assertEqual(len(index), 0)
+
+    def test_should_rebuild_index_when_rule_saved(self):
+        # given
+        rule = create_notification_rule()
+        timer = create_timer()
+        self.assertSetEqual(
+            notification_rule_index().matching_rule_pks(timer), {rule.pk}
+        )
+        # when
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.require_timer_types = [Timer.Type.ARMOR]
+            rule.save()
+        # then
+        self.assertSetEqual(notification_rule_index().matching_rule_pks(timer), set())
+
+    def test_should_rebuild_index_when_rule_relations_change(self):
+        # given
+        rule = create_notification_rule()
+        timer = create_timer(eve_corporation=self.corporation_1)
+        self.assertSetEqual(
+            notification_rule_index().matching_rule_pks(timer), {rule.pk}
+        )
+        # when
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.exclude_corporations.add(self.corporation_1)
+        # then
+        self.assertSetEqual(notification_rule_index().matching_rule_pks(timer), set())
+
+    def test_should_rebuild_index_when_rule_deleted(self):
+        # given
+        rule = create_notification_rule()
+        timer = create_timer()
+        self.assertEqual(len(notification_rule_index()), 1)
+        # when
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        # then
+        self.assertEqual(len(notification_rule_index()), 0)
+        self.assertSetEqual(notification_rule_index().matching_rule_pks(timer), set())
+
+    def test_should_rebuild_index_when_changed_by_other_process(self):
+        # given
+        rule = create_notification_rule()
+        index = notification_rule_index()
+        # when
+        NotificationRule.objects.filter(pk=rule.pk).delete()
+        invalidate_notification_rule_index()
+        # then
+        self.assertIsNot(notification_rule_index(), index)
+
+    def test_should_keep_index_until_rule_change_committed(self):
+        # given
+        create_notification_rule()
+        index = notification_rule_index()
+        # when
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_notification_rule()
+            # then
+            self.assertIs(notification_rule_index(), index)
+        self.assertTrue(callbacks)
+
+    def test_can_create_empty_index(self):
+        index = NotificationRuleIndex([])
+        timer = create_timer()
+        self.assertSetEqual(index.matching_rule_pks(timer), set())
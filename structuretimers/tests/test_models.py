@@ -1,26 +1,41 @@
 import datetime as dt
 import json
+from unittest import skipUnless
 from unittest.mock import Mock, patch
 
 import dhooks_lite
 from pytz import utc
 
 from django.core.cache import cache
-from django.db import models
+from django.db import connection, models
 from django.test import TestCase, override_settings
 from django.utils.timezone import now
-from eveuniverse.models import EveRegion, EveSolarSystem
-
-from allianceauth.eveonline.models import EveAllianceInfo, EveCorporationInfo
+from eveuniverse.helpers import meters_to_ly
+from eveuniverse.models import EveRegion, EveSolarSystem, EveType
+
+from allianceauth.authentication.models import CharacterOwnership
+from allianceauth.eveonline.models import (
+    EveAllianceInfo,
+    EveCharacter,
+    EveCorporationInfo,
+)
+from app_utils.allianceauth import get_redis_client
 from app_utils.json import JSONDateTimeDecoder
 from app_utils.testing import NoSocketsTestCase
+from app_utils.urls import reverse_absolute
 
 from structuretimers import __title__
+from structuretimers.live import timer_scope
 from structuretimers.models import (
+    DeletedTimer,
+    DiscordWebhook,
+    DistancesFromStaging,
     NotificationRule,
     ScheduledNotification,
     StagingSystem,
     Timer,
+    TimerArchive,
+    TimerBoardRow,
     _task_calc_staging_system,
 )
 
@@ -262,6 +277,146 @@ class TestTimerSaveXCalcDistances(LoadTestDataMixin, NoSocketsTestCase):
         # then
         self.assertFalse(mock_calc_distances.called)
 
+    @patch(MODULE_PATH + "._task_calc_timer_distances_for_all_staging_systems")
+    def test_should_recalc_distances_in_place_when_solar_system_has_changed(
+        self, mock_calc_distances
+    ):
+        # given
+        timer = create_timer(
+            date=now() + dt.timedelta(hours=4),
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+        )
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        distances = create_distances_from_staging(
+            timer, staging_system, light_years=6.8, jumps=3
+        )
+        timer = Timer.objects.get(pk=timer.pk)
+        # when
+        timer.eve_solar_system = self.system_enaluri
+        timer.save()
+        # then
+        distances.refresh_from_db()
+        self.assertEqual(distances.light_years, 0)
+        self.assertIsNone(distances.jumps)
+        self.assertTrue(mock_calc_distances.called)
+
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", True)
+    @patch(MODULE_PATH + "._task_calc_timer_distances_for_all_staging_systems")
+    def test_should_not_calc_distances_for_new_timer_in_lazy_mode(
+        self, mock_calc_distances
+    ):
+        # when
+        Timer.objects.create(
+            date=now() + dt.timedelta(hours=4),
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+        )
+        # then
+        self.assertFalse(mock_calc_distances.called)
+
+    @patch(MODULE_PATH + "._task_calc_timer_distances_for_all_staging_systems")
+    def test_should_need_one_query_only_when_updating_details(
+        self, mock_calc_distances
+    ):
+        # given
+        timer = create_timer(
+            date=now() + dt.timedelta(hours=4),
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+        )
+        timer = Timer.objects.get(pk=timer.pk)
+        # when
+        timer.details_notes = "Updated notes"
+        with self.assertNumQueries(1):
+            timer.save()
+        # then
+        self.assertFalse(mock_calc_distances.called)
+
+    @patch(MODULE_PATH + "._task_calc_timer_distances_for_all_staging_systems")
+    def test_should_detect_changes_for_timer_not_loaded_from_database(
+        self, mock_calc_distances
+    ):
+        # given
+        timer = create_timer(
+            date=now() + dt.timedelta(hours=4),
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+        )
+        other = Timer(
+            pk=timer.pk,
+            date=timer.date,
+            eve_solar_system=self.system_enaluri,
+            structure_type=self.type_astrahus,
+        )
+        # when
+        other.save()
+        # then
+        self.assertTrue(mock_calc_distances.called)
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+@patch(MODULE_PATH + ".publish_timer_event")
+class TestTimerSaveXLiveUpdates(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_publish_created_timer(self, mock_publish_timer_event):
+        # when
+        with patch(MODULE_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True):
+            with self.captureOnCommitCallbacks(execute=True):
+                timer = create_timer()
+        # then
+        mock_publish_timer_event.assert_called_once_with(
+            "created", timer.pk, timer_scope(timer), None
+        )
+
+    def test_should_publish_updated_timer_with_old_scope(
+        self, mock_publish_timer_event
+    ):
+        # given
+        timer = create_timer()
+        timer = Timer.objects.get(pk=timer.pk)
+        old_scope = timer_scope(timer)
+        # when
+        with patch(MODULE_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True):
+            with self.captureOnCommitCallbacks(execute=True):
+                timer.is_opsec = True
+                timer.save()
+        # then
+        mock_publish_timer_event.assert_called_once_with(
+            "updated", timer.pk, timer_scope(timer), old_scope
+        )
+
+    def test_should_publish_deleted_timer(self, mock_publish_timer_event):
+        # given
+        timer = create_timer()
+        timer_pk = timer.pk
+        # when
+        with patch(
+            "structuretimers.signals.STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                Timer.objects.filter(pk=timer_pk).delete()
+        # then
+        args, _ = mock_publish_timer_event.call_args
+        self.assertEqual(args[:2], ("deleted", timer_pk))
+
+    def test_should_not_publish_when_disabled(self, mock_publish_timer_event):
+        # when
+        with patch(MODULE_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", False):
+            with self.captureOnCommitCallbacks(execute=True):
+                timer = create_timer()
+                timer.delete()
+        # then
+        self.assertFalse(mock_publish_timer_event.called)
+
+    def test_should_not_publish_before_commit(self, mock_publish_timer_event):
+        # when
+        with patch(MODULE_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True):
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                create_timer()
+        # then
+        self.assertFalse(mock_publish_timer_event.called)
+        self.assertEqual(len(callbacks), 1)
+
 
 class TestTimerSpaceType(NoSocketsTestCase):
     @classmethod
@@ -440,6 +595,394 @@ class TestTimerManger(LoadTestDataMixin, NoSocketsTestCase):
         result = Timer.objects.delete_obsolete()
         self.assertEqual(result, 0)
 
+    @patch("structuretimers.managers.sleep")
+    def test_should_delete_obsolete_timers_in_chunks(self, mock_sleep):
+        # given
+        obsolete_timers = [
+            create_timer(date=now() - dt.timedelta(days=2)) for _ in range(5)
+        ]
+        timer = create_timer(date=now())
+        # when
+        result = Timer.objects.delete_obsolete(batch_size=2, pause=0.5)
+        # then
+        self.assertEqual(result, 5)
+        self.assertSetEqual(set(Timer.objects.values_list("pk", flat=True)), {timer.pk})
+        self.assertEqual(mock_sleep.call_count, 2)
+        mock_sleep.assert_called_with(0.5)
+        self.assertSetEqual(
+            set(DeletedTimer.objects.values_list("timer_id", flat=True)),
+            {obj.pk for obj in obsolete_timers},
+        )
+
+    def test_should_delete_chunks_with_constant_number_of_queries(self):
+        # given
+        for _ in range(20):
+            create_timer(date=now() - dt.timedelta(days=2))
+        # when
+        with self.assertNumQueries(17):
+            result = Timer.objects.delete_obsolete(batch_size=10, pause=0)
+        # then
+        self.assertEqual(result, 20)
+        self.assertEqual(DeletedTimer.objects.count(), 20)
+
+    def test_should_delete_related_objects_of_obsolete_timers(self):
+        # given
+        obsolete_timer = create_timer(date=now() - dt.timedelta(days=2))
+        timer = create_timer(date=now())
+        staging_system = create_staging_system()
+        notification_rule = create_notification_rule()
+        for obj in [obsolete_timer, timer]:
+            create_distances_from_staging(obj, staging_system)
+            create_scheduled_notification(
+                timer=obj, notification_rule=notification_rule
+            )
+        # when
+        result = Timer.objects.delete_obsolete(pause=0)
+        # then
+        self.assertEqual(result, 1)
+        self.assertSetEqual(
+            set(DistancesFromStaging.objects.values_list("timer_id", flat=True)),
+            {timer.pk},
+        )
+        self.assertSetEqual(
+            set(ScheduledNotification.objects.values_list("timer_id", flat=True)),
+            {timer.pk},
+        )
+
+    def test_should_keep_timers_when_disabled(self):
+        # given
+        create_timer(date=now() - dt.timedelta(days=2))
+        # when
+        with patch(
+            "structuretimers.managers.STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS", None
+        ):
+            result = Timer.objects.delete_obsolete()
+        # then
+        self.assertEqual(result, 0)
+        self.assertEqual(Timer.objects.count(), 1)
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestDeletedTimer(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_log_deleted_timers(self):
+        # given
+        timer_1 = create_timer()
+        timer_2 = create_timer()
+        timer_pks = {timer_1.pk, timer_2.pk}
+        # when
+        timer_1.delete()
+        Timer.objects.filter(pk=timer_2.pk).delete()
+        # then
+        self.assertSetEqual(
+            set(DeletedTimer.objects.values_list("timer_id", flat=True)), timer_pks
+        )
+
+    def test_should_return_timers_deleted_since(self):
+        # given
+        DeletedTimer.objects.create(timer_id=1)
+        obj = DeletedTimer.objects.create(timer_id=2)
+        obj.deleted_at = now() - dt.timedelta(hours=2)
+        obj.save()
+        user = create_user(self.character_1)
+        # when
+        result = DeletedTimer.objects.timer_pks_since(
+            now() - dt.timedelta(hours=1), user
+        )
+        # then
+        self.assertSetEqual(result, {1})
+
+    def test_should_return_only_timers_deleted_since_visible_to_user(self):
+        # given
+        cache.clear()
+        user = create_user(self.character_1)
+        timer_own = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_1,
+        )
+        timer_other = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+        )
+        timer_opsec = create_timer(is_opsec=True)
+        Timer.objects.filter(
+            pk__in=[timer_own.pk, timer_other.pk, timer_opsec.pk]
+        ).delete()
+        # when
+        result = DeletedTimer.objects.timer_pks_since(
+            now() - dt.timedelta(hours=1), user
+        )
+        # then
+        self.assertSetEqual(result, {timer_own.pk})
+
+    def test_should_log_previous_scope_when_visibility_changed(self):
+        # given
+        timer = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_1,
+        )
+        # when
+        timer.visibility = Timer.Visibility.ALLIANCE
+        timer.save()
+        # then
+        obj = DeletedTimer.objects.get(timer_id=timer.pk)
+        self.assertEqual(obj.visibility, Timer.Visibility.CORPORATION)
+        self.assertEqual(obj.eve_corporation_id, self.corporation_1.pk)
+
+    def test_should_delete_obsolete_entries(self):
+        # given
+        DeletedTimer.objects.create(timer_id=1)
+        obj = DeletedTimer.objects.create(timer_id=2)
+        obj.deleted_at = now() - dt.timedelta(days=DeletedTimer.MAX_AGE_DAYS + 1)
+        obj.save()
+        # when
+        result = DeletedTimer.objects.delete_obsolete()
+        # then
+        self.assertEqual(result, 1)
+        self.assertSetEqual(
+            set(DeletedTimer.objects.values_list("timer_id", flat=True)), {1}
+        )
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+@patch("structuretimers.managers.STRUCTURETIMERS_TIMERS_OBSOLETE_AFTER_DAYS", 1)
+class TestTimerArchive(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_archive_timers_without_relations(self):
+        # given
+        user = create_user(self.character_1)
+        timer = create_timer(
+            timer_type=Timer.Type.HULL,
+            objective=Timer.Objective.HOSTILE,
+            visibility=Timer.Visibility.ALLIANCE,
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+            structure_name="Big Fort",
+            owner_name="Big Boss",
+            eve_character=self.character_1,
+            eve_corporation=self.corporation_1,
+            eve_alliance=self.alliance_1,
+            user=user,
+            is_opsec=True,
+        )
+        # when
+        result = TimerArchive.objects.archive_timers(Timer.objects.all())
+        # then
+        self.assertEqual(result, 1)
+        obj = TimerArchive.objects.get()
+        self.assertEqual(obj.timer_id, timer.pk)
+        self.assertEqual(obj.date, timer.date)
+        self.assertEqual(obj.timer_type, Timer.Type.HULL)
+        self.assertEqual(obj.objective, Timer.Objective.HOSTILE)
+        self.assertEqual(obj.visibility, Timer.Visibility.ALLIANCE)
+        self.assertEqual(obj.eve_solar_system_id, self.system_abune.id)
+        self.assertEqual(obj.eve_solar_system_name, "Abune")
+        self.assertEqual(
+            obj.eve_region_name, self.system_abune.eve_constellation.eve_region.name
+        )
+        self.assertEqual(obj.structure_type_id, self.type_astrahus.id)
+        self.assertEqual(obj.structure_type_name, "Astrahus")
+        self.assertEqual(obj.structure_name, "Big Fort")
+        self.assertEqual(obj.owner_name, "Big Boss")
+        self.assertEqual(obj.eve_character_name, self.character_1.character_name)
+        self.assertEqual(obj.eve_corporation_id, self.corporation_1.pk)
+        self.assertEqual(obj.eve_corporation_name, self.corporation_1.corporation_name)
+        self.assertEqual(obj.eve_alliance_id, self.alliance_1.pk)
+        self.assertEqual(obj.eve_alliance_name, self.alliance_1.alliance_name)
+        self.assertEqual(obj.user_id, user.pk)
+        self.assertTrue(obj.is_opsec)
+
+    @patch("structuretimers.managers.STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED", True)
+    def test_should_archive_obsolete_timers_when_enabled(self):
+        # given
+        obsolete_timers = [
+            create_timer(date=now() - dt.timedelta(days=2)) for _ in range(3)
+        ]
+        timer = create_timer(date=now())
+        # when
+        result = Timer.objects.delete_obsolete(batch_size=2, pause=0)
+        # then
+        self.assertEqual(result, 3)
+        self.assertSetEqual(set(Timer.objects.values_list("pk", flat=True)), {timer.pk})
+        self.assertSetEqual(
+            set(TimerArchive.objects.values_list("timer_id", flat=True)),
+            {obj.pk for obj in obsolete_timers},
+        )
+
+    @patch("structuretimers.managers.STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED", False)
+    def test_should_not_archive_obsolete_timers_when_disabled(self):
+        # given
+        create_timer(date=now() - dt.timedelta(days=2))
+        # when
+        result = Timer.objects.delete_obsolete(pause=0)
+        # then
+        self.assertEqual(result, 1)
+        self.assertFalse(TimerArchive.objects.exists())
+
+    def test_should_return_archived_timers_visible_to_user(self):
+        # given
+        cache.clear()
+        user = create_user(self.character_1)
+        create_timer(
+            structure_name="unrestricted", visibility=Timer.Visibility.UNRESTRICTED
+        )
+        create_timer(
+            structure_name="own corporation",
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_1,
+        )
+        create_timer(
+            structure_name="other alliance",
+            visibility=Timer.Visibility.ALLIANCE,
+            eve_alliance=self.alliance_3,
+        )
+        create_timer(structure_name="opsec", is_opsec=True)
+        TimerArchive.objects.archive_timers(Timer.objects.all())
+        # when
+        result = TimerArchive.objects.visible_to_user(user)
+        # then
+        self.assertSetEqual(
+            set(result.values_list("structure_name", flat=True)),
+            {"unrestricted", "own corporation"},
+        )
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestTimerBoardRow(LoadTestDataMixin, NoSocketsTestCase):
+    def test_should_create_rows_for_timers(self):
+        # given
+        timer = create_timer(
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_astrahus,
+            structure_name="Big Fort",
+            eve_corporation=self.corporation_1,
+            eve_alliance=self.alliance_1,
+            details_notes="Some notes",
+        )
+        # when
+        result = TimerBoardRow.objects.update_for_timers(Timer.objects.all())
+        # then
+        self.assertEqual(result, 1)
+        obj = TimerBoardRow.objects.get(timer=timer)
+        region = self.system_abune.eve_constellation.eve_region
+        self.assertEqual(obj.date, timer.date)
+        self.assertEqual(obj.last_updated_at, timer.last_updated_at)
+        self.assertEqual(obj.eve_solar_system_name, "Abune")
+        self.assertEqual(obj.eve_region_id, region.id)
+        self.assertEqual(obj.eve_region_name, region.name)
+        self.assertEqual(obj.structure_type_name, "Astrahus")
+        self.assertEqual(obj.structure_name, "Big Fort")
+        self.assertEqual(obj.eve_corporation_id, self.corporation_1.pk)
+        self.assertEqual(obj.eve_corporation_name, self.corporation_1.corporation_name)
+        self.assertEqual(obj.eve_alliance_name, self.alliance_1.alliance_name)
+        self.assertTrue(obj.has_details)
+
+    def test_should_replace_existing_rows(self):
+        # given
+        timer = create_timer(structure_name="Old name")
+        TimerBoardRow.objects.update_for_timers(Timer.objects.all())
+        Timer.objects.filter(pk=timer.pk).update(structure_name="New name")
+        # when
+        TimerBoardRow.objects.update_for_timers(Timer.objects.all())
+        # then
+        self.assertEqual(TimerBoardRow.objects.get().structure_name, "New name")
+
+    def test_should_rebuild_rows_for_all_timers(self):
+        # given
+        timers = [create_timer() for _ in range(3)]
+        TimerBoardRow.objects.update_for_timers(Timer.objects.filter(pk=timers[0].pk))
+        Timer.objects.filter(pk=timers[0].pk).update(structure_name="Changed")
+        # when
+        result = TimerBoardRow.objects.rebuild(batch_size=2)
+        # then
+        self.assertEqual(result, 3)
+        self.assertSetEqual(
+            set(TimerBoardRow.objects.values_list("timer_id", flat=True)),
+            {obj.pk for obj in timers},
+        )
+        obj = TimerBoardRow.objects.get(timer=timers[0])
+        self.assertEqual(obj.structure_name, "Changed")
+
+    @patch("structuretimers.signals.STRUCTURETIMERS_BOARD_ROWS_ENABLED", True)
+    def test_should_update_row_when_timer_is_saved(self):
+        # given
+        timer = create_timer(structure_name="Old name")
+        # when
+        timer.structure_name = "New name"
+        timer.save()
+        # then
+        obj = TimerBoardRow.objects.get(timer=timer)
+        self.assertEqual(obj.structure_name, "New name")
+
+    @patch("structuretimers.signals.STRUCTURETIMERS_BOARD_ROWS_ENABLED", True)
+    def test_should_delete_row_with_timer(self):
+        # given
+        timer = create_timer()
+        # when
+        timer.delete()
+        # then
+        self.assertFalse(TimerBoardRow.objects.exists())
+
+    @patch("structuretimers.signals.STRUCTURETIMERS_BOARD_ROWS_ENABLED", False)
+    def test_should_not_create_rows_when_disabled(self):
+        # when
+        create_timer()
+        # then
+        self.assertFalse(TimerBoardRow.objects.exists())
+
+    @patch("structuretimers.signals.STRUCTURETIMERS_BOARD_ROWS_ENABLED", True)
+    def test_should_update_organization_names_on_rows(self):
+        # given
+        timer = create_timer(
+            eve_corporation=self.corporation_1, eve_alliance=self.alliance_1
+        )
+        corporation = EveCorporationInfo.objects.get(pk=self.corporation_1.pk)
+        alliance = EveAllianceInfo.objects.get(pk=self.alliance_1.pk)
+        # when
+        corporation.corporation_name = "New Corporation"
+        corporation.save()
+        alliance.alliance_name = "New Alliance"
+        alliance.save()
+        # then
+        obj = TimerBoardRow.objects.get(timer=timer)
+        self.assertEqual(obj.eve_corporation_name, "New Corporation")
+        self.assertEqual(obj.eve_alliance_name, "New Alliance")
+
+    @patch("structuretimers.signals.STRUCTURETIMERS_BOARD_ROWS_ENABLED", True)
+    def test_should_update_location_and_type_names_on_rows(self):
+        # given
+        timer = create_timer(
+            eve_solar_system=self.system_abune, structure_type=self.type_astrahus
+        )
+        solar_system = EveSolarSystem.objects.get(pk=self.system_abune.pk)
+        region = EveRegion.objects.get(pk=solar_system.eve_constellation.eve_region_id)
+        structure_type = EveType.objects.get(pk=self.type_astrahus.pk)
+        # when
+        solar_system.name = "New System"
+        solar_system.save()
+        region.name = "New Region"
+        region.save()
+        structure_type.name = "New Type"
+        structure_type.save()
+        # then
+        obj = TimerBoardRow.objects.get(timer=timer)
+        self.assertEqual(obj.eve_solar_system_name, "New System")
+        self.assertEqual(obj.eve_region_name, "New Region")
+        self.assertEqual(obj.structure_type_name, "New Type")
+
+    def test_should_report_complete_when_all_timers_have_rows(self):
+        # given
+        cache.clear()
+        create_timer()
+        TimerBoardRow.objects.rebuild()
+        # when/then
+        self.assertTrue(TimerBoardRow.objects.is_complete())
+
+    def test_should_report_incomplete_when_timers_have_no_rows(self):
+        # given
+        cache.clear()
+        create_timer()
+        # when/then
+        self.assertFalse(TimerBoardRow.objects.is_complete())
+
 
 @patch(MODULE_PATH + ".DiscordWebhook.send_message", spec=True)
 class TestTimerSendNotification(LoadTestDataMixin, NoSocketsTestCase):
@@ -507,18 +1050,95 @@ class TestTimerSendNotification(LoadTestDataMixin, NoSocketsTestCase):
 
         self.assertEqual(mock_send_message.call_count, 1)
 
-    def test_timer_with_options_2(self, mock_send_message):
+    def test_timer_with_options_2(self, mock_send_message):
+        timer = Timer(
+            structure_name="Test",
+            timer_type=Timer.Type.ARMOR,
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_raitaru,
+            date=now(),
+            objective=Timer.Objective.HOSTILE,
+        )
+        timer.send_notification(self.webhook)
+
+        self.assertEqual(mock_send_message.call_count, 1)
+
+
+@patch(MODULE_PATH + ".reverse_absolute", wraps=reverse_absolute)
+class TestTimerNotificationEmbed(LoadTestDataMixin, NoSocketsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_should_render_embed(self, mock_reverse_absolute):
+        # given
+        timer = create_timer(
+            structure_name="Test",
+            timer_type=Timer.Type.ARMOR,
+            objective=Timer.Objective.HOSTILE,
+        )
+        # when
+        embed = timer.notification_embed()
+        # then
+        self.assertEqual(embed["title"], "Raitaru in Abune")
+        self.assertIn('**Raitaru** "Test"', embed["description"])
+        self.assertIn("**hostile**", embed["description"])
+        self.assertIn("thumbnail", embed)
+
+    def test_should_reuse_rendered_embed_for_same_timer(self, mock_reverse_absolute):
+        # given
+        timer = create_timer(structure_name="Test")
+        # when
+        embed_1 = timer.notification_embed()
+        embed_2 = Timer.objects.get(pk=timer.pk).notification_embed()
+        # then
+        self.assertEqual(embed_1, embed_2)
+        self.assertEqual(mock_reverse_absolute.call_count, 1)
+
+    @patch(MODULE_PATH + "._task_calc_timer_distances_for_all_staging_systems", Mock())
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+    def test_should_render_embed_again_when_timer_was_updated(
+        self, mock_reverse_absolute
+    ):
+        # given
+        timer = create_timer(structure_name="Test")
+        timer.notification_embed()
+        # when
+        timer.structure_name = "Changed"
+        timer.save()
+        embed = timer.notification_embed()
+        # then
+        self.assertIn('"Changed"', embed["description"])
+        self.assertEqual(mock_reverse_absolute.call_count, 2)
+
+    def test_should_not_cache_embed_for_unsaved_timer(self, mock_reverse_absolute):
+        # given
         timer = Timer(
-            structure_name="Test",
-            timer_type=Timer.Type.ARMOR,
             eve_solar_system=self.system_abune,
             structure_type=self.type_raitaru,
             date=now(),
-            objective=Timer.Objective.HOSTILE,
         )
-        timer.send_notification(self.webhook)
+        # when
+        timer.notification_embed()
+        timer.notification_embed()
+        # then
+        self.assertEqual(mock_reverse_absolute.call_count, 2)
 
-        self.assertEqual(mock_send_message.call_count, 1)
+    @patch(MODULE_PATH + ".DiscordWebhook.send_message", spec=True)
+    def test_should_send_cached_embed_with_different_content(
+        self, mock_send_message, mock_reverse_absolute
+    ):
+        # given
+        timer = create_timer(structure_name="Test")
+        webhook = create_discord_webhook()
+        # when
+        timer.send_notification(webhook, "first")
+        timer.send_notification(webhook, "second")
+        # then
+        self.assertEqual(mock_reverse_absolute.call_count, 1)
+        contents = [kwargs["content"] for _, kwargs in mock_send_message.call_args_list]
+        self.assertEqual(contents, ["first", "second"])
+        embeds = [kwargs["embeds"] for _, kwargs in mock_send_message.call_args_list]
+        self.assertEqual(embeds[0], embeds[1])
 
 
 @patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
@@ -599,6 +1219,221 @@ class TestTimerQuerySet(LoadTestDataMixin, NoSocketsTestCase):
         )
 
 
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
+class TestTimerQuerySetVisibleToUser(LoadTestDataMixin, NoSocketsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = create_user(self.character_1)
+        self.timer_unrestricted = create_timer(
+            visibility=Timer.Visibility.UNRESTRICTED,
+            eve_corporation=self.corporation_3,
+            eve_alliance=self.alliance_3,
+        )
+        self.timer_own_corporation = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_1,
+        )
+        self.timer_own_alliance = create_timer(
+            visibility=Timer.Visibility.ALLIANCE,
+            eve_corporation=self.corporation_3,
+            eve_alliance=self.alliance_1,
+        )
+        self.timer_other_corporation = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+            eve_alliance=self.alliance_3,
+        )
+        self.timer_other_alliance = create_timer(
+            visibility=Timer.Visibility.ALLIANCE,
+            eve_corporation=self.corporation_3,
+            eve_alliance=self.alliance_3,
+        )
+        self.timer_own = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+            user=self.user,
+        )
+        self.timer_opsec = create_timer(is_opsec=True)
+
+    def _visible_timer_pks(self) -> set:
+        return set(
+            Timer.objects.visible_to_user(self.user).values_list("pk", flat=True)
+        )
+
+    def test_should_return_visible_timers(self):
+        # when
+        result = self._visible_timer_pks()
+        # then
+        self.assertSetEqual(
+            result,
+            {
+                self.timer_unrestricted.pk,
+                self.timer_own_corporation.pk,
+                self.timer_own_alliance.pk,
+                self.timer_own.pk,
+            },
+        )
+
+    def test_should_include_opsec_timers_with_permission(self):
+        # given
+        self.user = add_permission_to_user_by_name(
+            "structuretimers.opsec_access", self.user
+        )
+        # when
+        result = self._visible_timer_pks()
+        # then
+        self.assertIn(self.timer_opsec.pk, result)
+
+    def test_should_need_one_query_with_cached_organizations(self):
+        # given
+        self._visible_timer_pks()
+        # when/then
+        with self.assertNumQueries(1):
+            self._visible_timer_pks()
+
+    def test_should_update_organizations_when_ownership_changed(self):
+        # given
+        self._visible_timer_pks()
+        # when
+        CharacterOwnership.objects.create(
+            user=self.user, character=self.character_3, owner_hash="dummy_3"
+        )
+        result = self._visible_timer_pks()
+        # then
+        self.assertIn(self.timer_other_corporation.pk, result)
+        self.assertIn(self.timer_other_alliance.pk, result)
+
+    def test_should_update_organizations_when_character_changed(self):
+        # given
+        self._visible_timer_pks()
+        # when
+        character = EveCharacter.objects.get(pk=self.character_1.pk)
+        character.corporation_id = self.corporation_3.corporation_id
+        character.alliance_id = self.alliance_3.alliance_id
+        character.save()
+        result = self._visible_timer_pks()
+        # then
+        self.assertIn(self.timer_other_corporation.pk, result)
+        self.assertNotIn(self.timer_own_corporation.pk, result)
+
+    def test_should_update_organizations_when_organization_created(self):
+        # given
+        character = EveCharacter.objects.create(
+            character_id=1099,
+            character_name="New Member",
+            corporation_id=2099,
+            corporation_name="New Corporation",
+            corporation_ticker="NEW",
+            alliance_id=3099,
+            alliance_name="New Alliance",
+            alliance_ticker="NEWA",
+        )
+        CharacterOwnership.objects.create(
+            user=self.user, character=character, owner_hash="dummy_99"
+        )
+        self._visible_timer_pks()
+        # when
+        alliance = EveAllianceInfo.objects.create(
+            alliance_id=3099,
+            alliance_name="New Alliance",
+            alliance_ticker="NEWA",
+            executor_corp_id=2099,
+        )
+        corporation = EveCorporationInfo.objects.create(
+            corporation_id=2099,
+            corporation_name="New Corporation",
+            corporation_ticker="NEW",
+            member_count=1,
+            alliance=alliance,
+        )
+        timer_corporation = create_timer(
+            visibility=Timer.Visibility.CORPORATION, eve_corporation=corporation
+        )
+        timer_alliance = create_timer(
+            visibility=Timer.Visibility.ALLIANCE,
+            eve_corporation=self.corporation_3,
+            eve_alliance=alliance,
+        )
+        result = self._visible_timer_pks()
+        # then
+        self.assertIn(timer_corporation.pk, result)
+        self.assertIn(timer_alliance.pk, result)
+
+
+@skipUnless(connection.vendor == "sqlite", "query plans are checked for SQLite")
+class TestQueryPlans(LoadTestDataMixin, NoSocketsTestCase):
+    """Guard the indexes used by the main queries of the timer board."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = create_user(cls.character_1)
+
+    def assertUsesIndex(self, qs, index_name: str):
+        plan = qs.explain()
+        self.assertIn(f"USING INDEX {index_name}", plan)
+
+    def test_should_use_indexes_for_visible_timers_in_tabs(self):
+        for tab_name, operator in [("current", ">"), ("past", "<")]:
+            with self.subTest(tab_name=tab_name):
+                # when
+                qs = Timer.objects.visible_to_user(self.user).filter_by_tab(
+                    tab_name, max_hours_passed=2
+                )
+                # then
+                plan = qs.explain()
+                self.assertIn(
+                    "USING INDEX timer_visibility_date_idx "
+                    f"(visibility=? AND date{operator}?)",
+                    plan,
+                )
+                self.assertIn(
+                    "USING INDEX timer_corp_visibility_date_idx "
+                    f"(eve_corporation_id=? AND visibility=? AND date{operator}?)",
+                    plan,
+                )
+                self.assertIn(
+                    "USING INDEX timer_alli_visibility_date_idx "
+                    f"(eve_alliance_id=? AND visibility=? AND date{operator}?)",
+                    plan,
+                )
+                self.assertNotIn("SCAN structuretimers_timer", plan)
+
+    def test_should_use_index_for_preliminary_timers(self):
+        # when
+        qs = Timer.objects.visible_to_user(self.user).filter_by_tab(
+            "preliminary", max_hours_passed=2
+        )
+        # then
+        self.assertUsesIndex(qs, "timer_timer_type_date_idx")
+
+    def test_should_use_index_for_obsolete_timers(self):
+        # when
+        qs = Timer.objects.filter(date__lt=now())
+        # then
+        self.assertIn("SEARCH structuretimers_timer USING INDEX", qs.explain())
+
+    def test_should_use_index_for_timers_changed_since(self):
+        # when
+        qs = Timer.objects.filter(last_updated_at__gt=now())
+        # then
+        self.assertUsesIndex(qs, "timer_last_updated_at_idx")
+
+    def test_should_use_index_for_scheduled_notifications_of_rule(self):
+        # when
+        qs = ScheduledNotification.objects.filter(
+            notification_rule_id=1, timer_date__gt=now()
+        )
+        # then
+        self.assertUsesIndex(qs, "schednotif_rule_timer_date_idx")
+
+    def test_should_use_index_for_distances_from_staging_system(self):
+        # when
+        qs = DistancesFromStaging.objects.filter(staging_system_id=1).values("timer_id")
+        # then
+        self.assertIn("USING COVERING INDEX distances_staging_timer_idx", qs.explain())
+
+
 class TestDiscordWebhook(LoadTestDataMixin, TestCase):
     def setUp(self) -> None:
         self.webhook = create_discord_webhook(name="Dummy")
@@ -642,13 +1477,75 @@ class TestDiscordWebhook(LoadTestDataMixin, TestCase):
         }
         self.assertDictEqual(message, expected)
 
+    def test_send_message_with_serialized_embed(self):
+        cache.clear()
+        self.webhook.clear_queue()
+        self.webhook.send_message(embeds=[{"description": "my_description"}])
+        message = json.loads(
+            self.webhook._main_queue.dequeue(), cls=JSONDateTimeDecoder
+        )
+        self.assertDictEqual(message, {"embeds": [{"description": "my_description"}]})
+
     def test_send_message_empty(self):
         cache.clear()
         with self.assertRaises(ValueError):
             self.webhook.send_message()
 
+    def test_should_share_queue_between_instances_of_same_webhook(self):
+        # given
+        webhook = DiscordWebhook.objects.create(
+            name="Other", url="https://www.example.com/other"
+        )
+        webhook.clear_queue()
+        # when
+        webhook.send_message(content="Dummy message")
+        # then
+        webhook_2 = DiscordWebhook.objects.get(pk=webhook.pk)
+        self.assertEqual(webhook_2.queue_size(), 1)
+        self.assertEqual(self.webhook.queue_size(), 0)
+
+
+class TestDiscordWebhookQueuesPerformance(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        webhooks = [create_discord_webhook() for _ in range(50)]
+        NotificationRule.objects.bulk_create(
+            [
+                NotificationRule(
+                    trigger=NotificationRule.Trigger.SCHEDULED_TIME_REACHED,
+                    scheduled_time=NotificationRule.MINUTES_15,
+                    webhook=webhooks[num % len(webhooks)],
+                )
+                for num in range(500)
+            ]
+        )
+
+    @patch("structuretimers.discord._queues", {})
+    @patch("structuretimers.discord.get_redis_client", wraps=get_redis_client)
+    def test_should_not_access_redis_when_loading_rules_with_webhooks(
+        self, mock_get_redis_client
+    ):
+        # when
+        rules = list(NotificationRule.objects.select_related("webhook"))
+        # then
+        self.assertEqual(len(rules), 500)
+        self.assertFalse(mock_get_redis_client.called)
+
+        # when
+        for rule in rules:
+            rule.webhook.queue_size()
+        # then
+        self.assertEqual(mock_get_redis_client.call_count, 50)
+
+        # when
+        mock_get_redis_client.reset_mock()
+        rules = list(NotificationRule.objects.select_related("webhook"))
+        for rule in rules:
+            rule.webhook.queue_size()
+        # then
+        self.assertFalse(mock_get_redis_client.called)
+
 
-@patch(MODULE_PATH + ".sleep", new=lambda x: x)
 @patch(MODULE_PATH + ".DiscordWebhook.send_message_to_webhook", spec=True)
 class TestDiscordWebhookSendQueuedMessages(TestCase):
     def setUp(self) -> None:
@@ -712,6 +1609,75 @@ class TestDiscordWebhookSendQueuedMessages(TestCase):
         self.assertTrue(mock_send_message_to_webhook.called)
         self.assertEqual(self.webhook.queue_size(), 1)
 
+    def test_should_combine_messages_with_embeds(self, mock_send_message_to_webhook):
+        # given
+        mock_send_message_to_webhook.return_value = True
+        for num in range(3):
+            self.webhook.send_message(
+                "content", embeds=[dhooks_lite.Embed(description=f"embed-{num}")]
+            )
+        # when
+        result = self.webhook.send_queued_messages()
+        # then
+        self.assertEqual(result, 3)
+        self.assertEqual(mock_send_message_to_webhook.call_count, 1)
+        (message,), _ = mock_send_message_to_webhook.call_args
+        self.assertEqual(message["content"], "content")
+        self.assertEqual(
+            [embed["description"] for embed in message["embeds"]],
+            ["embed-0", "embed-1", "embed-2"],
+        )
+        self.assertEqual(self.webhook.queue_size(), 0)
+
+    def test_should_not_combine_messages_with_different_content(
+        self, mock_send_message_to_webhook
+    ):
+        # given
+        mock_send_message_to_webhook.return_value = True
+        embed = dhooks_lite.Embed(description="embed")
+        self.webhook.send_message("content-1", embeds=[embed])
+        self.webhook.send_message("content-2", embeds=[embed])
+        self.webhook.send_message("content-2", embeds=[embed])
+        # when
+        result = self.webhook.send_queued_messages()
+        # then
+        self.assertEqual(result, 3)
+        self.assertEqual(mock_send_message_to_webhook.call_count, 2)
+
+    def test_should_not_combine_more_than_10_embeds(self, mock_send_message_to_webhook):
+        # given
+        mock_send_message_to_webhook.return_value = True
+        for num in range(12):
+            self.webhook.send_message(
+                embeds=[dhooks_lite.Embed(description=f"embed-{num}")]
+            )
+        # when
+        result = self.webhook.send_queued_messages()
+        # then
+        self.assertEqual(result, 12)
+        self.assertEqual(mock_send_message_to_webhook.call_count, 2)
+        embed_counts = [
+            len(args[0]["embeds"])
+            for args, _ in mock_send_message_to_webhook.call_args_list
+        ]
+        self.assertEqual(embed_counts, [10, 2])
+
+    def test_should_requeue_all_messages_of_failed_combined_message(
+        self, mock_send_message_to_webhook
+    ):
+        # given
+        mock_send_message_to_webhook.return_value = False
+        for num in range(3):
+            self.webhook.send_message(
+                embeds=[dhooks_lite.Embed(description=f"embed-{num}")]
+            )
+        # when
+        result = self.webhook.send_queued_messages()
+        # then
+        self.assertEqual(result, 0)
+        self.assertEqual(mock_send_message_to_webhook.call_count, 1)
+        self.assertEqual(self.webhook.queue_size(), 3)
+
 
 @patch(MODULE_PATH + ".dhooks_lite.Webhook.execute", spec=True)
 @patch(MODULE_PATH + ".logger", spec=True)
@@ -1201,6 +2167,9 @@ class TestNotificationRuleMultiselectDisplay(NoSocketsTestCase):
 @patch(MODULE_PATH + "._task_calc_staging_system", wraps=_task_calc_staging_system)
 @override_settings(CELERY_ALWAYS_EAGER=True, CELERY_EAGER_PROPAGATES_EXCEPTIONS=True)
 class TestStagingSystem(LoadTestDataMixin, NoSocketsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
     def test_should_calc_distances(self, spy_task_calc_staging_system):
         # given
         timer = create_timer(
@@ -1217,7 +2186,7 @@ class TestStagingSystem(LoadTestDataMixin, NoSocketsTestCase):
         # then
         obj = timer.distances.first()
         self.assertEqual(obj.staging_system, staging_system)
-        self.assertAlmostEqual(obj.light_years, 4.5, delta=0.1)
+        self.assertAlmostEqual(obj.light_years, 6.8, delta=0.1)
         self.assertEqual(obj.jumps, 3)
         self.assertTrue(spy_task_calc_staging_system.called)
 
@@ -1238,10 +2207,29 @@ class TestStagingSystem(LoadTestDataMixin, NoSocketsTestCase):
         # then
         self.assertFalse(spy_task_calc_staging_system.called)
 
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", True)
+    def test_should_not_calc_distances_in_lazy_mode(self, spy_task_calc_staging_system):
+        # given
+        timer = create_timer(
+            structure_name="Test",
+            timer_type=Timer.Type.ARMOR,
+            eve_solar_system=self.system_abune,
+            structure_type=self.type_raitaru,
+            date=dt.datetime(2020, 8, 6, 13, 25, tzinfo=utc),
+        )
+        # when
+        StagingSystem.objects.create(eve_solar_system=self.system_enaluri)
+        # then
+        self.assertFalse(timer.distances.exists())
+        self.assertFalse(spy_task_calc_staging_system.called)
+
 
 @patch(MODULE_PATH + ".EveSolarSystem.jumps_to", spec=True)
 @patch(MODULE_PATH + ".EveSolarSystem.distance_to", spec=True)
 class TestDistancesFromStaging(LoadTestDataMixin, NoSocketsTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+
     def test_should_calculate_distances(self, mock_distance_to, mock_jumps_to):
         # given
         mock_distance_to.return_value = 2.3
@@ -1273,3 +2261,187 @@ class TestDistancesFromStaging(LoadTestDataMixin, NoSocketsTestCase):
         # then
         self.assertIsNone(distances.light_years)
         self.assertIsNone(distances.jumps)
+
+
+class TestDistancesFromStagingManagerCalcLightYears(
+    LoadTestDataMixin, NoSocketsTestCase
+):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.system_jita = EveSolarSystem.objects.get(id=30000142)
+        cls.system_j151645 = EveSolarSystem.objects.get(id=31001303)
+
+    def test_should_create_missing_distances(self):
+        # given
+        timer_1 = create_timer(eve_solar_system=self.system_abune)
+        timer_2 = create_timer(eve_solar_system=self.system_jita)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        # when
+        result = DistancesFromStaging.objects.calc_light_years([staging_system])
+        # then
+        self.assertEqual(result, 2)
+        for timer in [timer_1, timer_2]:
+            obj = DistancesFromStaging.objects.get(
+                timer=timer, staging_system=staging_system
+            )
+            expected = meters_to_ly(
+                self.system_enaluri.distance_to(timer.eve_solar_system)
+            )
+            self.assertAlmostEqual(obj.light_years, expected)
+            self.assertIsNone(obj.jumps)
+
+    def test_should_update_existing_distances(self):
+        # given
+        timer = create_timer(eve_solar_system=self.system_abune)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        create_distances_from_staging(timer, staging_system, light_years=99.0, jumps=3)
+        # when
+        result = DistancesFromStaging.objects.calc_light_years([staging_system])
+        # then
+        self.assertEqual(result, 1)
+        obj = DistancesFromStaging.objects.get(
+            timer=timer, staging_system=staging_system
+        )
+        self.assertAlmostEqual(
+            obj.light_years,
+            meters_to_ly(self.system_enaluri.distance_to(self.system_abune)),
+        )
+        self.assertEqual(obj.jumps, 3)
+
+    def test_should_return_none_for_wormhole_systems(self):
+        # given
+        timer = create_timer(eve_solar_system=self.system_j151645)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        # when
+        DistancesFromStaging.objects.calc_light_years([staging_system])
+        # then
+        obj = DistancesFromStaging.objects.get(
+            timer=timer, staging_system=staging_system
+        )
+        self.assertIsNone(obj.light_years)
+
+    def test_should_return_none_for_staging_system_without_solar_system(self):
+        # given
+        timer = create_timer(eve_solar_system=self.system_abune)
+        staging_system = create_staging_system(eve_solar_system=None)
+        # when
+        DistancesFromStaging.objects.calc_light_years([staging_system])
+        # then
+        obj = DistancesFromStaging.objects.get(
+            timer=timer, staging_system=staging_system
+        )
+        self.assertIsNone(obj.light_years)
+
+    def test_should_calculate_for_given_timers_only(self):
+        # given
+        timer_1 = create_timer(eve_solar_system=self.system_abune)
+        create_timer(eve_solar_system=self.system_jita)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        # when
+        result = DistancesFromStaging.objects.calc_light_years(
+            [staging_system], timers_qs=Timer.objects.filter(pk=timer_1.pk)
+        )
+        # then
+        self.assertEqual(result, 1)
+        self.assertEqual(
+            set(DistancesFromStaging.objects.values_list("timer_id", flat=True)),
+            {timer_1.pk},
+        )
+
+    def test_should_need_constant_number_of_queries(self):
+        # given
+        staging_system_1 = create_staging_system(eve_solar_system=self.system_enaluri)
+        staging_system_2 = create_staging_system(eve_solar_system=self.system_jita)
+        timers = [create_timer(eve_solar_system=self.system_abune) for _ in range(5)]
+        create_distances_from_staging(timers[0], staging_system_1)
+        for _ in range(20):
+            create_timer(eve_solar_system=self.system_jita)
+        # when
+        with self.assertNumQueries(5):
+            result = DistancesFromStaging.objects.calc_light_years(
+                [staging_system_1, staging_system_2]
+            )
+        # then
+        self.assertEqual(result, 50)
+
+    def test_should_do_nothing_when_no_timers(self):
+        # given
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        # when
+        result = DistancesFromStaging.objects.calc_light_years([staging_system])
+        # then
+        self.assertEqual(result, 0)
+
+
+@patch("structuretimers.jumps.jumps_between", spec=True)
+class TestDistancesFromStagingManagerCalcTimers(LoadTestDataMixin, NoSocketsTestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.system_jita = EveSolarSystem.objects.get(id=30000142)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_should_calc_jumps_once_per_solar_system(self, mock_jumps_between):
+        # given
+        mock_jumps_between.return_value = 5
+        timer_1 = create_timer(eve_solar_system=self.system_abune)
+        timer_2 = create_timer(eve_solar_system=self.system_abune)
+        timer_3 = create_timer(eve_solar_system=self.system_jita)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        # when
+        result = DistancesFromStaging.objects.calc_timers_for_staging_system(
+            timers_qs=Timer.objects.all(), staging_system=staging_system
+        )
+        # then
+        self.assertEqual(result, 3)
+        self.assertEqual(mock_jumps_between.call_count, 2)
+        for timer in [timer_1, timer_2, timer_3]:
+            obj = timer.distances.get(staging_system=staging_system)
+            self.assertEqual(obj.jumps, 5)
+            self.assertIsNotNone(obj.light_years)
+
+    def test_should_calc_missing_jumps_only(self, mock_jumps_between):
+        # given
+        mock_jumps_between.return_value = 5
+        timer_1 = create_timer(eve_solar_system=self.system_abune)
+        timer_2 = create_timer(eve_solar_system=self.system_jita)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        create_distances_from_staging(timer_1, staging_system, jumps=3)
+        # when
+        DistancesFromStaging.objects.calc_timers_for_staging_system(
+            timers_qs=Timer.objects.all(), staging_system=staging_system
+        )
+        # then
+        self.assertEqual(timer_1.distances.get().jumps, 3)
+        self.assertEqual(timer_2.distances.get().jumps, 5)
+
+    def test_should_calc_all_jumps_when_forced(self, mock_jumps_between):
+        # given
+        mock_jumps_between.return_value = 5
+        timer = create_timer(eve_solar_system=self.system_abune)
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        create_distances_from_staging(timer, staging_system, jumps=3)
+        # when
+        DistancesFromStaging.objects.calc_timers_for_staging_system(
+            timers_qs=Timer.objects.all(),
+            staging_system=staging_system,
+            force_update=True,
+        )
+        # then
+        self.assertEqual(timer.distances.get().jumps, 5)
+
+    def test_should_not_calc_jumps_without_solar_system(self, mock_jumps_between):
+        # given
+        timer = create_timer(eve_solar_system=self.system_abune)
+        staging_system = create_staging_system(eve_solar_system=None)
+        # when
+        result = DistancesFromStaging.objects.calc_timers_for_staging_system(
+            timers_qs=Timer.objects.all(), staging_system=staging_system
+        )
+        # then
+        self.assertEqual(result, 1)
+        self.assertFalse(mock_jumps_between.called)
+        self.assertIsNone(timer.distances.get().jumps)
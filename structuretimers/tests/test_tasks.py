@@ -9,12 +9,19 @@ from eveuniverse.models import EveSolarSystem, EveType
 
 from structuretimers.models import NotificationRule, ScheduledNotification, Timer
 from structuretimers.tasks import (
+    DISPATCHER_INTERVAL,
+    _dispatch_scheduled_notifications,
+    _lock_webhook,
+    calc_staging_system,
     calc_timer_distances_for_all_staging_systems,
+    calc_timers_distances_for_staging_system,
+    dispatch_scheduled_notifications,
     housekeeping,
     notify_about_new_timer,
     schedule_notifications_for_rule,
     schedule_notifications_for_timer,
     send_messages_for_webhook,
+    send_messages_for_webhooks,
     send_scheduled_notification,
 )
 
@@ -23,6 +30,7 @@ from .testdata.factory import (
     create_notification_rule,
     create_scheduled_notification,
     create_staging_system,
+    create_stargates,
     create_timer,
 )
 from .testdata.fixtures import LoadTestDataMixin
@@ -68,6 +76,56 @@ class TestSendMessagesForWebhook(TestCaseBase):
         self.assertEqual(mock_logger.error.call_count, 0)
 
 
+@patch(MODULE_PATH + ".DiscordWebhook.send_queued_messages", spec=True)
+class TestSendMessagesForWebhooks(TestCaseBase):
+    def test_should_send_messages_for_all_enabled_webhooks(
+        self, mock_send_queued_messages
+    ):
+        # given
+        webhook_2 = create_discord_webhook(name="Other", url="http://www.other.com")
+        webhook_3 = create_discord_webhook(
+            name="Disabled", url="http://www.disabled.com", is_enabled=False
+        )
+        mock_send_queued_messages.return_value = 1
+        # when
+        send_messages_for_webhooks([self.webhook.pk, webhook_2.pk, webhook_3.pk])
+        # then
+        self.assertEqual(mock_send_queued_messages.call_count, 2)
+
+    def test_should_skip_webhooks_which_are_already_being_sent(
+        self, mock_send_queued_messages
+    ):
+        # given
+        webhook_2 = create_discord_webhook(name="Other", url="http://www.other.com")
+        mock_send_queued_messages.return_value = 1
+        lock_key = _lock_webhook(webhook_2.pk)
+        # when
+        try:
+            send_messages_for_webhooks([self.webhook.pk, webhook_2.pk])
+        finally:
+            send_messages_for_webhook.once_backend.clear_lock(lock_key)
+        # then
+        self.assertEqual(mock_send_queued_messages.call_count, 1)
+
+    def test_should_release_webhook_locks_after_sending(
+        self, mock_send_queued_messages
+    ):
+        # given
+        mock_send_queued_messages.return_value = 1
+        # when
+        send_messages_for_webhooks([self.webhook.pk])
+        # then
+        lock_key = _lock_webhook(self.webhook.pk)
+        self.assertIsNotNone(lock_key)
+        send_messages_for_webhook.once_backend.clear_lock(lock_key)
+
+    def test_should_do_nothing_when_no_webhooks(self, mock_send_queued_messages):
+        # when
+        send_messages_for_webhooks([])
+        # then
+        self.assertFalse(mock_send_queued_messages.called)
+
+
 @patch(MODULE_PATH + ".notify_about_new_timer", spec=True)
 @patch(MODULE_PATH + ".send_scheduled_notification", spec=True)
 class TestScheduleNotificationForTimer(TestCaseBase):
@@ -133,11 +191,13 @@ class TestScheduleNotificationForTimer(TestCaseBase):
         when called for timer
         then send new notification
         """
-        self.rule.is_enabled = False
-        self.rule.save()
-        rule = create_notification_rule(
-            trigger=NotificationRule.Trigger.NEW_TIMER_CREATED, webhook=self.webhook
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rule.is_enabled = False
+            self.rule.save()
+            rule = create_notification_rule(
+                trigger=NotificationRule.Trigger.NEW_TIMER_CREATED,
+                webhook=self.webhook,
+            )
         schedule_notifications_for_timer(timer_pk=self.timer.pk, is_new=True)
 
         self.assertTrue(mock_send_notification_for_timer.apply_async.called)
@@ -226,6 +286,209 @@ class TestScheduleNotificationForRule(TestCaseBase):
         # then
         self.assertFalse(mock_send_notification.apply_async.called)
 
+    def test_should_schedule_notifications_for_many_timers_in_bulk(
+        self, mock_send_notification
+    ):
+        # given
+        for minutes in range(60, 90):
+            create_timer(date=now() + dt.timedelta(minutes=minutes))
+        create_timer(date=now() - dt.timedelta(minutes=5))
+        # when
+        with self.assertNumQueries(12):
+            schedule_notifications_for_rule(self.rule.pk)
+        # then
+        self.assertEqual(self.rule.scheduled_notifications.count(), 31)
+        self.assertEqual(mock_send_notification.apply_async.call_count, 31)
+        for _, kwargs in mock_send_notification.apply_async.call_args_list:
+            obj = ScheduledNotification.objects.get(
+                pk=kwargs["kwargs"]["scheduled_notification_pk"]
+            )
+            self.assertEqual(kwargs["task_id"], obj.celery_task_id)
+            self.assertEqual(kwargs["eta"], obj.notification_date)
+            self.assertEqual(
+                obj.notification_date,
+                obj.timer.date - dt.timedelta(minutes=self.rule.scheduled_time),
+            )
+
+    def test_should_replace_outdated_notification_of_rescheduled_timer(
+        self, mock_send_notification
+    ):
+        # given
+        notification_old = create_scheduled_notification(
+            timer=self.timer,
+            notification_rule=self.rule,
+            timer_date=now() - dt.timedelta(hours=1),
+            notification_date=now() - dt.timedelta(hours=2),
+        )
+        # when
+        schedule_notifications_for_rule(self.rule.pk)
+        # then
+        self.assertFalse(
+            ScheduledNotification.objects.filter(pk=notification_old.pk).exists()
+        )
+        obj = self.timer.scheduled_notifications.get(notification_rule=self.rule)
+        self.assertEqual(obj.timer_date, self.timer.date)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.current_time = now()
+
+    def now(self):
+        return self.current_time
+
+    def sleep(self, seconds: float) -> None:
+        self.current_time += dt.timedelta(seconds=seconds)
+
+
+@patch(MODULE_PATH + ".send_messages_for_webhooks", spec=True)
+class TestDispatchScheduledNotifications(TestCaseBase):
+    def setUp(self) -> None:
+        super().setUp()
+        ScheduledNotification.objects.all().delete()
+        self.clock = FakeClock()
+
+    def _dispatch(self, duration: int = 60, poll_interval: int = 10) -> int:
+        with patch(MODULE_PATH + ".now", self.clock.now), patch(
+            MODULE_PATH + ".sleep", self.clock.sleep
+        ):
+            return _dispatch_scheduled_notifications(
+                duration=duration, poll_interval=poll_interval
+            )
+
+    def _create_scheduled_notification(self, seconds: int) -> ScheduledNotification:
+        return create_scheduled_notification(
+            timer=self.timer,
+            notification_rule=create_notification_rule(webhook=self.webhook),
+            timer_date=self.timer.date,
+            notification_date=self.clock.now() + dt.timedelta(seconds=seconds),
+            celery_task_id="",
+        )
+
+    def test_should_send_notifications_when_due(self, mock_send_messages_for_webhooks):
+        # given
+        overdue = self._create_scheduled_notification(seconds=-30)
+        due_soon = self._create_scheduled_notification(seconds=30)
+        due_later = self._create_scheduled_notification(seconds=300)
+        started = self.clock.now()
+        # when
+        result = self._dispatch()
+        # then
+        self.assertEqual(result, 2)
+        self.assertEqual(mock_send_messages_for_webhooks.apply_async.call_count, 2)
+        _, kwargs = mock_send_messages_for_webhooks.apply_async.call_args
+        self.assertEqual(kwargs["args"], [[self.webhook.pk]])
+        self.assertFalse(ScheduledNotification.objects.filter(pk=overdue.pk).exists())
+        self.assertFalse(ScheduledNotification.objects.filter(pk=due_soon.pk).exists())
+        self.assertTrue(ScheduledNotification.objects.filter(pk=due_later.pk).exists())
+        self.assertGreaterEqual(self.clock.now() - started, dt.timedelta(seconds=60))
+
+    def test_should_send_notifications_added_while_running(
+        self, mock_send_messages_for_webhooks
+    ):
+        # given
+        clock_sleep = self.clock.sleep
+        added = []
+
+        def sleep_and_add_notification(seconds):
+            clock_sleep(seconds)
+            if not added:
+                added.append(self._create_scheduled_notification(seconds=15))
+
+        self.clock.sleep = sleep_and_add_notification
+        # when
+        result = self._dispatch()
+        # then
+        self.assertEqual(result, 1)
+        self.assertFalse(ScheduledNotification.objects.filter(pk=added[0].pk).exists())
+
+    def test_should_not_send_outdated_notifications(
+        self, mock_send_messages_for_webhooks
+    ):
+        # given
+        self.timer.date = now() - dt.timedelta(minutes=5)
+        self.timer.save()
+        obj = self._create_scheduled_notification(seconds=-30)
+        # when
+        result = self._dispatch(duration=0)
+        # then
+        self.assertEqual(result, 0)
+        self.assertFalse(mock_send_messages_for_webhooks.apply_async.called)
+        self.assertFalse(ScheduledNotification.objects.filter(pk=obj.pk).exists())
+
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED", True)
+    def test_should_dispatch_on_consecutive_beats(
+        self, mock_send_messages_for_webhooks
+    ):
+        # given
+        started = self.clock.now()
+        interval = dt.timedelta(seconds=DISPATCHER_INTERVAL)
+        first = self._create_scheduled_notification(seconds=30)
+        between = self._create_scheduled_notification(seconds=DISPATCHER_INTERVAL - 5)
+        second = self._create_scheduled_notification(seconds=DISPATCHER_INTERVAL + 30)
+        lock_key = dispatch_scheduled_notifications.get_key()
+        once_backend = dispatch_scheduled_notifications.once_backend
+        sent_pks = []
+        for beat in range(2):
+            with self.subTest(beat=beat):
+                # when
+                self.clock.current_time = started + beat * interval
+                once_backend.raise_or_lock(lock_key, timeout=60)
+                with patch(MODULE_PATH + ".now", self.clock.now), patch(
+                    MODULE_PATH + ".sleep", self.clock.sleep
+                ):
+                    dispatch_scheduled_notifications()
+                # then
+                self.assertLess(self.clock.now(), started + (beat + 1) * interval)
+                once_backend.clear_lock(lock_key)
+                sent_pks.append(
+                    {first.pk, between.pk, second.pk}
+                    - set(ScheduledNotification.objects.values_list("pk", flat=True))
+                )
+        self.assertEqual(sent_pks, [{first.pk}, {first.pk, between.pk, second.pk}])
+
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED", False)
+    @patch(MODULE_PATH + "._dispatch_scheduled_notifications")
+    def test_should_do_nothing_when_disabled(
+        self, mock_dispatch, mock_send_messages_for_webhooks
+    ):
+        dispatch_scheduled_notifications()
+        self.assertFalse(mock_dispatch.called)
+
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED", True)
+    @patch(MODULE_PATH + "._dispatch_scheduled_notifications")
+    def test_should_dispatch_when_enabled(
+        self, mock_dispatch, mock_send_messages_for_webhooks
+    ):
+        mock_dispatch.return_value = 0
+        dispatch_scheduled_notifications()
+        self.assertTrue(mock_dispatch.called)
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_DISPATCHER_ENABLED", True)
+@patch(MODULE_PATH + ".notify_about_new_timer", spec=True)
+@patch(MODULE_PATH + ".send_scheduled_notification", spec=True)
+class TestScheduleNotificationsWithDispatcher(TestCaseBase):
+    def test_should_not_create_tasks_for_timer(
+        self, mock_send_notification, mock_notify_about_new_timer
+    ):
+        # when
+        schedule_notifications_for_timer(timer_pk=self.timer.pk)
+        # then
+        self.assertFalse(mock_send_notification.apply_async.called)
+        obj = self.timer.scheduled_notifications.get(notification_rule=self.rule)
+        self.assertEqual(obj.celery_task_id, "")
+
+    def test_should_not_create_tasks_for_rule(
+        self, mock_send_notification, mock_notify_about_new_timer
+    ):
+        # when
+        schedule_notifications_for_rule(self.rule.pk)
+        # then
+        self.assertFalse(mock_send_notification.apply_async.called)
+        obj = self.timer.scheduled_notifications.get(notification_rule=self.rule)
+        self.assertEqual(obj.celery_task_id, "")
+
 
 @patch("structuretimers.models.STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
 @patch(MODULE_PATH + ".send_messages_for_webhook", spec=True)
@@ -457,15 +720,20 @@ class TestSendNotificationForTimer(TestCaseBase):
         self.assertFalse(mock_send_messages_for_webhook.apply_async.called)
 
 
+@patch(MODULE_PATH + ".DeletedTimer.objects.delete_obsolete", spec=True)
 @patch(MODULE_PATH + ".Timer.objects.delete_obsolete", spec=True)
 class TestHousekeeping(TestCase):
-    def test_should_run_housekeeping(self, mock_delete_obsolete):
+    def test_should_run_housekeeping(
+        self, mock_delete_obsolete, mock_delete_obsolete_deleted_timers
+    ):
         # given
         mock_delete_obsolete.return_value = 1
+        mock_delete_obsolete_deleted_timers.return_value = 1
         # when
         housekeeping()
         # then
         self.assertTrue(mock_delete_obsolete.called)
+        self.assertTrue(mock_delete_obsolete_deleted_timers.called)
 
 
 @patch(MODULE_PATH + ".calc_timer_distances_for_staging_system", spec=True)
@@ -488,3 +756,102 @@ class TestTimerDistancesForAllStagingSystems(TestCase):
         self.assertEqual(
             mock_calc_timer_distances_for_staging_system.apply_async.call_count, 1
         )
+
+    @patch(MODULE_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", True)
+    def test_should_only_recalc_existing_distances_in_lazy_mode(
+        self, mock_calc_timer_distances_for_staging_system
+    ):
+        # given
+        load_eveuniverse()
+        timer = create_timer(
+            structure_name="Test_1",
+            eve_solar_system=EveSolarSystem.objects.get(name="Abune"),
+            structure_type=EveType.objects.get(name="Astrahus"),
+            date=now() + dt.timedelta(minutes=30),
+        )
+        staging_system = create_staging_system(light_years=10)
+        create_staging_system(eve_solar_system=EveSolarSystem.objects.get(name="Abune"))
+        # when
+        calc_timer_distances_for_all_staging_systems(timer.pk)
+        # then
+        mock_apply_async = mock_calc_timer_distances_for_staging_system.apply_async
+        self.assertEqual(mock_apply_async.call_count, 1)
+        _, kwargs = mock_apply_async.call_args
+        self.assertEqual(kwargs["kwargs"]["staging_system_pk"], staging_system.pk)
+
+
+@patch(MODULE_PATH + ".STRUCTURETIMERS_DISTANCES_BATCH_SIZE", 2)
+@patch(MODULE_PATH + ".calc_timers_distances_for_staging_system", spec=True)
+class TestCalcStagingSystem(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        load_eveuniverse()
+
+    def test_should_start_tasks_for_chunks_of_timers(
+        self, mock_calc_timers_distances_for_staging_system
+    ):
+        # given
+        timers = [
+            create_timer(date=now() + dt.timedelta(days=days)) for days in range(5)
+        ]
+        staging_system = create_staging_system()
+        # when
+        calc_staging_system(staging_system.pk, force_update=True)
+        # then
+        calls = mock_calc_timers_distances_for_staging_system.delay.call_args_list
+        self.assertEqual(len(calls), 3)
+        chunks = [kwargs["timer_pks"] for _, kwargs in calls]
+        self.assertEqual(
+            chunks,
+            [
+                [timers[4].pk, timers[3].pk],
+                [timers[2].pk, timers[1].pk],
+                [timers[0].pk],
+            ],
+        )
+        _, kwargs = calls[2]
+        self.assertEqual(kwargs["staging_system_pk"], staging_system.pk)
+        self.assertTrue(kwargs["force_update"])
+        self.assertEqual(kwargs["chunk_number"], 3)
+        self.assertEqual(kwargs["chunks_total"], 3)
+
+    def test_should_not_start_tasks_when_no_timers(
+        self, mock_calc_timers_distances_for_staging_system
+    ):
+        # given
+        staging_system = create_staging_system()
+        # when
+        calc_staging_system(staging_system.pk)
+        # then
+        self.assertFalse(mock_calc_timers_distances_for_staging_system.delay.called)
+
+
+@patch(MODULE_PATH + ".retry_task_if_esi_is_down", lambda self: None)
+class TestCalcTimersDistancesForStagingSystem(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        load_eveuniverse()
+
+    def test_should_calc_distances_for_timers(self):
+        # given
+        abune = EveSolarSystem.objects.get(name="Abune")
+        enaluri = EveSolarSystem.objects.get(name="Enaluri")
+        jita = EveSolarSystem.objects.get(name="Jita")
+        create_stargates(enaluri, jita, abune)
+        timer_1 = create_timer(eve_solar_system=abune)
+        timer_2 = create_timer(eve_solar_system=jita)
+        timer_3 = create_timer(eve_solar_system=jita)
+        staging_system = create_staging_system(eve_solar_system=enaluri)
+        # when
+        calc_timers_distances_for_staging_system(
+            timer_pks=[timer_1.pk, timer_2.pk], staging_system_pk=staging_system.pk
+        )
+        # then
+        obj = timer_1.distances.get(staging_system=staging_system)
+        self.assertEqual(obj.jumps, 2)
+        self.assertIsNotNone(obj.light_years)
+        obj = timer_2.distances.get(staging_system=staging_system)
+        self.assertEqual(obj.jumps, 1)
+        self.assertFalse(timer_3.distances.exists())
@@ -3,9 +3,14 @@ from typing import Optional
 from unittest.mock import Mock, patch
 
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils.timezone import now
+from eveuniverse.models import EveStargate
 
 from app_utils.testing import (
     create_user_from_evecharacter,
@@ -13,13 +18,28 @@ from app_utils.testing import (
     json_response_to_python,
 )
 
-from structuretimers.models import Timer
+from structuretimers.jumps import invalidate_jump_graph
+from structuretimers.models import (
+    DeletedTimer,
+    DistancesFromStaging,
+    Timer,
+    TimerArchive,
+    TimerBoardRow,
+)
+from structuretimers.views import MAX_HOURS_PASSED, TimerEventsView
 
-from .testdata.factory import create_staging_system, create_timer, create_user
+from .testdata.factory import (
+    create_distances_from_staging,
+    create_staging_system,
+    create_stargates,
+    create_timer,
+    create_user,
+)
 from .testdata.fixtures import LoadTestDataMixin
 from .utils import add_permission_to_user_by_name
 
 MODELS_PATH = "structuretimers.models"
+VIEWS_PATH = "structuretimers.views"
 
 
 @patch(MODELS_PATH + ".STRUCTURETIMERS_NOTIFICATIONS_ENABLED", False)
@@ -446,6 +466,817 @@ class TestListData(TestViewBase):
         self.assertIsNone(obj["distance_jumps"])
 
 
+def datatables_params(columns, order=None, start=0, length=10, search="", **kwargs):
+    """Return query parameters as sent by DataTables in server-side mode."""
+    params = {"draw": "1", "start": start, "length": length, "search[value]": search}
+    for index, column in enumerate(columns):
+        params[f"columns[{index}][data]"] = column
+        params[f"columns[{index}][search][value]"] = kwargs.get(column, "")
+        params[f"columns[{index}][search][regex]"] = "true"
+    for index, (column, direction) in enumerate(order or []):
+        params[f"order[{index}][column]"] = columns.index(column)
+        params[f"order[{index}][dir]"] = direction
+    return params
+
+
+class TestListDataServerSide(TestViewBase):
+    COLUMNS = ["date", "distance", "system_name", "structure_type_name", "owner_name"]
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+
+    def _get_page(self, tab_name: str = "past", query: str = "", **kwargs) -> dict:
+        response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=[tab_name]) + query,
+            data=datatables_params(self.COLUMNS, **kwargs),
+        )
+        self.assertEqual(response.status_code, 200)
+        return json_response_to_python(response)
+
+    def test_should_return_one_page(self):
+        # when
+        result = self._get_page(order=[("date", "asc")], length=1)
+        # then
+        self.assertEqual(result["draw"], 1)
+        self.assertEqual(result["recordsTotal"], 2)
+        self.assertEqual(result["recordsFiltered"], 2)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_2.id])
+
+    def test_should_return_next_page(self):
+        # when
+        result = self._get_page(order=[("date", "asc")], start=1, length=1)
+        # then
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_3.id])
+
+    def test_should_return_all_rows(self):
+        # when
+        result = self._get_page(order=[("date", "asc")], length=-1)
+        # then
+        self.assertEqual(len(result["data"]), 2)
+
+    def test_should_return_at_most_max_page_length_rows_for_all_rows(self):
+        # when
+        with patch(VIEWS_PATH + ".MAX_PAGE_LENGTH", 1):
+            result = self._get_page(order=[("date", "asc")], length=-1)
+        # then
+        self.assertEqual(result["recordsFiltered"], 2)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_2.id])
+
+    def test_should_filter_by_column(self):
+        # when
+        result = self._get_page(system_name="^Enaluri$")
+        # then
+        self.assertEqual(result["recordsTotal"], 2)
+        self.assertEqual(result["recordsFiltered"], 1)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_3.id])
+
+    def test_should_filter_by_owner(self):
+        # when
+        result = self._get_page(
+            tab_name="current", owner_name=r"^Big\ Boss$", length=-1
+        )
+        # then
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_1.id])
+
+    def test_should_search_all_columns(self):
+        # when
+        result = self._get_page(search="raitaru")
+        # then
+        self.assertEqual(result["recordsFiltered"], 1)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_2.id])
+
+    def test_should_order_by_distance(self):
+        # given
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        create_distances_from_staging(self.timer_2, staging_system, light_years=5.0)
+        create_distances_from_staging(self.timer_3, staging_system, light_years=0.0)
+        # when
+        result = self._get_page(
+            query=f"?staging={staging_system.pk}", order=[("distance", "desc")]
+        )
+        # then
+        self.assertEqual(
+            [obj["id"] for obj in result["data"]], [self.timer_2.id, self.timer_3.id]
+        )
+
+    def test_should_render_constant_number_of_timers(self):
+        # given
+        for _ in range(20):
+            create_timer(date=now() - timedelta(hours=8))
+        # when
+        result = self._get_page(order=[("date", "asc")], length=10)
+        # then
+        self.assertEqual(result["recordsTotal"], 22)
+        self.assertEqual(len(result["data"]), 10)
+
+
+class TestListDataCompact(TestViewBase):
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+
+    def _get_timer_list_data(self, tab_name: str = "current", **params):
+        response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=[tab_name]),
+            data={"format": "compact", **params},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_should_return_raw_values_with_lookups(self):
+        # given
+        staging_system = create_staging_system(
+            eve_solar_system=self.system_enaluri, light_years=1.2, jumps=3
+        )
+        # when
+        response = self._get_timer_list_data(staging=staging_system.pk)
+        # then
+        result = json_response_to_python(response)
+        timers = {obj["id"]: obj for obj in result["data"]}
+        self.assertSetEqual(set(timers.keys()), {self.timer_1.id})
+        obj = timers[self.timer_1.id]
+        self.assertEqual(obj["solar_system_id"], self.system_abune.id)
+        self.assertEqual(obj["structure_type_id"], self.type_astrahus.id)
+        self.assertEqual(obj["timer_type"], self.timer_1.timer_type)
+        self.assertEqual(obj["objective"], self.timer_1.objective)
+        self.assertEqual(obj["owner_name"], "Big Boss")
+        self.assertEqual(obj["user_id"], self.user_1.pk)
+        self.assertTrue(obj["has_details"])
+        self.assertTrue(obj["has_distances"])
+        self.assertEqual(obj["light_years"], 1.2)
+        self.assertEqual(obj["jumps"], 3)
+        lookups = result["lookups"]
+        solar_system = lookups["solar_systems"][str(self.system_abune.id)]
+        self.assertEqual(solar_system["name"], "Abune")
+        self.assertEqual(lookups["regions"][str(solar_system["region_id"])], "Essence")
+        self.assertEqual(
+            lookups["structure_types"][str(self.type_astrahus.id)]["name"],
+            "Astrahus",
+        )
+        self.assertEqual(
+            lookups["timer_types"][Timer.Type.ARMOR],
+            {"name": "Armor", "label_type": "danger"},
+        )
+        self.assertEqual(
+            lookups["urls"]["edit"], reverse("structuretimers:edit", args=[0])
+        )
+        self.assertEqual(
+            result["permissions"],
+            {"user_id": self.user_1.pk, "can_create": False, "can_manage": False},
+        )
+
+    def test_should_return_page_for_datatables(self):
+        # when
+        response = self._get_timer_list_data(
+            "past", **datatables_params(["date"], order=[("date", "asc")], length=1)
+        )
+        # then
+        result = json_response_to_python(response)
+        self.assertEqual(result["recordsTotal"], 2)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_2.id])
+        self.assertIn("lookups", result)
+        self.assertIn("permissions", result)
+
+    def test_should_be_much_smaller_than_full_response(self):
+        # given
+        for _ in range(20):
+            create_timer(
+                date=now() + timedelta(hours=4),
+                eve_solar_system=self.system_abune,
+                structure_type=self.type_astrahus,
+            )
+        # when
+        compact_response = self._get_timer_list_data()
+        full_response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=["current"])
+        )
+        # then
+        self.assertLess(len(compact_response.content) * 2, len(full_response.content))
+
+
+class TestListDataConditional(TestViewBase):
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+
+    def _get_timer_list_data(self, tab_name: str = "current", etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(
+            reverse("structuretimers:timer_list_data", args=[tab_name]),
+            data={"format": "compact", **params},
+            **headers,
+        )
+
+    def test_should_return_version_headers(self):
+        # when
+        response = self._get_timer_list_data()
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header("ETag"))
+        self.assertTrue(response.has_header("Last-Modified"))
+        self.assertIn("private", response["Cache-Control"])
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_should_return_304_without_building_payload_when_unchanged(self):
+        # given
+        etag = self._get_timer_list_data()["ETag"]
+        # when
+        with patch(
+            VIEWS_PATH + ".TimerListDataView.get_compact_data"
+        ) as mock_get_compact_data:
+            response = self._get_timer_list_data(etag=etag)
+        # then
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(mock_get_compact_data.called)
+
+    def test_should_ignore_draw_counter_of_datatables(self):
+        # given
+        params = datatables_params(["date"], order=[("date", "asc")])
+        etag = self._get_timer_list_data(**params)["ETag"]
+        # when
+        params["draw"] = 2
+        response = self._get_timer_list_data(etag=etag, **params)
+        # then
+        self.assertEqual(response.status_code, 304)
+
+    def test_should_return_new_payload_when_page_changed(self):
+        # given
+        params = datatables_params(["date"], order=[("date", "asc")])
+        etag = self._get_timer_list_data(**params)["ETag"]
+        # when
+        params["start"] = 10
+        response = self._get_timer_list_data(etag=etag, **params)
+        # then
+        self.assertEqual(response.status_code, 200)
+
+    def test_should_return_new_payload_when_timer_changed(self):
+        # given
+        etag = self._get_timer_list_data()["ETag"]
+        # when
+        timer = Timer.objects.get(pk=self.timer_1.pk)
+        timer.owner_name = "Other Boss"
+        timer.save()
+        response = self._get_timer_list_data(etag=etag)
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_should_return_new_payload_when_timer_added(self):
+        # given
+        etag = self._get_timer_list_data()["ETag"]
+        # when
+        create_timer(date=now() + timedelta(hours=2))
+        response = self._get_timer_list_data(etag=etag)
+        # then
+        self.assertEqual(response.status_code, 200)
+
+    def test_should_return_new_payload_when_timer_deleted(self):
+        # given
+        create_timer(date=now() + timedelta(hours=2))
+        etag = self._get_timer_list_data()["ETag"]
+        # when
+        Timer.objects.get(pk=self.timer_1.pk).delete()
+        response = self._get_timer_list_data(etag=etag)
+        # then
+        self.assertEqual(response.status_code, 200)
+
+    def test_should_return_new_payload_when_distances_changed(self):
+        # given
+        staging_system = create_staging_system(eve_solar_system=self.system_enaluri)
+        etag = self._get_timer_list_data(staging=staging_system.pk)["ETag"]
+        # when
+        create_distances_from_staging(self.timer_1, staging_system)
+        response = self._get_timer_list_data(etag=etag, staging=staging_system.pk)
+        # then
+        self.assertEqual(response.status_code, 200)
+
+    def test_should_return_different_versions_for_users(self):
+        # given
+        etag = self._get_timer_list_data()["ETag"]
+        # when
+        self.client.force_login(self.user_3)
+        response = self._get_timer_list_data(etag=etag)
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class TestListDataDelta(TestViewBase):
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+        Timer.objects.update(last_updated_at=now() - timedelta(hours=1))
+
+    def _get_timer_list_data(self, tab_name: str = "current", **params):
+        response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=[tab_name]),
+            data={"format": "compact", **params},
+        )
+        self.assertEqual(response.status_code, 200)
+        return json_response_to_python(response)
+
+    def _cursor(self, tab_name: str = "current") -> str:
+        since = (now() - timedelta(minutes=30)).isoformat()
+        return self._get_timer_list_data(tab_name, since=since)["cursor"]
+
+    def test_should_return_nothing_when_unchanged(self):
+        # when
+        result = self._get_timer_list_data(since=self._cursor())
+        # then
+        self.assertEqual(result["data"], [])
+        self.assertEqual(result["deleted"], [])
+        self.assertIn("lookups", result)
+
+    def test_should_return_updated_and_created_timers(self):
+        # given
+        cursor = self._cursor()
+        Timer.objects.get(pk=self.timer_1.pk).save()
+        timer = create_timer(date=now() + timedelta(hours=2))
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertSetEqual(
+            {obj["id"] for obj in result["data"]}, {self.timer_1.pk, timer.pk}
+        )
+        self.assertNotEqual(result["cursor"], cursor)
+
+    def test_should_return_deleted_timers(self):
+        # given
+        cursor = self._cursor()
+        timer_pk = self.timer_1.pk
+        Timer.objects.get(pk=timer_pk).delete()
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertEqual(result["data"], [])
+        self.assertEqual(result["deleted"], [timer_pk])
+
+    def test_should_not_return_deleted_timers_the_user_could_not_see(self):
+        # given
+        timer = create_timer(
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+        )
+        cursor = self._cursor()
+        timer.delete()
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertEqual(result["deleted"], [])
+
+    def test_should_return_timers_no_longer_visible_as_deleted(self):
+        # given
+        cursor = self._cursor()
+        timer = Timer.objects.get(pk=self.timer_1.pk)
+        timer.is_opsec = True
+        timer.save()
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertEqual(result["data"], [])
+        self.assertEqual(result["deleted"], [self.timer_1.pk])
+
+    def test_should_return_timers_which_passed_as_deleted_from_current(self):
+        # given
+        timer = create_timer(date=now() - timedelta(hours=MAX_HOURS_PASSED, minutes=1))
+        Timer.objects.filter(pk=timer.pk).update(
+            last_updated_at=now() - timedelta(hours=3)
+        )
+        since = (now() - timedelta(minutes=10)).isoformat()
+        # when
+        result = self._get_timer_list_data(since=since)
+        # then
+        self.assertEqual(result["deleted"], [timer.pk])
+
+    def test_should_not_return_ids_of_timers_the_user_can_not_see(self):
+        # given
+        cursor = self._cursor()
+        create_timer(
+            date=now() - timedelta(hours=1),
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+        )
+        timer_passed = create_timer(
+            date=now() - timedelta(hours=MAX_HOURS_PASSED, minutes=1),
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation=self.corporation_3,
+        )
+        Timer.objects.filter(pk=timer_passed.pk).update(
+            last_updated_at=now() - timedelta(hours=3)
+        )
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertEqual(result["data"], [])
+        self.assertEqual(result["deleted"], [])
+
+    def test_should_not_return_changed_visible_timers_as_deleted(self):
+        # given
+        cursor = self._cursor()
+        timer = Timer.objects.get(pk=self.timer_1.pk)
+        timer.visibility = Timer.Visibility.CORPORATION
+        timer.eve_corporation = self.corporation_1
+        timer.save()
+        # when
+        result = self._get_timer_list_data(since=cursor)
+        # then
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_1.pk])
+        self.assertEqual(result["deleted"], [])
+
+    def test_should_return_timers_which_passed_for_past(self):
+        # given
+        timer = create_timer(date=now() - timedelta(minutes=1))
+        Timer.objects.filter(pk=timer.pk).update(
+            last_updated_at=now() - timedelta(hours=3)
+        )
+        since = (now() - timedelta(minutes=10)).isoformat()
+        # when
+        result = self._get_timer_list_data("past", since=since)
+        # then
+        self.assertEqual([obj["id"] for obj in result["data"]], [timer.pk])
+
+    def test_should_ask_for_reset_when_cursor_is_too_old(self):
+        # given
+        since = (now() - timedelta(days=DeletedTimer.MAX_AGE_DAYS + 1)).isoformat()
+        # when
+        result = self._get_timer_list_data(since=since)
+        # then
+        self.assertTrue(result["reset"])
+        self.assertIn("cursor", result)
+        self.assertNotIn("data", result)
+
+    def test_should_reject_invalid_cursor(self):
+        for since in ["invalid", "2023-01-01T10:00:00", ""]:
+            with self.subTest(since=since):
+                # when
+                response = self.client.get(
+                    reverse("structuretimers:timer_list_data", args=["current"]),
+                    data={"since": since},
+                )
+                # then
+                self.assertEqual(response.status_code, 400)
+
+
+class TestListDataBoardRows(TestViewBase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.client.force_login(self.user_1)
+        self.staging_system = create_staging_system(
+            eve_solar_system=self.system_enaluri, light_years=1.2, jumps=3
+        )
+        TimerBoardRow.objects.rebuild()
+
+    def _get_timer_list_data(self, tab_name: str, board_rows_enabled: bool, **params):
+        with patch(
+            VIEWS_PATH + ".STRUCTURETIMERS_BOARD_ROWS_ENABLED", board_rows_enabled
+        ):
+            response = self.client.get(
+                reverse("structuretimers:timer_list_data", args=[tab_name]),
+                data={"format": "compact", "staging": self.staging_system.pk, **params},
+            )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_should_return_same_timers_as_from_timers(self):
+        for tab_name in ["current", "past", "preliminary"]:
+            with self.subTest(tab_name=tab_name):
+                # when
+                result = json_response_to_python(
+                    self._get_timer_list_data(tab_name, board_rows_enabled=True)
+                )
+                # then
+                expected = json_response_to_python(
+                    self._get_timer_list_data(tab_name, board_rows_enabled=False)
+                )
+                self.assertTrue(result["data"])
+                self.assertEqual(result, expected)
+
+    def test_should_return_same_page_for_datatables_as_from_timers(self):
+        columns = ["date", "distance", "system_name", "region_name", "visibility"]
+        cases = [
+            {"order": [("distance", "desc")]},
+            {"order": [("system_name", "asc")], "search": "enaluri"},
+            {"system_name": "^Abune$"},
+            {"region_name": r"^Essence$", "length": 1},
+        ]
+        for params in cases:
+            with self.subTest(params=params):
+                params = datatables_params(columns, **params)
+                # when
+                result = json_response_to_python(
+                    self._get_timer_list_data("past", board_rows_enabled=True, **params)
+                )
+                # then
+                expected = json_response_to_python(
+                    self._get_timer_list_data(
+                        "past", board_rows_enabled=False, **params
+                    )
+                )
+                self.assertEqual(result, expected)
+
+    def test_should_not_join_related_tables(self):
+        # given
+        self._get_timer_list_data("past", board_rows_enabled=True)
+        # when
+        with CaptureQueriesContext(connection) as context:
+            self._get_timer_list_data("past", board_rows_enabled=True)
+        # then
+        timer_queries = [
+            query["sql"]
+            for query in context.captured_queries
+            if "structuretimers_" in query["sql"]
+        ]
+        self.assertTrue(timer_queries)
+        for sql in timer_queries:
+            self.assertNotIn("eveuniverse_", sql)
+            self.assertNotIn("eveonline_", sql)
+
+    def test_should_read_timers_until_all_timers_have_rows(self):
+        # given
+        TimerBoardRow.objects.filter(timer=self.timer_1).delete()
+        # when
+        result = json_response_to_python(
+            self._get_timer_list_data("current", board_rows_enabled=True)
+        )
+        # then
+        self.assertIn(self.timer_1.pk, [obj["id"] for obj in result["data"]])
+
+    def test_should_use_full_format_from_timers(self):
+        # when
+        with patch(VIEWS_PATH + ".STRUCTURETIMERS_BOARD_ROWS_ENABLED", True):
+            response = self.client.get(
+                reverse("structuretimers:timer_list_data", args=["current"])
+            )
+        # then
+        result = json_response_to_python(response)
+        self.assertEqual([obj["id"] for obj in result], [self.timer_1.id])
+        self.assertIn("Abune", result[0]["location"])
+
+
+class TestListFilterOptions(TestViewBase):
+    def test_should_return_options_for_columns(self):
+        # given
+        self.client.force_login(self.user_1)
+        # when
+        response = self.client.get(
+            reverse("structuretimers:timer_list_filter_options", args=["past"]),
+            data={
+                "columns": "system_name,structure_type_name,timer_type_name,"
+                "opsec_str,invalid"
+            },
+        )
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json_response_to_python(response),
+            {
+                "system_name": ["Abune", "Enaluri"],
+                "structure_type_name": ["Astrahus", "Raitaru"],
+                "timer_type_name": ["Unspecified"],
+                "opsec_str": ["no"],
+            },
+        )
+
+
+@patch(VIEWS_PATH + ".calc_timers_distances_for_staging_system")
+@patch(VIEWS_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", True)
+class TestListDataWithLazyDistances(TestViewBase):
+    def setUp(self) -> None:
+        cache.clear()
+        create_stargates(self.system_enaluri, self.system_abune)
+        self.staging_system = create_staging_system(
+            eve_solar_system=self.system_enaluri
+        )
+        self.client.force_login(self.user_1)
+
+    def _get_timer_list_data(self, tab_name: str = "current") -> dict:
+        response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=[tab_name])
+            + f"?staging={self.staging_system.pk}"
+        )
+        self.assertEqual(response.status_code, 200)
+        return json_response_to_dict(response)
+
+    def test_should_calc_missing_distances(self, mock_calc_task):
+        # when
+        data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertAlmostEqual(obj["distance_light_years"], 6.8, delta=0.1)
+        self.assertEqual(obj["distance_jumps"], 1)
+        self.assertTrue(
+            DistancesFromStaging.objects.filter(
+                timer=self.timer_1, staging_system=self.staging_system
+            ).exists()
+        )
+        self.assertFalse(
+            DistancesFromStaging.objects.filter(timer=self.timer_4).exists()
+        )
+        self.assertFalse(mock_calc_task.delay.called)
+
+    def test_should_not_recalc_existing_distances(self, mock_calc_task):
+        # given
+        create_distances_from_staging(
+            self.timer_1, self.staging_system, light_years=1.2, jumps=3
+        )
+        # when
+        data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertEqual(obj["distance_light_years"], 1.2)
+        self.assertEqual(obj["distance_jumps"], 3)
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS", 0)
+    def test_should_defer_distances_when_time_budget_used_up(self, mock_calc_task):
+        # when
+        data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertIsNone(obj["distance_light_years"])
+        self.assertEqual(mock_calc_task.delay.call_count, 1)
+        _, kwargs = mock_calc_task.delay.call_args
+        self.assertEqual(kwargs["timer_pks"], [self.timer_1.pk])
+        self.assertEqual(kwargs["staging_system_pk"], self.staging_system.pk)
+
+    def test_should_defer_jumps_which_need_esi(self, mock_calc_task):
+        # given
+        EveStargate.objects.all().delete()
+        invalidate_jump_graph()
+        # when
+        with patch(
+            "eveuniverse.models.EveSolarSystem._calc_route_esi", spec=True
+        ) as mock_calc_route_esi:
+            mock_calc_route_esi.side_effect = OSError
+            data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertAlmostEqual(obj["distance_light_years"], 6.8, delta=0.1)
+        self.assertIsNone(obj["distance_jumps"])
+        self.assertFalse(mock_calc_route_esi.called)
+        self.assertEqual(mock_calc_task.delay.call_count, 1)
+        _, kwargs = mock_calc_task.delay.call_args
+        self.assertEqual(kwargs["timer_pks"], [self.timer_1.pk])
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS", 0)
+    def test_should_defer_distances_only_once(self, mock_calc_task):
+        # when
+        self._get_timer_list_data()
+        self._get_timer_list_data()
+        # then
+        self.assertEqual(mock_calc_task.delay.call_count, 1)
+
+    def test_should_not_calc_distances_when_lazy_mode_disabled(self, mock_calc_task):
+        # when
+        with patch(VIEWS_PATH + ".STRUCTURETIMERS_DISTANCES_LAZY_ENABLED", False):
+            data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertIsNone(obj["distance_light_years"])
+        self.assertFalse(DistancesFromStaging.objects.exists())
+
+    def test_should_handle_staging_system_without_solar_system(self, mock_calc_task):
+        # given
+        self.staging_system = create_staging_system(eve_solar_system=None)
+        # when
+        data = self._get_timer_list_data()
+        # then
+        obj = data[self.timer_1.id]
+        self.assertIsNone(obj["distance_light_years"])
+        self.assertFalse(mock_calc_task.delay.called)
+
+
+class TestTimerEvents(TestViewBase):
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True)
+    @patch(VIEWS_PATH + ".stream_timer_events")
+    def test_should_stream_events(self, mock_stream_timer_events):
+        # given
+        mock_stream_timer_events.return_value = iter(["retry: 5000\n\n"])
+        # when
+        response = self.client.get(reverse("structuretimers:timer_events"))
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(b"".join(response.streaming_content), b"retry: 5000\n\n")
+        user = mock_stream_timer_events.call_args[0][0]
+        self.assertEqual(user, self.user_1)
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", False)
+    def test_should_not_exist_when_disabled(self):
+        # given
+        request = RequestFactory().get(reverse("structuretimers:timer_events"))
+        request.user = self.user_1
+        # when/then
+        with self.assertRaises(Http404):
+            TimerEventsView.as_view()(request)
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_LIVE_UPDATES_ENABLED", True)
+    def test_should_show_events_url_on_timer_list(self):
+        # when
+        response = self.client.get(reverse("structuretimers:timer_list"))
+        # then
+        self.assertContains(
+            response,
+            f'data-timerEventsUrl="{reverse("structuretimers:timer_events")}"',
+        )
+
+    def test_should_return_selected_timers_only(self):
+        # when
+        response = self.client.get(
+            reverse("structuretimers:timer_list_data", args=["past"]),
+            data={"format": "compact", "ids": f"{self.timer_2.pk},{self.timer_1.pk}"},
+        )
+        # then
+        result = json_response_to_python(response)
+        self.assertEqual([obj["id"] for obj in result["data"]], [self.timer_2.pk])
+
+
+class TestTimerArchive(TestViewBase):
+    COLUMNS = ["date", "location", "structure_details", "name_owner", "archived_at"]
+
+    def setUp(self) -> None:
+        self.client.force_login(self.user_1)
+        TimerArchive.objects.archive_timers(
+            Timer.objects.filter(pk__in=[self.timer_1.pk, self.timer_3.pk])
+        )
+        TimerArchive.objects.create(
+            timer_id=999,
+            structure_name="Hidden",
+            visibility=Timer.Visibility.CORPORATION,
+            eve_corporation_id=self.corporation_3.pk,
+        )
+
+    def _get_page(self, **kwargs) -> dict:
+        response = self.client.get(
+            reverse("structuretimers:timer_archive_data"),
+            data=datatables_params(self.COLUMNS, **kwargs),
+        )
+        self.assertEqual(response.status_code, 200)
+        return json_response_to_python(response)
+
+    def test_should_show_archive_page(self):
+        # when
+        response = self.client.get(reverse("structuretimers:timer_archive"))
+        # then
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse("structuretimers:timer_archive_data"))
+
+    def test_should_return_archived_timers_visible_to_user(self):
+        # when
+        result = self._get_page(order=[("date", "desc")])
+        # then
+        self.assertEqual(result["draw"], 1)
+        self.assertEqual(result["recordsTotal"], 2)
+        self.assertEqual(result["recordsFiltered"], 2)
+        self.assertListEqual(
+            [obj["id"] for obj in result["data"]],
+            list(
+                TimerArchive.objects.filter(
+                    timer_id__in=[self.timer_1.pk, self.timer_3.pk]
+                )
+                .order_by("-date")
+                .values_list("id", flat=True)
+            ),
+        )
+        self.assertIn("Big Boss", result["data"][0]["name_owner"])
+
+    def test_should_search_archived_timers(self):
+        # when
+        result = self._get_page(search="enaluri")
+        # then
+        self.assertEqual(result["recordsTotal"], 2)
+        self.assertEqual(result["recordsFiltered"], 1)
+        self.assertIn("Enaluri", result["data"][0]["location"])
+
+    def test_should_escape_archived_values(self):
+        # given
+        TimerArchive.objects.create(timer_id=998, owner_name="<b>Evil</b>")
+        # when
+        result = self._get_page(search="evil")
+        # then
+        self.assertIn("&lt;b&gt;Evil&lt;/b&gt;", result["data"][0]["name_owner"])
+
+    def test_should_reject_invalid_request(self):
+        # when
+        response = self.client.get(reverse("structuretimers:timer_archive_data"))
+        # then
+        self.assertEqual(response.status_code, 400)
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED", True)
+    def test_should_show_archive_link_on_timer_list_when_enabled(self):
+        # when
+        response = self.client.get(reverse("structuretimers:timer_list"))
+        # then
+        self.assertContains(response, reverse("structuretimers:timer_archive"))
+
+    @patch(VIEWS_PATH + ".STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED", False)
+    def test_should_not_show_archive_link_on_timer_list_when_disabled(self):
+        # when
+        response = self.client.get(reverse("structuretimers:timer_list"))
+        # then
+        self.assertNotContains(response, reverse("structuretimers:timer_archive"))
+
+
 @patch(MODELS_PATH + "._task_calc_timer_distances_for_all_staging_systems", Mock())
 class TestDetailView(TestViewBase):
     def test_should_return_normal_timer(self):
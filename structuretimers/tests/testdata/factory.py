@@ -3,7 +3,7 @@ from unittest.mock import Mock, patch
 
 from django.contrib.auth.models import User
 from django.utils.timezone import now
-from eveuniverse.models import EveSolarSystem, EveType
+from eveuniverse.models import EveSolarSystem, EveStargate, EveType
 
 from allianceauth.authentication.models import CharacterOwnership
 from allianceauth.eveonline.models import EveCharacter
@@ -80,6 +80,25 @@ def create_timer(light_years=None, jumps=None, enabled_notifications=False, **kw
         return timer
 
 
+def create_stargates(*solar_systems: EveSolarSystem):
+    """Connect the given solar systems in a chain with pairs of stargates."""
+    stargate_type = EveType.objects.first()
+    next_id = (
+        EveStargate.objects.order_by("-id").values_list("id", flat=True).first()
+        or 50000000
+    )
+    for origin, destination in zip(solar_systems, solar_systems[1:]):
+        for system, other in [(origin, destination), (destination, origin)]:
+            next_id += 1
+            EveStargate.objects.create(
+                id=next_id,
+                name=f"Stargate ({other.name})",
+                eve_solar_system=system,
+                destination_eve_solar_system=other,
+                eve_type=stargate_type,
+            )
+
+
 def create_staging_system(light_years=None, jumps=None, **kwargs):
     params = {"eve_solar_system": EveSolarSystem.objects.get(id=30045339)}  # enaluri
     params.update(kwargs)
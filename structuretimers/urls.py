@@ -15,6 +15,18 @@ urlpatterns = [
         views.TimerListDataView.as_view(),
         name="timer_list_data",
     ),
+    path(
+        "list_filter_options/<str:tab_name>",
+        views.TimerListFilterOptionsView.as_view(),
+        name="timer_list_filter_options",
+    ),
+    path("events/", views.TimerEventsView.as_view(), name="timer_events"),
+    path("archive/", views.TimerArchiveView.as_view(), name="timer_archive"),
+    path(
+        "archive_data/",
+        views.TimerArchiveDataView.as_view(),
+        name="timer_archive_data",
+    ),
     path("detail/<str:pk>", views.TimerDetailDataView.as_view(), name="detail"),
     path(
         "select2_solar_systems/",
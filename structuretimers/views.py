@@ -1,14 +1,30 @@
+import hashlib
 import math
 from copy import deepcopy
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from time import perf_counter
+from typing import List, Optional, Tuple
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, FloatField, Max, OuterRef, Q, Subquery, Value
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.utils.html import format_html
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape, format_html
+from django.utils.http import http_date, quote_etag
 from django.utils.safestring import mark_safe
-from django.utils.timezone import now
+from django.utils.timezone import is_aware, now
 from django.utils.translation import gettext as _
 from django.views import View
 from django.views.generic import (
@@ -19,6 +35,7 @@ from django.views.generic import (
     TemplateView,
     UpdateView,
 )
+from eveuniverse.core import eveimageserver
 from eveuniverse.models import EveSolarSystem, EveType
 
 from allianceauth.eveonline.evelinks import dotlan
@@ -33,18 +50,38 @@ from app_utils.views import (
     yesno_str,
 )
 
-from . import __title__
+from . import __title__, __version__
 from .app_settings import (
+    STRUCTURETIMERS_BOARD_ROWS_ENABLED,
     STRUCTURETIMERS_DEFAULT_PAGE_LENGTH,
+    STRUCTURETIMERS_DISTANCES_BATCH_SIZE,
+    STRUCTURETIMERS_DISTANCES_LAZY_ENABLED,
+    STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS,
+    STRUCTURETIMERS_LIVE_UPDATES_ENABLED,
     STRUCTURETIMERS_PAGING_ENABLED,
+    STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED,
 )
 from .constants import EveCategoryId, EveGroupId, EveTypeId
+from .datatables import MAX_PAGE_LENGTH, DataTablesRequest
 from .forms import TimerForm
-from .models import DistancesFromStaging, StagingSystem, Timer
+from .live import stream_timer_events
+from .managers import user_organization_pks
+from .models import (
+    DeletedTimer,
+    DistancesFromStaging,
+    StagingSystem,
+    Timer,
+    TimerArchive,
+    TimerBoardRow,
+)
+from .tasks import calc_timers_distances_for_staging_system
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 DATETIME_FORMAT = "%Y-%m-%d %H:%M"
 MAX_HOURS_PASSED = 2
+LAZY_DISTANCES_BATCH_SIZE = 50
+LAZY_DISTANCES_DEFERRED_TIMEOUT = 120  # seconds
+DELTA_CURSOR_OVERLAP = 5  # seconds
 
 
 class TimerListView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
@@ -80,6 +117,8 @@ class TimerListView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
                 "selected_staging_system": selected_staging_system,
                 "stageing_systems": stageing_systems,
                 "tab": self.request.GET.get("tab", "current"),
+                "live_updates_enabled": STRUCTURETIMERS_LIVE_UPDATES_ENABLED,
+                "archive_enabled": STRUCTURETIMERS_TIMERS_ARCHIVE_ENABLED,
             }
         )
         return context
@@ -93,37 +132,306 @@ class TimerListDataView(
     model = Timer
     permission_required = "structuretimers.basic_access"
 
+    # fields for ordering by columns in server-side processing mode
+    ORDER_FIELDS = {
+        "date": "date",
+        "local_time": "date",
+        "location": "eve_solar_system__name",
+        "distance": "distance_light_years",
+        "structure_details": "structure_type__name",
+        "owner": "objective",
+        "name_objective": "structure_name",
+        "last_updated_at": "last_updated_at",
+        "system_name": "eve_solar_system__name",
+        "region_name": "eve_solar_system__eve_constellation__eve_region__name",
+        "structure_type_name": "structure_type__name",
+        "timer_type_name": "timer_type",
+        "objective_name": "objective",
+        "visibility": "visibility",
+        "owner_name": "owner_name",
+        "opsec_str": "is_opsec",
+    }
+    # fields searched by the global search in server-side processing mode
+    SEARCH_FIELDS = (
+        "eve_solar_system__name",
+        "eve_solar_system__eve_constellation__eve_region__name",
+        "structure_type__name",
+        "structure_name",
+        "owner_name",
+        "location_details",
+    )
+
+    # fields of board rows for fields of timers with related objects
+    BOARD_ROW_FIELDS = {
+        "eve_solar_system__name": "eve_solar_system_name",
+        "eve_solar_system__eve_constellation__eve_region__name": "eve_region_name",
+        "structure_type__name": "structure_type_name",
+    }
+
+    # query parameters not affecting the content of the timer list
+    VERSION_IGNORED_PARAMS = {"_", "draw"}
+
+    def get(self, request, *args, **kwargs):
+        """Respond to conditional requests with 304 when the timer list
+        has not changed since the version known to the client.
+        """
+        etag, last_modified = self._list_version()
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified.timestamp() if last_modified else None,
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response.headers["ETag"] = etag
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def _list_version(self) -> Tuple[str, Optional[datetime]]:
+        """Return ETag and last modified date for the requested timer list.
+
+        The version is calculated with a single aggregate query from the timers
+        visible to the user without loading them.
+        """
+        user = self.request.user
+        try:
+            staging_system_pk = int(self.request.GET.get("staging", ""))
+        except ValueError:
+            staging_system_pk = None
+        timers_qs = self.get_queryset()
+        aggregates = {
+            "timers_count": Count("pk", distinct=True),
+            "passed_count": Count("pk", distinct=True, filter=Q(date__lt=now())),
+            "timers_updated_at": Max("last_updated_at"),
+        }
+        if self._uses_board_rows():
+            result = timers_qs.aggregate(**aggregates)
+            result["distances_updated_at"] = DistancesFromStaging.objects.filter(
+                staging_system_id=staging_system_pk,
+                timer_id__in=timers_qs.values("pk"),
+            ).aggregate(updated_at=Max("updated_at"))["updated_at"]
+        else:
+            result = timers_qs.aggregate(
+                **aggregates,
+                distances_updated_at=Max(
+                    "distances__updated_at",
+                    filter=Q(distances__staging_system_id=staging_system_pk),
+                ),
+            )
+        corporation_pks, alliance_pks = user_organization_pks(user)
+        params = sorted(
+            (key, value)
+            for key, values in self.request.GET.lists()
+            if key not in self.VERSION_IGNORED_PARAMS
+            for value in values
+        )
+        version = (
+            __version__,
+            self.kwargs.get("tab_name"),
+            params,
+            user.pk,
+            sorted(corporation_pks),
+            sorted(alliance_pks),
+            [
+                user.has_perm(f"structuretimers.{name}")
+                for name in ("opsec_access", "create_timer", "manage_timer")
+            ],
+            result["timers_count"],
+            result["passed_count"],
+            result["timers_updated_at"],
+            result["distances_updated_at"],
+        )
+        etag = quote_etag(hashlib.sha256(repr(version).encode("utf-8")).hexdigest())
+        updated_dates = [
+            obj
+            for obj in (result["timers_updated_at"], result["distances_updated_at"])
+            if obj
+        ]
+        return etag, max(updated_dates) if updated_dates else None
+
     def render_to_response(self, context, **response_kwargs):
+        since = self.request.GET.get("since")
+        if since is not None:
+            return self._render_to_delta_response(since, **response_kwargs)
+        datatables_request = DataTablesRequest.from_query_dict(self.request.GET)
+        if datatables_request:
+            return self._render_to_datatables_response(
+                datatables_request, **response_kwargs
+            )
+        if self._is_compact():
+            return JsonResponse(self.get_compact_data(), **response_kwargs)
         return self.render_to_json_response(context, **response_kwargs)
 
+    def _render_to_datatables_response(
+        self, datatables_request: DataTablesRequest, **response_kwargs
+    ):
+        """Render one page of timers for DataTables in server-side processing mode.
+
+        Filtering, ordering and paging are all done by the database,
+        so only the timers of the requested page are rendered.
+        """
+        timers_qs = self.object_list
+        records_total = timers_qs.count()
+        column_filters = (
+            BOARD_ROW_COLUMN_FILTERS
+            if self._uses_board_rows()
+            else TIMER_COLUMN_FILTERS
+        )
+        query = Q()
+        for column, value in datatables_request.column_searches.items():
+            try:
+                column_filter = column_filters[column]
+            except KeyError:
+                continue
+            query &= column_filter(value)
+
+        if datatables_request.search:
+            search_query = Q()
+            for field_name in self.SEARCH_FIELDS:
+                field_name = self._field_name(field_name)
+                search_query |= Q(
+                    **{f"{field_name}__icontains": datatables_request.search}
+                )
+            query &= search_query
+
+        if query:
+            timers_qs = timers_qs.filter(query)
+            records_filtered = timers_qs.count()
+        else:
+            records_filtered = records_total
+        order_by = []
+        for column, is_descending in datatables_request.order:
+            try:
+                field_name = self._field_name(self.ORDER_FIELDS[column])
+            except KeyError:
+                continue
+            if field_name == "distance_light_years":
+                timers_qs = self._annotate_distance_light_years(timers_qs)
+            expression = F(field_name)
+            order_by.append(
+                expression.desc(nulls_last=True)
+                if is_descending
+                else expression.asc(nulls_last=True)
+            )
+
+        order_by.append(F("pk").asc())
+        timers_qs = timers_qs.order_by(*order_by)
+        end = datatables_request.end
+        if end is None:
+            end = datatables_request.start + MAX_PAGE_LENGTH
+        self.object_list = list(timers_qs[datatables_request.start : end])
+        payload = {
+            "draw": datatables_request.draw,
+            "recordsTotal": records_total,
+            "recordsFiltered": records_filtered,
+        }
+        if self._is_compact():
+            payload.update(self.get_compact_data())
+        else:
+            payload["data"] = self.get_data({})
+        return JsonResponse(payload, **response_kwargs)
+
+    def _render_to_delta_response(self, since: str, **response_kwargs):
+        """Render timers of the tab, which changed since a cursor.
+
+        The cursor is returned with every response and passed in again
+        for the next request. Returned are all timers, which were created
+        or updated after the cursor, and the IDs of all timers,
+        which were deleted or have left the tab since.
+        IDs of timers left the tab are only returned
+        when the user can still see them.
+        Clients need to reload the complete list when the response
+        contains reset, because deleted timers are only logged for a while.
+        """
+        cursor = now()
+        try:
+            since_date = parse_datetime(since)
+        except ValueError:
+            since_date = None
+        if not since_date or not is_aware(since_date):
+            return HttpResponseBadRequest("Invalid cursor")
+
+        payload = {"cursor": _format_cursor(cursor)}
+        if since_date < cursor - timedelta(days=DeletedTimer.MAX_AGE_DAYS):
+            payload["reset"] = True
+            return JsonResponse(payload, **response_kwargs)
+
+        # timers saved shortly before the cursor might have been committed later
+        since_date -= timedelta(seconds=DELTA_CURSOR_OVERLAP)
+        changed = Q(last_updated_at__gt=since_date)
+        tab_name = self.kwargs.get("tab_name")
+        if tab_name == "past":
+            changed |= Q(date__gte=since_date, date__lt=cursor)
+        timers_qs = self.object_list
+        self.object_list = list(timers_qs.filter(changed).order_by("pk"))
+        deleted_pks = DeletedTimer.objects.timer_pks_since(
+            since_date, self.request.user
+        )
+        visible_timers_qs = Timer.objects.visible_to_user(self.request.user)
+        deleted_pks.update(
+            visible_timers_qs.filter(last_updated_at__gt=since_date)
+            .exclude(pk__in=timers_qs.values("pk"))
+            .values_list("pk", flat=True)
+        )
+        if tab_name == "current":
+            deadline = timedelta(hours=MAX_HOURS_PASSED)
+            deleted_pks.update(
+                visible_timers_qs.filter(
+                    date__gte=since_date - deadline, date__lt=cursor - deadline
+                ).values_list("pk", flat=True)
+            )
+        deleted_pks.difference_update(obj.pk for obj in self.object_list)
+        payload["deleted"] = sorted(deleted_pks)
+        if self._is_compact():
+            payload.update(self.get_compact_data())
+        else:
+            payload["data"] = self.get_data({})
+        return JsonResponse(payload, **response_kwargs)
+
+    def _annotate_distance_light_years(self, timers_qs):
+        try:
+            staging_system_pk = int(self.request.GET.get("staging", ""))
+        except ValueError:
+            return timers_qs.annotate(distance_light_years=Value(None, FloatField()))
+        distances_qs = DistancesFromStaging.objects.filter(
+            timer=OuterRef("pk"), staging_system_id=staging_system_pk
+        ).values("light_years")[:1]
+        return timers_qs.annotate(distance_light_years=Subquery(distances_qs))
+
     def get_queryset(self):
-        qs = super().get_queryset()
-        timers_qs = qs.visible_to_user(self.request.user)
+        if self._uses_board_rows():
+            timers_qs = TimerBoardRow.objects.visible_to_user(self.request.user)
+        else:
+            timers_qs = (
+                super()
+                .get_queryset()
+                .visible_to_user(self.request.user)
+                .select_related(
+                    "eve_solar_system",
+                    "eve_solar_system__eve_constellation__eve_region",
+                    "structure_type",
+                    "structure_type__eve_group",
+                    "eve_character",
+                    "eve_corporation",
+                    "eve_alliance",
+                )
+            )
         timers_qs = timers_qs.filter_by_tab(
             tab_name=self.kwargs.get("tab_name"), max_hours_passed=MAX_HOURS_PASSED
         )
-        timers_qs = timers_qs.select_related(
-            "eve_solar_system",
-            "eve_solar_system__eve_constellation__eve_region",
-            "structure_type",
-            "structure_type__eve_group",
-            "eve_character",
-            "eve_corporation",
-            "eve_alliance",
-        )
+        timer_pks = self.request.GET.get("ids")
+        if timer_pks is not None:
+            try:
+                timer_pks = [int(pk) for pk in timer_pks.split(",")]
+            except ValueError:
+                timer_pks = []
+            timers_qs = timers_qs.filter(pk__in=timer_pks)
         return timers_qs
 
     def get_data(self, context):
-        staging_system_pk = self.request.GET.get("staging")
-        if staging_system_pk:
-            distances_map = {
-                obj.timer_id: obj
-                for obj in DistancesFromStaging.objects.filter(
-                    staging_system__pk=staging_system_pk
-                ).all()
-            }
-        else:
-            distances_map = dict()
+        distances_map = self._distances_map()
         data = list()
         for timer in self.object_list:
             # location
@@ -277,6 +585,272 @@ class TimerListDataView(
 
         return data
 
+    def get_compact_data(self) -> dict:
+        """Return timers as raw values without any HTML.
+
+        Names and other properties of related objects are returned once
+        in lookups and referenced by ID. The timers are rendered by the client.
+        """
+        user = self.request.user
+        distances_map = self._distances_map()
+        data = []
+        lookups = {
+            "solar_systems": {},
+            "regions": {},
+            "structure_types": {},
+            "corporations": {},
+            "alliances": {},
+        }
+        for timer in self.object_list:
+            related = self._related_values(timer)
+            solar_system_id = related["solar_system_id"]
+            if solar_system_id not in lookups["solar_systems"]:
+                lookups["solar_systems"][solar_system_id] = {
+                    "name": related["solar_system_name"],
+                    "region_id": related["region_id"],
+                    "dotlan_url": dotlan.solar_system_url(related["solar_system_name"]),
+                }
+                lookups["regions"][related["region_id"]] = related["region_name"]
+            structure_type_id = related["structure_type_id"]
+            structure_types = lookups["structure_types"]
+            if structure_type_id and structure_type_id not in structure_types:
+                structure_types[structure_type_id] = {
+                    "name": related["structure_type_name"],
+                    "icon_url": related["structure_type_icon_url"],
+                }
+            if timer.eve_corporation_id:
+                lookups["corporations"][timer.eve_corporation_id] = related[
+                    "corporation_name"
+                ]
+            if timer.eve_alliance_id:
+                lookups["alliances"][timer.eve_alliance_id] = related["alliance_name"]
+            distances = distances_map.get(timer.pk)
+            data.append(
+                {
+                    "id": timer.pk,
+                    "date": timer.date.isoformat() if timer.date else "",
+                    "last_updated_at": timer.last_updated_at.isoformat(),
+                    "solar_system_id": solar_system_id,
+                    "structure_type_id": structure_type_id,
+                    "structure_name": timer.structure_name,
+                    "location_details": timer.location_details,
+                    "owner_name": timer.owner_name,
+                    "timer_type": timer.timer_type,
+                    "objective": timer.objective,
+                    "visibility": timer.visibility,
+                    "corporation_id": timer.eve_corporation_id,
+                    "alliance_id": timer.eve_alliance_id,
+                    "user_id": timer.user_id,
+                    "is_opsec": timer.is_opsec,
+                    "is_important": timer.is_important,
+                    "has_details": related["has_details"],
+                    "has_distances": distances is not None,
+                    "light_years": distances.light_years if distances else None,
+                    "jumps": distances.jumps if distances else None,
+                }
+            )
+
+        label_types = Timer.label_types_for_timer_types()
+        lookups["timer_types"] = {
+            value: {"name": str(label), "label_type": label_types.get(value, "default")}
+            for value, label in Timer.Type.choices
+        }
+        label_types = Timer.label_types_for_objectives()
+        lookups["objectives"] = {
+            value: {"name": str(label), "label_type": label_types.get(value, "default")}
+            for value, label in Timer.Objective.choices
+        }
+        lookups["visibilities"] = {
+            value: str(label) for value, label in Timer.Visibility.choices
+        }
+        lookups["yes_no"] = {"yes": yesno_str(True), "no": yesno_str(False)}
+        lookups["urls"] = {
+            name: reverse(f"structuretimers:{name}", args=[0])
+            for name in ("delete", "edit", "copy")
+        }
+        return {
+            "data": data,
+            "lookups": lookups,
+            "permissions": {
+                "user_id": user.pk,
+                "can_create": user.has_perm("structuretimers.create_timer"),
+                "can_manage": user.has_perm("structuretimers.manage_timer"),
+            },
+        }
+
+    @staticmethod
+    def _related_values(timer) -> dict:
+        """Return values of the related objects of a timer or its board row."""
+        if isinstance(timer, TimerBoardRow):
+            return {
+                "solar_system_id": timer.eve_solar_system_id,
+                "solar_system_name": timer.eve_solar_system_name,
+                "region_id": timer.eve_region_id,
+                "region_name": timer.eve_region_name,
+                "structure_type_id": timer.structure_type_id,
+                "structure_type_name": timer.structure_type_name,
+                "structure_type_icon_url": (
+                    eveimageserver.type_icon_url(timer.structure_type_id, size=64)
+                    if timer.structure_type_id
+                    else ""
+                ),
+                "corporation_name": timer.eve_corporation_name,
+                "alliance_name": timer.eve_alliance_name,
+                "has_details": timer.has_details,
+            }
+
+        solar_system = timer.eve_solar_system
+        region = solar_system.eve_constellation.eve_region
+        structure_type = timer.structure_type
+        return {
+            "solar_system_id": solar_system.id,
+            "solar_system_name": solar_system.name,
+            "region_id": region.id,
+            "region_name": region.name,
+            "structure_type_id": structure_type.id if structure_type else None,
+            "structure_type_name": structure_type.name if structure_type else "",
+            "structure_type_icon_url": (
+                structure_type.icon_url(size=64) if structure_type else ""
+            ),
+            "corporation_name": (
+                timer.eve_corporation.corporation_name
+                if timer.eve_corporation
+                else None
+            ),
+            "alliance_name": (
+                timer.eve_alliance.alliance_name if timer.eve_alliance else None
+            ),
+            "has_details": bool(timer.details_image_url or timer.details_notes),
+        }
+
+    def _is_compact(self) -> bool:
+        return self.request.GET.get("format") == "compact"
+
+    def _uses_board_rows(self) -> bool:
+        """Return True if timers are read from their board rows.
+
+        Board rows are only used for the compact format,
+        because the full format is rendered from timers.
+        Timers are also read directly until all timers have a board row,
+        e.g. right after board rows have been enabled.
+        """
+        if not STRUCTURETIMERS_BOARD_ROWS_ENABLED or not self._is_compact():
+            return False
+        if not hasattr(self, "_board_rows_complete"):
+            self._board_rows_complete = TimerBoardRow.objects.is_complete()
+        return self._board_rows_complete
+
+    def _field_name(self, field_name: str) -> str:
+        """Return name of a field for the current queryset."""
+        if self._uses_board_rows():
+            return self.BOARD_ROW_FIELDS.get(field_name, field_name)
+        return field_name
+
+    def _distances_map(self) -> dict:
+        """Return distances of all listed timers from the selected staging system
+        by timer ID.
+        """
+        staging_system_pk = self.request.GET.get("staging")
+        if not staging_system_pk:
+            return {}
+        timer_pks = [timer.pk for timer in self.object_list]
+        distances_map = self._fetch_distances(staging_system_pk, timer_pks)
+        if STRUCTURETIMERS_DISTANCES_LAZY_ENABLED:
+            missing_timer_pks = [pk for pk in timer_pks if pk not in distances_map]
+            if missing_timer_pks and self._calc_missing_distances(
+                staging_system_pk, missing_timer_pks
+            ):
+                distances_map = self._fetch_distances(staging_system_pk, timer_pks)
+        return distances_map
+
+    @staticmethod
+    def _fetch_distances(staging_system_pk, timer_pks: List[int]) -> dict:
+        return {
+            obj.timer_id: obj
+            for obj in DistancesFromStaging.objects.filter(
+                staging_system__pk=staging_system_pk, timer_id__in=timer_pks
+            )
+        }
+
+    def _calc_missing_distances(self, staging_system_pk, timer_pks: List[int]) -> int:
+        """Calculate missing distances from a staging system for timers
+        in batches until the time budget is used up.
+
+        Jumps are only calculated from the local stargate graph.
+        Calculating the remaining distances and jumps which need ESI
+        is deferred to tasks.
+
+        Returns number of timers distances were calculated for.
+        """
+        try:
+            staging_system = StagingSystem.objects.select_related(
+                "eve_solar_system"
+            ).get(pk=staging_system_pk, eve_solar_system__isnull=False)
+        except (StagingSystem.DoesNotExist, ValueError):
+            return 0
+
+        time_budget = STRUCTURETIMERS_DISTANCES_LAZY_TIME_BUDGET_MS / 1000
+        started = perf_counter()
+        count = 0
+        remaining_pks = list(timer_pks)
+        calculated_pks = []
+        while remaining_pks and perf_counter() - started < time_budget:
+            chunk = remaining_pks[:LAZY_DISTANCES_BATCH_SIZE]
+            remaining_pks = remaining_pks[LAZY_DISTANCES_BATCH_SIZE:]
+            count += DistancesFromStaging.objects.calc_timers_for_staging_system(
+                timers_qs=Timer.objects.filter(pk__in=chunk),
+                staging_system=staging_system,
+                batch_size=LAZY_DISTANCES_BATCH_SIZE,
+                local_only=True,
+            )
+            calculated_pks += chunk
+
+        logger.info(
+            "%s: Calculated missing distances for %d timers in %.3f seconds",
+            staging_system,
+            count,
+            perf_counter() - started,
+        )
+        if calculated_pks:
+            remaining_pks += DistancesFromStaging.objects.filter(
+                staging_system=staging_system,
+                timer_id__in=calculated_pks,
+                jumps__isnull=True,
+            ).values_list("timer_id", flat=True)
+        if remaining_pks:
+            self._defer_distances(staging_system, remaining_pks)
+        return count
+
+    def _defer_distances(self, staging_system, timer_pks: List[int]) -> None:
+        """Start tasks for calculating distances,
+        unless they have already been started recently for the same list.
+        """
+        cache_key = (
+            f"structuretimers_distances_deferred_{staging_system.pk}_"
+            f"{self.kwargs.get('tab_name')}"
+        )
+        if not cache.add(cache_key, True, timeout=LAZY_DISTANCES_DEFERRED_TIMEOUT):
+            return
+
+        batch_size = STRUCTURETIMERS_DISTANCES_BATCH_SIZE
+        chunks = [
+            timer_pks[start : start + batch_size]
+            for start in range(0, len(timer_pks), batch_size)
+        ]
+        for chunk_number, chunk in enumerate(chunks, start=1):
+            calc_timers_distances_for_staging_system.delay(
+                timer_pks=chunk,
+                staging_system_pk=staging_system.pk,
+                chunk_number=chunk_number,
+                chunks_total=len(chunks),
+            )
+        logger.info(
+            "%s: Deferred calculating distances for %d timers to %d tasks",
+            staging_system,
+            len(timer_pks),
+            len(chunks),
+        )
+
     def _get_data_actions(self, timer):
         actions = ""
         if timer.details_image_url or timer.details_notes:
@@ -325,6 +899,284 @@ class TimerListDataView(
         return no_wrap_html(actions)
 
 
+def _format_cursor(value: datetime) -> str:
+    return value.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class TimerListFilterOptionsView(
+    LoginRequiredMixin, PermissionRequiredMixin, JSONResponseMixin, ListView
+):
+    """Produce options for filtering the timer list in server-side processing mode.
+
+    Returns the options for each column requested in ``columns``.
+    """
+
+    model = Timer
+    permission_required = "structuretimers.basic_access"
+
+    def render_to_response(self, context, **response_kwargs):
+        return self.render_to_json_response(context, **response_kwargs)
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        return (
+            qs.visible_to_user(self.request.user)
+            .filter_by_tab(
+                tab_name=self.kwargs.get("tab_name"), max_hours_passed=MAX_HOURS_PASSED
+            )
+            .order_by()
+        )
+
+    def get_data(self, context):
+        columns = [
+            column
+            for column in self.request.GET.get("columns", "").split(",")
+            if column in TIMER_COLUMN_FILTERS
+        ]
+        return {
+            column: sorted(timer_column_options(self.object_list, column))
+            for column in columns
+        }
+
+
+def timer_column_options(timers_qs, column: str) -> set:
+    """Return all values of a column in the timer list for the given timers."""
+    if column == "visibility":
+        alliance_names = timers_qs.filter(
+            visibility=Timer.Visibility.ALLIANCE, eve_alliance__isnull=False
+        ).values_list("eve_alliance__alliance_name", flat=True)
+        corporation_names = timers_qs.filter(
+            visibility=Timer.Visibility.CORPORATION, eve_corporation__isnull=False
+        ).values_list("eve_corporation__corporation_name", flat=True)
+        return set(alliance_names.distinct()) | set(corporation_names.distinct())
+
+    field_name = TimerListDataView.ORDER_FIELDS[column]
+    values = set(timers_qs.values_list(field_name, flat=True).distinct())
+    if column == "timer_type_name":
+        return {str(label) for value, label in Timer.Type.choices if value in values}
+    if column == "objective_name":
+        return {
+            str(label) for value, label in Timer.Objective.choices if value in values
+        }
+    if column == "opsec_str":
+        return {yesno_str(value) for value in values}
+    return {value for value in values if value}
+
+
+def _choices_matching_label(choices, label: str) -> List[str]:
+    return [value for value, choice_label in choices if str(choice_label) == label]
+
+
+def _visibility_filter(value: str) -> Q:
+    alliance_query = Q(
+        visibility=Timer.Visibility.ALLIANCE, eve_alliance__alliance_name=value
+    )
+    corporation_query = Q(
+        visibility=Timer.Visibility.CORPORATION, eve_corporation__corporation_name=value
+    )
+    return alliance_query | corporation_query
+
+
+# filters for columns of the timer list in server-side processing mode
+TIMER_COLUMN_FILTERS = {
+    "system_name": lambda value: Q(eve_solar_system__name=value),
+    "region_name": lambda value: Q(
+        eve_solar_system__eve_constellation__eve_region__name=value
+    ),
+    "structure_type_name": lambda value: Q(structure_type__name=value),
+    "timer_type_name": lambda value: Q(
+        timer_type__in=_choices_matching_label(Timer.Type.choices, value)
+    ),
+    "objective_name": lambda value: Q(
+        objective__in=_choices_matching_label(Timer.Objective.choices, value)
+    ),
+    "visibility": _visibility_filter,
+    "owner_name": lambda value: Q(owner_name=value),
+    "opsec_str": lambda value: Q(is_opsec=value == yesno_str(True)),
+}
+
+
+def _board_row_visibility_filter(value: str) -> Q:
+    alliance_query = Q(visibility=Timer.Visibility.ALLIANCE, eve_alliance_name=value)
+    corporation_query = Q(
+        visibility=Timer.Visibility.CORPORATION, eve_corporation_name=value
+    )
+    return alliance_query | corporation_query
+
+
+# filters for columns of the timer list, when reading from board rows
+BOARD_ROW_COLUMN_FILTERS = {
+    **TIMER_COLUMN_FILTERS,
+    "system_name": lambda value: Q(eve_solar_system_name=value),
+    "region_name": lambda value: Q(eve_region_name=value),
+    "structure_type_name": lambda value: Q(structure_type_name=value),
+    "visibility": _board_row_visibility_filter,
+}
+
+
+class TimerEventsView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Stream changes of timers visible to the user as Server-Sent Events."""
+
+    permission_required = "structuretimers.basic_access"
+
+    def get(self, request, *args, **kwargs):
+        if not STRUCTURETIMERS_LIVE_UPDATES_ENABLED:
+            raise Http404("Live updates are not enabled")
+        response = StreamingHttpResponse(
+            stream_timer_events(request.user), content_type="text/event-stream"
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"  # disable buffering by nginx
+        return response
+
+
+class TimerArchiveView(LoginRequiredMixin, PermissionRequiredMixin, TemplateView):
+    template_name = "structuretimers/timer_archive.html"
+    permission_required = "structuretimers.basic_access"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            {
+                "title": _("Timer Archive"),
+                "data_tables_page_length": STRUCTURETIMERS_DEFAULT_PAGE_LENGTH,
+            }
+        )
+        return context
+
+
+class TimerArchiveDataView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """Produce one page of archived timers in JSON for DataTables.
+
+    The archive can contain many timers,
+    so it is always searched, ordered and paged by the database.
+    """
+
+    permission_required = "structuretimers.basic_access"
+
+    # fields for ordering by columns
+    ORDER_FIELDS = {
+        "date": "date",
+        "location": "eve_solar_system_name",
+        "structure_details": "structure_type_name",
+        "name_owner": "structure_name",
+        "timer_type_name": "timer_type",
+        "objective_name": "objective",
+        "visibility": "visibility",
+        "archived_at": "archived_at",
+    }
+    # fields searched by the global search
+    SEARCH_FIELDS = (
+        "eve_solar_system_name",
+        "eve_region_name",
+        "structure_type_name",
+        "structure_name",
+        "owner_name",
+        "location_details",
+        "eve_corporation_name",
+        "eve_alliance_name",
+    )
+
+    def get(self, request, *args, **kwargs):
+        datatables_request = DataTablesRequest.from_query_dict(request.GET)
+        if not datatables_request:
+            return HttpResponseBadRequest("Invalid request")
+
+        timers_qs = TimerArchive.objects.visible_to_user(request.user)
+        records_total = timers_qs.count()
+        if datatables_request.search:
+            search_query = Q()
+            for field_name in self.SEARCH_FIELDS:
+                search_query |= Q(
+                    **{f"{field_name}__icontains": datatables_request.search}
+                )
+            timers_qs = timers_qs.filter(search_query)
+            records_filtered = timers_qs.count()
+        else:
+            records_filtered = records_total
+
+        order_by = []
+        for column, is_descending in datatables_request.order:
+            try:
+                expression = F(self.ORDER_FIELDS[column])
+            except KeyError:
+                continue
+            order_by.append(
+                expression.desc(nulls_last=True)
+                if is_descending
+                else expression.asc(nulls_last=True)
+            )
+
+        order_by.append(F("pk").asc())
+        end = datatables_request.end
+        if end is None:
+            end = datatables_request.start + MAX_PAGE_LENGTH
+        timers = timers_qs.order_by(*order_by)[datatables_request.start : end]
+        return JsonResponse(
+            {
+                "draw": datatables_request.draw,
+                "recordsTotal": records_total,
+                "recordsFiltered": records_filtered,
+                "data": [self._timer_row(timer) for timer in timers],
+            }
+        )
+
+    @staticmethod
+    def _timer_row(timer: TimerArchive) -> dict:
+        if timer.eve_solar_system_name:
+            location = link_html(
+                dotlan.solar_system_url(timer.eve_solar_system_name),
+                timer.eve_solar_system_name,
+            )
+        else:
+            location = "?"
+        if timer.location_details:
+            location += format_html("<br><em>{}</em>", timer.location_details)
+        location += format_html("<br>{}", timer.eve_region_name or "?")
+
+        structure_type_name = timer.structure_type_name or "(unknown)"
+        tags = []
+        if timer.is_opsec:
+            tags.append(bootstrap_label_html("OPSEC", "danger"))
+        if timer.is_important:
+            tags.append(bootstrap_label_html("Important", "warning"))
+
+        if timer.visibility == Timer.Visibility.ALLIANCE:
+            visibility = timer.eve_alliance_name or timer.get_visibility_display()
+        elif timer.visibility == Timer.Visibility.CORPORATION:
+            visibility = timer.eve_corporation_name or timer.get_visibility_display()
+        else:
+            visibility = timer.get_visibility_display()
+
+        return {
+            "id": timer.id,
+            "date": timer.date.strftime(DATETIME_FORMAT) if timer.date else "",
+            "location": location,
+            "structure_details": bootstrap_label_html(structure_type_name, "info"),
+            "name_owner": format_html(
+                "{}<br>{}", timer.structure_name or "-", timer.owner_name or "-"
+            ),
+            "timer_type_name": bootstrap_label_html(
+                timer.get_timer_type_display(),
+                Timer.label_types_for_timer_types().get(timer.timer_type, "default"),
+            ),
+            "objective_name": format_html(
+                "{}<br>{}",
+                mark_safe(
+                    bootstrap_label_html(
+                        timer.get_objective_display(),
+                        Timer.label_types_for_objectives().get(
+                            timer.objective, "default"
+                        ),
+                    )
+                ),
+                mark_safe(" ".join(tags)),
+            ),
+            "visibility": escape(visibility),
+            "archived_at": timer.archived_at.strftime(DATETIME_FORMAT),
+        }
+
+
 class TimerDetailDataView(LoginRequiredMixin, PermissionRequiredMixin, DetailView):
     permission_required = "structuretimers.basic_access"
     model = Timer